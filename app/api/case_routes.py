@@ -1,41 +1,60 @@
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 
 from app.core.db import get_db
 from app.models.case_episode import CaseEpisode
 from app.models.patient import Patient
 from app.schemas.case_episode import CaseEpisodeCreate, CaseEpisodeOut, CaseEpisodeUpdate
+from app.schemas.pagination import Page
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_page, parse_fields
 
+from app.services.outcomes import update_outcomes
 from app.services.prom_scheduler import schedule_proms_for_case
+from app.services.theatre_stats import update_theatre_stats
+from app.utils.case_times import as_utc, duration_minutes, now_utc, shift_days, theatre_times
 
 router = APIRouter(prefix="/cases", tags=["Cases"])
 
 
-def now_hhmm() -> str:
-    return datetime.now().strftime("%H:%M")
+TIME_FIELDS = {"cutting_time", "closing_time", "started_at", "stopped_at"}
 
 
-def compute_duration_minutes(cutting_time: str | None, closing_time: str | None) -> int | None:
-    if not cutting_time or not closing_time:
-        return None
-    start = datetime.strptime(cutting_time, "%H:%M")
-    end = datetime.strptime(closing_time, "%H:%M")
-    diff = int((end - start).total_seconds() / 60)
-    if diff < 0:
-        return None
-    return diff
+def recompute_and_set_duration(case: CaseEpisode) -> None:
+    case.duration_minutes = duration_minutes(case.started_at, case.stopped_at)
 
 
-def recompute_and_set_duration(case: CaseEpisode) -> None:
-    case.duration_minutes = compute_duration_minutes(case.cutting_time, case.closing_time)
+def set_case_times(case: CaseEpisode, data: dict, previous_day: date | None = None) -> None:
+    """
+    Apply the timing fields of a create / patch (after date_of_surgery is
+    set) and recompute the duration. HH:MM times are re-anchored on the
+    day of surgery; started_at / stopped_at are taken as sent. A patch that
+    only moves the date (from `previous_day`) shifts the stored timestamps
+    by whole days, so they keep their seconds and the duration.
+    """
+    if data.keys() & {"cutting_time", "closing_time"} or (
+        "date_of_surgery" in data and previous_day is None
+    ):
+        cutting = data["cutting_time"] if "cutting_time" in data else case.cutting_time
+        closing = data["closing_time"] if "closing_time" in data else case.closing_time
+        case.started_at, case.stopped_at = theatre_times(case.date_of_surgery, cutting, closing)
+    elif "date_of_surgery" in data and case.date_of_surgery != previous_day:
+        days = (case.date_of_surgery - previous_day).days
+        case.started_at = shift_days(case.started_at, days)
+        case.stopped_at = shift_days(case.stopped_at, days)
+    if "started_at" in data:
+        case.started_at = as_utc(data["started_at"])
+    if "stopped_at" in data:
+        case.stopped_at = as_utc(data["stopped_at"])
+
+    recompute_and_set_duration(case)
+    if case.started_at and case.stopped_at and case.duration_minutes is None:
+        raise HTTPException(status_code=422, detail="closing_time must be after cutting_time")
 
 
 def to_out(case: CaseEpisode) -> CaseEpisodeOut:
-    out = CaseEpisodeOut.model_validate(case)
-    if out.duration_minutes is None:
-        out.duration_minutes = compute_duration_minutes(case.cutting_time, case.closing_time)
-    return out
+    return CaseEpisodeOut.model_validate(case)
 
 
 def try_trigger_prom_schedule(db: Session, case_id: int) -> None:
@@ -69,20 +88,17 @@ def create_case_episode(
         patient_id=case_in.patient_id,
         joint_type=case_in.joint_type,
         date_of_surgery=case_in.date_of_surgery,
-        cutting_time=case_in.cutting_time,
-        closing_time=case_in.closing_time,
         surgeon_name=case_in.surgeon_name,
         procedure_type=case_in.procedure_type,
         implant_notes=case_in.implant_notes,
         case_status=case_in.case_status,
     )
 
-    recompute_and_set_duration(case)
-
-    if case_in.cutting_time and case_in.closing_time and case.duration_minutes is None:
-        raise HTTPException(status_code=422, detail="closing_time must be after cutting_time")
+    set_case_times(case, case_in.model_dump(include=TIME_FIELDS | {"date_of_surgery"}, exclude_none=True))
 
     db.add(case)
+    db.flush()
+    update_theatre_stats(db, [case.id])
     db.commit()
     db.refresh(case)
 
@@ -103,16 +119,23 @@ def update_case_episode(
         raise HTTPException(status_code=404, detail="Case episode not found")
 
     prev_status = case.case_status
+    prev_day = case.date_of_surgery
 
     data = patch.model_dump(exclude_unset=True)
 
     for k, v in data.items():
-        setattr(case, k, v)
+        if k not in TIME_FIELDS:
+            setattr(case, k, v)
+
+    if data.keys() & (TIME_FIELDS | {"date_of_surgery"}):
+        set_case_times(case, data, previous_day=prev_day)
 
-    if "cutting_time" in data or "closing_time" in data:
-        recompute_and_set_duration(case)
-        if case.cutting_time and case.closing_time and case.duration_minutes is None:
-            raise HTTPException(status_code=422, detail="closing_time must be after cutting_time")
+    if data.keys() & {"surgeon_name", "joint_type", "date_of_surgery"}:
+        # Scored PROMs move to the case's new outcome cohort
+        update_outcomes(db, case_ids=[case.id])
+
+    # Duration rollups (a no-op unless the case's fact changed)
+    update_theatre_stats(db, [case.id])
 
     db.commit()
     db.refresh(case)
@@ -140,13 +163,15 @@ def start_case_episode(
     if case.case_status != "IN_PROGRESS":
         case.case_status = "IN_PROGRESS"
 
-    if not case.cutting_time:
-        case.cutting_time = now_hhmm()
+    if not case.started_at:
+        case.started_at = now_utc()
 
-    if case.closing_time:
-        case.closing_time = None
+    if case.stopped_at:
+        case.stopped_at = None
 
     recompute_and_set_duration(case)
+    # A restarted case leaves the duration rollups until it stops again
+    update_theatre_stats(db, [case.id])
 
     db.commit()
     db.refresh(case)
@@ -168,16 +193,19 @@ def stop_case_episode(
 
     prev_status = case.case_status
 
-    if not case.cutting_time:
-        case.cutting_time = now_hhmm()
+    if not case.started_at:
+        case.started_at = now_utc()
 
-    case.closing_time = now_hhmm()
+    # Real timestamps: a case stopped after midnight keeps its duration
+    case.stopped_at = now_utc()
     case.case_status = "COMPLETED"
 
     recompute_and_set_duration(case)
     if case.duration_minutes is None:
         raise HTTPException(status_code=422, detail="closing_time must be after cutting_time")
 
+    update_theatre_stats(db, [case.id])
+
     db.commit()
     db.refresh(case)
 
@@ -198,15 +226,23 @@ def get_case_episode(
     return to_out(case)
 
 
-@router.get("/by-patient/{patient_id}", response_model=list[CaseEpisodeOut])
+@router.get("/by-patient/{patient_id}", response_model=Page)
 def list_cases_for_patient(
     patient_id: int,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
     db: Session = Depends(get_db),
 ):
-    cases = (
-        db.query(CaseEpisode)
-        .filter(CaseEpisode.patient_id == patient_id)
-        .order_by(CaseEpisode.date_of_surgery.desc())
-        .all()
-    )
-    return [to_out(c) for c in cases]
+    try:
+        include = parse_fields(fields, CaseEpisodeOut.model_fields)
+        cases, next_cursor = keyset_page(
+            db.query(CaseEpisode).filter(CaseEpisode.patient_id == patient_id),
+            [(CaseEpisode.date_of_surgery, True), (CaseEpisode.id, True)],
+            cursor,
+            limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page.build([to_out(c) for c in cases], next_cursor, include)
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.services.outcomes import outcome_summary, parse_group_by
+
+router = APIRouter(prefix="/outcomes", tags=["Outcomes"])
+
+
+@router.get("/")
+def get_outcomes(
+    group_by: str | None = None,
+    prom_name: str | None = None,
+    joint_type: str | None = None,
+    surgeon_name: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Score and change from pre-op per timepoint (pre-op, 6w, 3m, 6m, 12m,
+    24m) per instrument; group_by=joint, surgeon or joint,surgeon.
+    """
+    try:
+        fields = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "group_by": list(fields),
+        "cohorts": outcome_summary(
+            db,
+            group_by=fields,
+            prom_name=prom_name,
+            joint_type=joint_type,
+            surgeon_name=surgeon_name,
+        ),
+    }
+
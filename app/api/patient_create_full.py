@@ -1,18 +1,15 @@
 from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.db import get_db
+from app.core.db import get_async_db
 from app.models.patient import Patient
 from app.models.patient_file import PatientFile
+from app.services.patient_files import UploadTooLarge, acquire_blob, store_upload
+from app.services.thumbnails import thumbnail_worker
 
-import shutil
-import os
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
-UPLOAD_DIR = "uploaded_files"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-
 
 @router.post("/create-full")
 async def create_full_patient(
@@ -34,12 +31,13 @@ async def create_full_patient(
 
     joint_type: str = Form(...),  # REQUIRED for PROM routing
 
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     # 1. Save file
-    save_path = f"{UPLOAD_DIR}/{uploaded_file.filename}"
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(uploaded_file.file, buffer)
+    try:
+        stored = await store_upload(uploaded_file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
     # 2. Create patient
     patient = Patient(
@@ -60,18 +58,22 @@ async def create_full_patient(
         joint_type=joint_type
     )
     db.add(patient)
-    db.commit()
-    db.refresh(patient)
+    await db.flush()  # assigns patient.id
 
     # 3. Create patient file
+    await db.run_sync(acquire_blob, stored)
     file_record = PatientFile(
         patient_id=patient.id,
-        file_path=save_path,
-        filename=uploaded_file.filename
+        file_path=stored.path,
+        filename=stored.filename,
+        sha256=stored.sha256,
+        size=stored.size,
+        mime_type=stored.mime_type
     )
     db.add(file_record)
-    db.commit()
-    db.refresh(file_record)
+    await db.commit()
+
+    thumbnail_worker.request(stored.sha256, stored.path, stored.mime_type)
 
     return {
         "patient": patient,
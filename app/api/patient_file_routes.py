@@ -1,66 +1,99 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from sqlalchemy.orm import Session
-import shutil
+import asyncio
 import os
 
-from app.core.db import get_db
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query, Request, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.db import get_async_db, get_db
 from app.models.patient_file import PatientFile
 from app.models.patient import Patient
 from app.schemas.patient_file import PatientFileOut
+from app.schemas.pagination import Page
+from app.services.patient_files import (
+    UPLOAD_DIR,
+    UploadTooLarge,
+    acquire_blob,
+    etag_for,
+    etag_matches,
+    find_duplicates,
+    release_blob,
+    remove_blob_file,
+    safe_filename,
+    store_upload,
+)
+from app.services.thumbnails import pick_size, remove_thumbnails, thumbnail_path, thumbnail_worker
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_page, parse_fields
 
-# Optional / future
-from app.utils.pdf_parser import ocr_first_page, parse_patient_data
+# Optional / future: OCR intake runs in app.services.intake_jobs worker processes
+from app.models.intake_job import IntakeJob
+from app.schemas.intake_job import IntakeJobOut
+from app.services.intake_jobs import intake_worker
+from app.services.ocr_cache import ocr_cache
 
 
 router = APIRouter(prefix="/patient-files", tags=["Patient Files"])
 
-UPLOAD_DIR = "uploaded_files"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Behind nginx: X-Accel-Redirect to `<prefix><path under UPLOAD_DIR>` hands the
+# transfer (sendfile, ranges) to the proxy, e.g. FILE_ACCEL_REDIRECT_PREFIX=/protected/
+FILE_ACCEL_REDIRECT_PREFIX = os.getenv("FILE_ACCEL_REDIRECT_PREFIX")
+
+# How long a thumbnail request waits for a first render before answering 202
+THUMB_WAIT_SECONDS = float(os.getenv("THUMB_WAIT_SECONDS", "5"))
 
 
 # =========================================================
 # FUTURE: OCR / INTAKE MODE (KEEP, BUT DO NOT USE IN MVP)
 # =========================================================
-@router.post("/", response_model=PatientFileOut)
+@router.post("/", response_model=IntakeJobOut, status_code=202)
 async def upload_patient_file_ocr(
     uploaded_file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     FUTURE MODE (NOT USED IN MVP)
-    Upload → OCR → auto-create patient → attach file
-    """
+    Upload → queue OCR job → (worker) auto-create patient → attach file
 
-    save_path = f"{UPLOAD_DIR}/{uploaded_file.filename}"
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(uploaded_file.file, buffer)
+    Returns immediately; poll GET /patient-files/intake-jobs/{id} for the result.
+    """
 
-    text = ocr_first_page(save_path)
-    parsed = parse_patient_data(text)
+    try:
+        stored = await store_upload(uploaded_file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    patient = Patient(
-        full_name=parsed.get("full_name"),
-        preferred_name=parsed.get("preferred_name"),
-        id_number=parsed.get("id_number"),
-        email=parsed.get("email"),
-        phone=parsed.get("phone"),
+    # The queued job holds the blob reference until it becomes a PatientFile
+    await db.run_sync(acquire_blob, stored)
+    job = IntakeJob(
+        file_path=stored.path,
+        filename=stored.filename,
+        sha256=stored.sha256,
+        status="queued",
+        attempts=0,
     )
+    db.add(job)
+    await db.commit()
 
-    db.add(patient)
-    db.commit()
-    db.refresh(patient)
+    intake_worker.notify()
 
-    record = PatientFile(
-        patient_id=patient.id,
-        file_path=save_path,
-        filename=uploaded_file.filename
-    )
+    return job
+
+
+@router.get("/intake-jobs/{job_id}", response_model=IntakeJobOut)
+async def get_intake_job(
+    job_id: int,
+    db: AsyncSession = Depends(get_async_db)
+):
+    job = await db.get(IntakeJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Intake job not found")
+    return job
 
-    db.add(record)
-    db.commit()
-    db.refresh(record)
 
-    return record
+@router.get("/ocr-cache/stats")
+def get_ocr_cache_stats():
+    return ocr_cache.stats()
 
 
 # =========================================================
@@ -70,7 +103,7 @@ async def upload_patient_file_ocr(
 async def upload_and_assign_file(
     patient_id: int = Form(...),
     uploaded_file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     MVP ENDPOINT (USED BY PATIENT DETAIL PAGE)
@@ -81,42 +114,195 @@ async def upload_and_assign_file(
     - No patient creation
     """
 
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
+    patient = await db.get(Patient, patient_id)
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    save_path = f"{UPLOAD_DIR}/{uploaded_file.filename}"
-    with open(save_path, "wb") as buffer:
-        shutil.copyfileobj(uploaded_file.file, buffer)
+    try:
+        stored = await store_upload(uploaded_file)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
+    duplicate = await db.run_sync(acquire_blob, stored)
     record = PatientFile(
         patient_id=patient.id,
-        file_path=save_path,
-        filename=uploaded_file.filename
+        file_path=stored.path,
+        filename=stored.filename,
+        sha256=stored.sha256,
+        size=stored.size,
+        mime_type=stored.mime_type,
     )
 
     db.add(record)
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+
+    thumbnail_worker.request(stored.sha256, stored.path, stored.mime_type)
 
     return {
         "id": record.id,
         "patient_id": record.patient_id,
         "filename": record.filename,
-        "file_path": record.file_path
+        "file_path": record.file_path,
+        "sha256": record.sha256,
+        "size": record.size,
+        "mime_type": record.mime_type,
+        "duplicate": duplicate
     }
 
 
 # =========================================================
 # LIST FILES FOR PATIENT (PATIENT DETAIL PAGE)
 # =========================================================
-@router.get("/by-patient/{patient_id}")
+@router.get("/by-patient/{patient_id}", response_model=Page)
 def list_files_for_patient(
     patient_id: int,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
     db: Session = Depends(get_db)
 ):
-    return (
-        db.query(PatientFile)
-        .filter(PatientFile.patient_id == patient_id)
-        .all()
+    try:
+        include = parse_fields(fields, PatientFileOut.model_fields)
+        rows, next_cursor = keyset_page(
+            db.query(PatientFile).filter(PatientFile.patient_id == patient_id),
+            [(PatientFile.id, False)],
+            cursor,
+            limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page.build([PatientFileOut.model_validate(f) for f in rows], next_cursor, include)
+
+
+# =========================================================
+# DOWNLOAD (RANGE + CONDITIONAL GET)
+# =========================================================
+@router.get("/{file_id}/content")
+async def get_patient_file_content(
+    file_id: int,
+    request: Request,
+    download: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Serve the stored file. Supports Range / If-Range (PDF viewers fetch
+    pages progressively) and If-None-Match -> 304 on the content hash.
+    """
+    record = await db.get(PatientFile, file_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = etag_for(record)
+    headers = {
+        # Content behind a hash is immutable; legacy files must revalidate
+        "cache-control": "private, max-age=86400, immutable" if etag else "private, no-cache",
+    }
+    if etag:
+        headers["etag"] = etag
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    if not os.path.isfile(record.file_path):
+        raise HTTPException(status_code=410, detail="File content is no longer available")
+
+    disposition = "attachment" if download else "inline"
+
+    if FILE_ACCEL_REDIRECT_PREFIX:
+        relative = os.path.relpath(record.file_path, UPLOAD_DIR).replace(os.sep, "/")
+        headers["x-accel-redirect"] = FILE_ACCEL_REDIRECT_PREFIX.rstrip("/") + "/" + relative
+        return Response(
+            headers=headers | {"content-disposition": f'{disposition}; filename="{safe_filename(record.filename)}"'},
+            media_type=record.mime_type,
+        )
+
+    # Starlette handles Range/If-Range against our ETag, and uses the ASGI
+    # pathsend extension (zero-copy) when the server provides it
+    return FileResponse(
+        record.file_path,
+        headers=headers,
+        media_type=record.mime_type or "application/octet-stream",
+        filename=safe_filename(record.filename),
+        content_disposition_type=disposition,
     )
+
+
+# =========================================================
+# THUMBNAILS (FIRST PAGE PREVIEW)
+# =========================================================
+@router.get("/{file_id}/thumbnail")
+async def get_patient_file_thumbnail(
+    file_id: int,
+    request: Request,
+    size: int = Query(256, ge=16, le=2048),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    JPEG of the first page, at the smallest cached width >= `size`.
+    Rendered once per content hash; 202 + Retry-After while still rendering.
+    """
+    record = await db.get(PatientFile, file_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not record.sha256:
+        raise HTTPException(status_code=404, detail="No preview for this file")
+
+    width = pick_size(size)
+    path = thumbnail_path(record.sha256, width)
+    headers = {
+        "etag": f'"{record.sha256}-{width}"',
+        "cache-control": "private, max-age=86400, immutable",
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), headers["etag"]):
+        return Response(status_code=304, headers=headers)
+
+    if not os.path.isfile(path):
+        future = thumbnail_worker.request(record.sha256, record.file_path, record.mime_type)
+        if future is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), THUMB_WAIT_SECONDS)
+            except asyncio.TimeoutError:
+                return Response(status_code=202, headers={"retry-after": "2"})
+            except Exception:
+                pass
+
+        if not os.path.isfile(path):
+            raise HTTPException(status_code=404, detail="No preview for this file")
+
+    return FileResponse(path, headers=headers, media_type="image/jpeg")
+
+
+# =========================================================
+# DUPLICATE LOOKUP / DELETE
+# =========================================================
+@router.get("/by-hash/{sha256}", response_model=list[PatientFileOut])
+def list_files_by_hash(
+    sha256: str,
+    db: Session = Depends(get_db)
+):
+    """Every file record with exactly these bytes."""
+    return find_duplicates(db, sha256.lower()).all()
+
+
+@router.delete("/{file_id}", status_code=204)
+def delete_patient_file(
+    file_id: int,
+    db: Session = Depends(get_db)
+):
+    record = db.get(PatientFile, file_id)
+    if not record:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    sha256 = record.sha256
+    db.delete(record)
+    db.flush()
+    orphaned = release_blob(db, sha256)
+    db.commit()
+
+    # Only once nothing refers to the bytes any more
+    if orphaned and remove_blob_file(orphaned):
+        remove_thumbnails(sha256)
+
+    return Response(status_code=204)
@@ -1,9 +1,13 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
+from app.api.case_routes import to_out as case_to_out
 from app.core.db import get_db
-from app.schemas.patient import PatientCreate, PatientOut
+from app.schemas.patient import PatientCreate, PatientOut, PatientOverviewOut
+from app.schemas.pagination import Page
 from app.models.patient import Patient
-from fastapi import APIRouter, Depends, HTTPException
+from app.models.prom_schedule import PromSchedule
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_page, parse_fields
+from fastapi import APIRouter, Depends, HTTPException, Query
 
 router = APIRouter(prefix="/patients", tags=["Patients"])
 
@@ -15,9 +19,20 @@ def create_patient(patient: PatientCreate, db: Session = Depends(get_db)):
     db.refresh(db_patient)
     return db_patient
 
-@router.get("/", response_model=list[PatientOut])
-def list_patients(db: Session = Depends(get_db)):
-    return db.query(Patient).all()
+@router.get("/", response_model=Page)
+def list_patients(
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        include = parse_fields(fields, PatientOut.model_fields)
+        rows, next_cursor = keyset_page(db.query(Patient), [(Patient.id, False)], cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page.build([PatientOut.model_validate(p) for p in rows], next_cursor, include)
 
 @router.get("/{patient_id}")
 def get_patient(
@@ -33,4 +48,32 @@ def get_patient(
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
-    return patient
\ No newline at end of file
+    return patient
+
+
+@router.get("/{patient_id}/overview", response_model=PatientOverviewOut)
+def get_patient_overview(
+    patient_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Patient + cases + files + PROM schedules with their scores: one query
+    per table (selectinload), instead of one request per list.
+    """
+    patient = (
+        db.query(Patient)
+        .options(
+            selectinload(Patient.cases),
+            selectinload(Patient.files),
+            selectinload(Patient.prom_schedules).selectinload(PromSchedule.score),
+        )
+        .filter(Patient.id == patient_id)
+        .first()
+    )
+
+    if not patient:
+        raise HTTPException(status_code=404, detail="Patient not found")
+
+    overview = PatientOverviewOut.model_validate(patient)
+    overview.cases = [case_to_out(c) for c in patient.cases]
+    return overview
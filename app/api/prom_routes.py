@@ -1,18 +1,33 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from datetime import date
 
 from app.core.db import get_db
-from app.models.case_episode import CaseEpisode
 from app.models.prom_schedule import PromSchedule
-from app.models.patient import Patient
-from app.models.prom_response import PromResponse
 
-from app.utils.prom_loader import load_prom_template
+from app.utils.prom_loader import InvalidPromTemplate, get_cached_template, load_prom_template, registry as prom_registry
 from app.schemas.prom_forms import PromFormOut
-from app.schemas.prom_submit import PromSubmitIn
-
-from app.services.prom_scheduler import schedule_proms_for_case
+from app.schemas.prom_submit import PromSubmitBatchIn, PromSubmitIn
+from app.schemas.prom_schedule import PromBulkScheduleIn, PromScheduleOut, PromWorklistItemOut
+from app.schemas.pagination import Page
+from app.utils.pagination import DEFAULT_LIMIT, MAX_LIMIT, keyset_page, parse_fields
+
+from app.services.outcomes import update_outcomes
+from app.services.prom_forms import form_cache
+from app.services.prom_protocols import InvalidProtocol, get_protocol_table
+from app.services.prom_scheduler import (
+    replan_proms_bulk,
+    schedule_proms_bulk,
+    schedule_proms_for_case,
+    select_cases_for_scheduling,
+)
+from app.services.prom_scoring import get_scoring_plan, score_answers
+from app.services.prom_worklist import SWEEP_JOB, parse_statuses, sweep_overdue, worklist_query
+from app.models.job_run import JobRun
+from app.services.reminders import REMINDER_BATCH_SIZE, run_reminders
+from app.services.prom_responses import has_answers, load_answers, store_answers
+from app.services.prom_scores import latest_scores_query, save_score
+from app.services.prom_submissions import SubmissionError, check_answers, check_schedule, submit_many
 
 router = APIRouter(prefix="/proms", tags=["PROMs"])
 
@@ -26,18 +41,84 @@ def get_prom_template(prom_name: str):
         return load_prom_template(prom_name)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Template not found")
+    except InvalidPromTemplate as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/templates/stats")
+def get_prom_template_stats():
+    return prom_registry.stats()
 
 
 # --------------------------------------------------------
 # 2. GENERATE PROM SCHEDULE FOR A CASE (idempotent)
 # --------------------------------------------------------
+@router.post("/schedule/bulk")
+def generate_schedules_bulk(body: PromBulkScheduleIn, db: Session = Depends(get_db)):
+    """
+    Schedule many cases in one transaction (back-loading, mapping fixes).
+    Cases that already have schedules are reported as "existing".
+    """
+    return schedule_proms_bulk(db, _bulk_case_ids(db, body), dry_run=body.dry_run)
+
+
+@router.post("/schedule/replan")
+def replan_schedules(body: PromBulkScheduleIn, db: Session = Depends(get_db)):
+    """
+    Re-apply the current protocols to already-scheduled cases: inserts and
+    cancels only the difference. Use dry_run to preview.
+    """
+    try:
+        return replan_proms_bulk(db, _bulk_case_ids(db, body), dry_run=body.dry_run)
+    except InvalidProtocol as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/protocols")
+def list_protocols():
+    table = get_protocol_table()
+    return {
+        "checksum": table.checksum,
+        "protocols": [
+            {
+                "name": p.name,
+                "joint_type": p.joint_type,
+                "procedure_type": p.procedure_type,
+                "timepoints": [
+                    {
+                        "prom_name": tp.prom_name,
+                        "offset_days": tp.offset_days,
+                        "window_before_days": tp.window_before_days,
+                        "window_after_days": tp.window_after_days,
+                    }
+                    for tp in p.timepoints
+                ],
+            }
+            for p in table.protocols
+        ],
+    }
+
+
+def _bulk_case_ids(db: Session, body: PromBulkScheduleIn) -> list[int]:
+    if body.case_ids is not None:
+        return body.case_ids
+    return select_cases_for_scheduling(
+        db,
+        date_from=body.date_from,
+        date_to=body.date_to,
+        joint_type=body.joint_type,
+        surgeon_name=body.surgeon_name,
+        case_status=body.case_status,
+    )
+
+
 @router.post("/schedule/{case_id}")
 def generate_schedule(case_id: int, db: Session = Depends(get_db)):
     try:
         result = schedule_proms_for_case(db, case_id)
         return result
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="PROM template missing")
+    except (FileNotFoundError, InvalidPromTemplate):
+        raise HTTPException(status_code=400, detail="PROM template missing/invalid")
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
@@ -45,15 +126,127 @@ def generate_schedule(case_id: int, db: Session = Depends(get_db)):
 # --------------------------------------------------------
 # 3. LIST SCHEDULE FOR PATIENT
 # --------------------------------------------------------
-@router.get("/schedule/patient/{patient_id}")
-def list_schedule(patient_id: int, db: Session = Depends(get_db)):
-    rows = (
-        db.query(PromSchedule)
-        .filter(PromSchedule.patient_id == patient_id)
-        .order_by(PromSchedule.due_date)
-        .all()
-    )
-    return rows
+@router.get("/schedule/patient/{patient_id}", response_model=Page)
+def list_schedule(
+    patient_id: int,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        include = parse_fields(fields, PromScheduleOut.model_fields)
+        rows, next_cursor = keyset_page(
+            db.query(PromSchedule).filter(PromSchedule.patient_id == patient_id),
+            [(PromSchedule.due_date, False), (PromSchedule.id, False)],
+            cursor,
+            limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page.build([PromScheduleOut.model_validate(r) for r in rows], next_cursor, include)
+
+
+# --------------------------------------------------------
+# 3a. DUE / OVERDUE WORKLIST (ALL PATIENTS)
+# --------------------------------------------------------
+@router.get("/worklist", response_model=Page)
+def get_worklist(
+    status: str | None = Query(None, description="comma separated, default pending,overdue"),
+    due_from: date | None = None,
+    due_to: date | None = None,
+    open_on: date | None = Query(None, description="collection window contains this date"),
+    surgeon_name: str | None = None,
+    joint_type: str | None = None,
+    prom_name: str | None = None,
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    cursor: str | None = None,
+    fields: str | None = None,
+    db: Session = Depends(get_db),
+):
+    try:
+        include = parse_fields(fields, PromWorklistItemOut.model_fields)
+        rows, next_cursor = keyset_page(
+            worklist_query(
+                db,
+                statuses=parse_statuses(status),
+                due_from=due_from,
+                due_to=due_to,
+                open_on=open_on,
+                surgeon_name=surgeon_name,
+                joint_type=joint_type,
+                prom_name=prom_name,
+            ),
+            [(PromSchedule.due_date, False), (PromSchedule.id, False)],
+            cursor,
+            limit,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return Page.build([PromWorklistItemOut.model_validate(r) for r in rows], next_cursor, include)
+
+
+@router.post("/worklist/sweep")
+def run_overdue_sweep(db: Session = Depends(get_db)):
+    """Run the overdue sweep now (it also runs periodically in the background)."""
+    return sweep_overdue(db)
+
+
+@router.get("/worklist/sweep")
+def get_overdue_sweep_state(db: Session = Depends(get_db)):
+    state = db.get(JobRun, SWEEP_JOB)
+    if state is None:
+        return {"last_run_at": None, "watermark": None, "last_result": None}
+    return {"last_run_at": state.last_run_at, "watermark": state.watermark, "last_result": state.last_result}
+
+
+# --------------------------------------------------------
+# 3b. STORED SCORES FOR PATIENT
+# --------------------------------------------------------
+@router.get("/scores/patient/{patient_id}")
+def list_scores(patient_id: int, prom_name: str | None = None, db: Session = Depends(get_db)):
+    rows = latest_scores_query(db, patient_id=patient_id, prom_name=prom_name).all()
+    return [
+        {
+            "schedule_id": schedule.id,
+            "case_id": schedule.case_id,
+            "prom_name": score.prom_name,
+            "due_date": schedule.due_date,
+            "completed_date": schedule.completed_date,
+            "total": score.total,
+            "max_possible": score.max_possible,
+            "normalised": score.normalised,
+            "subscales": score.subscales,
+            "plan_version": score.plan_version,
+        }
+        for schedule, score in rows
+    ]
+
+
+# --------------------------------------------------------
+# 3c. REMINDERS
+# --------------------------------------------------------
+@router.post("/reminders/run")
+async def send_reminders(
+    dry_run: bool = False,
+    limit: int = Query(REMINDER_BATCH_SIZE, ge=1, le=10000),
+):
+    """Remind patients about due / recently overdue PROMs (each at most once)."""
+    return await run_reminders(limit=limit, dry_run=dry_run)
+
+
+# --------------------------------------------------------
+# 3d. STORED ANSWERS
+# --------------------------------------------------------
+@router.get("/responses/{schedule_id}")
+def get_prom_responses(schedule_id: int, db: Session = Depends(get_db)):
+    """Answers of a completed PROM, the same shape whichever storage holds them."""
+    answers = load_answers(db, [schedule_id]).get(schedule_id)
+    if answers is None:
+        raise HTTPException(status_code=404, detail="No responses for this PROM")
+    return [{"question_id": qid, "answer_value": value} for qid, value in answers.items()]
 
 
 # --------------------------------------------------------
@@ -61,47 +254,20 @@ def list_schedule(patient_id: int, db: Session = Depends(get_db)):
 # --------------------------------------------------------
 @router.get("/form/{schedule_id}", response_model=PromFormOut)
 def get_prom_form(schedule_id: int, db: Session = Depends(get_db)):
+    try:
+        form = form_cache.get(db, schedule_id)
+    except (FileNotFoundError, InvalidPromTemplate):
+        raise HTTPException(status_code=400, detail="PROM template missing/invalid")
 
-    schedule = (
-        db.query(PromSchedule)
-        .filter(PromSchedule.id == schedule_id)
-        .first()
-    )
-
-    if not schedule:
+    if form is None:
         raise HTTPException(status_code=404, detail="PROM schedule not found")
 
-    case = (
-        db.query(CaseEpisode)
-        .filter(CaseEpisode.id == schedule.case_id)
-        .first()
-    )
-    if not case:
-        raise HTTPException(status_code=404, detail="Case episode not found")
+    return form
 
-    patient = (
-        db.query(Patient)
-        .filter(Patient.id == schedule.patient_id)
-        .first()
-    )
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
 
-    try:
-        template = load_prom_template(schedule.prom_name)
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="PROM template missing")
-
-    return PromFormOut(
-        schedule_id=schedule.id,
-        prom_name=schedule.prom_name,
-        due_date=schedule.due_date,
-        patient_id=patient.id,
-        case_id=case.id,
-        patient_name=patient.full_name,
-        joint_type=case.joint_type,
-        questions=template.get("questions", []),
-    )
+@router.get("/forms/stats")
+def get_prom_form_cache_stats():
+    return form_cache.stats()
 
 
 # --------------------------------------------------------
@@ -117,73 +283,33 @@ def submit_prom_answers(
     if not schedule:
         raise HTTPException(status_code=404, detail="Schedule not found")
 
-    if (schedule.status or "").lower() == "completed":
-        raise HTTPException(status_code=400, detail="PROM already completed")
+    has_responses = db.query(has_answers(schedule.id)).scalar()
 
     try:
-        template = load_prom_template(schedule.prom_name)
-    except FileNotFoundError:
-        raise HTTPException(status_code=400, detail="PROM template missing")
-
-    questions = template.get("questions", [])
-    valid_ids = {str(q["id"]): q for q in questions}
+        check_schedule(schedule.status, has_responses)
+        template = get_cached_template(schedule.prom_name)
+        answers = check_answers(template, data.answers)
+    except (FileNotFoundError, InvalidPromTemplate):
+        raise HTTPException(status_code=400, detail="PROM template missing/invalid")
+    except SubmissionError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if not questions:
-        raise HTTPException(status_code=400, detail="Template has no questions")
-
-    existing = (
-        db.query(PromResponse)
-        .filter(PromResponse.prom_instance_id == schedule.id)
-        .all()
-    )
-    if existing:
-        raise HTTPException(status_code=400, detail="Responses already exist for this PROM")
-
-    total_score = 0
-    answered_count = 0
-
-    for answer in data.answers:
-        qid = str(answer.id)
-
-        if qid not in valid_ids:
-            raise HTTPException(status_code=400, detail=f"Invalid question ID: {qid}")
-
-        q_meta = valid_ids[qid]
-        min_val = q_meta.get("range_min")
-        max_val = q_meta.get("range_max")
-
-        if min_val is not None and max_val is not None:
-            if not (min_val <= answer.value <= max_val):
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Answer for question {qid} out of range ({min_val}-{max_val})",
-                )
-
-        db.add(
-            PromResponse(
-                prom_instance_id=schedule.id,
-                question_id=qid,
-                answer_value=answer.value,
-            )
-        )
-
-        total_score += answer.value
-        answered_count += 1
+    store_answers(db, [(schedule.id, schedule.prom_name, template.question_ids, answers)])
 
     schedule.status = "completed"
     schedule.completed_date = date.today()
 
-    db.commit()
-
-    # Simple scoring for MVP - Oxford sum
-    if schedule.prom_name == "OxfordKneeScore":
-        max_possible = answered_count * (questions[0].get("range_max", 5) if questions else 5)
-        score_payload = {
-            "prom_name": "OxfordKneeScore",
-            "type": "total",
-            "value": total_score,
-            "max_possible": max_possible,
-        }
+    try:
+        result = score_answers(get_scoring_plan(schedule.prom_name), answers)
+    except ValueError:
+        # Template can't be compiled into a scoring plan (e.g. unbounded items)
+        result = None
+
+    if result is not None:
+        # Stored with the responses so outcome views never re-aggregate answers
+        save_score(db, schedule.id, result)
+        update_outcomes(db, schedule_ids=[schedule.id])
+        score_payload = result.to_payload()
     else:
         score_payload = {
             "prom_name": schedule.prom_name,
@@ -191,11 +317,26 @@ def submit_prom_answers(
             "value": None,
         }
 
+    db.commit()
+    form_cache.invalidate([schedule.id])
+
     return {
         "message": "PROM submitted successfully",
         "schedule_id": schedule.id,
         "prom_name": schedule.prom_name,
         "status": schedule.status,
-        "answered_questions": answered_count,
+        "answered_questions": len(answers),
         "score": score_payload,
     }
+
+
+# --------------------------------------------------------
+# 5a. BATCH SUBMIT (PAPER FORMS / KIOSK SYNC)
+# --------------------------------------------------------
+@router.post("/submissions/batch")
+def submit_prom_batch(data: PromSubmitBatchIn, db: Session = Depends(get_db)):
+    """
+    Many answer sets in one request. Items are accepted or rejected one by
+    one: the response has a result per item (ok, or reason + error).
+    """
+    return submit_many(db, data.items)
@@ -0,0 +1,65 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from app.core.db import get_db
+from app.services.theatre_stats import daily_utilisation, duration_summary, parse_group_by
+
+router = APIRouter(prefix="/theatre", tags=["Theatre"])
+
+
+@router.get("/durations")
+def get_durations(
+    group_by: str | None = None,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    joint_type: str | None = None,
+    procedure_type: str | None = None,
+    surgeon_name: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Case duration distribution (mean, sd, p10-p90) for completed cases in a
+    date range; group_by=surgeon, procedure, joint or a combination.
+    """
+    try:
+        fields = parse_group_by(group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "group_by": list(fields),
+        "groups": duration_summary(
+            db,
+            group_by=fields,
+            date_from=date_from,
+            date_to=date_to,
+            joint_type=joint_type,
+            procedure_type=procedure_type,
+            surgeon_name=surgeon_name,
+        ),
+    }
+
+
+@router.get("/utilisation")
+def get_utilisation(
+    date_from: date | None = None,
+    date_to: date | None = None,
+    joint_type: str | None = None,
+    procedure_type: str | None = None,
+    surgeon_name: str | None = None,
+    db: Session = Depends(get_db),
+):
+    """Operating minutes per day against the scheduled session length."""
+    return {
+        "days": daily_utilisation(
+            db,
+            date_from=date_from,
+            date_to=date_to,
+            joint_type=joint_type,
+            procedure_type=procedure_type,
+            surgeon_name=surgeon_name,
+        ),
+    }
+
@@ -1,4 +1,4 @@
-from app.core.config import SessionLocal
+from app.core.config import SessionLocal, async_session_factory
 
 def get_db():
     db = SessionLocal()
@@ -6,3 +6,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    """For `async def` routes - DB I/O awaits instead of blocking the event loop."""
+    async with async_session_factory()() as db:
+        yield db
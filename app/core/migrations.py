@@ -0,0 +1,23 @@
+import os
+
+from alembic import command
+from alembic.config import Config
+
+from app.core.config import engine
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic.ini")
+
+
+def alembic_config() -> Config:
+    cfg = Config(ALEMBIC_INI)
+    # Keep the app's logging setup intact when migrating at startup
+    cfg.attributes["configure_logger"] = False
+    return cfg
+
+
+def upgrade_database(revision: str = "head") -> None:
+    """Bring the database schema up to `revision` (replaces create_all)."""
+    cfg = alembic_config()
+    with engine.begin() as connection:
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, revision)
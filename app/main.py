@@ -1,8 +1,18 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.models import prom_schedule
+from app.models import prom_schedule, prom_score
 
-from app.core.config import Base, engine
+from app.core.config import SessionLocal
+from app.core.migrations import upgrade_database
+from app.utils.prom_loader import registry as prom_registry
+from app.services.prom_protocols import load_protocols
+from app.services.intake_jobs import intake_worker
+from app.services.thumbnails import thumbnail_worker
+from app.services.prom_worklist import overdue_sweeper
+from app.services.outcomes import ensure_outcomes
+from app.services.theatre_stats import ensure_theatre_stats
 
 # Import models so SQLAlchemy registers tables
 from app.models import (
@@ -17,12 +27,42 @@ from app.api.patient_file_routes import router as patient_file_router
 from app.api.patient_create_full import router as patient_full_router
 from app.api.case_routes import router as case_router
 from app.api.prom_routes import router as prom_router   # <-- NEW CLEAN PROM ROUTES
+from app.api.outcome_routes import router as outcome_router
+from app.api.theatre_routes import router as theatre_router
+
+# Create / upgrade DB tables (alembic migrations in migrations/versions)
+upgrade_database()
+
+# Fill analytics rollups that a migration created or reset (no-op once filled)
+with SessionLocal() as db:
+    ensure_outcomes(db)
+    ensure_theatre_stats(db)
+
+# Load + validate PROM templates once (reloaded later only if a file changes)
+prom_registry.load_all()
+
+# Compile PROM protocols (joint/procedure -> instruments + timepoints)
+load_protocols()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background OCR intake workers (INTAKE_WORKERS=0 to disable)
+    intake_worker.start()
+    # File preview rendering (THUMB_WORKERS=0 to disable)
+    thumbnail_worker.start()
+    # Pending PROMs past their window -> overdue (OVERDUE_SWEEP_SECONDS=0 to disable)
+    overdue_sweeper.start()
+    try:
+        yield
+    finally:
+        overdue_sweeper.stop()
+        thumbnail_worker.stop()
+        intake_worker.stop()
 
-# Create DB tables
-Base.metadata.create_all(bind=engine)
 
 # FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Allow frontend to access backend
 app.add_middleware(
@@ -39,6 +79,8 @@ app.include_router(patient_file_router, prefix="/api")
 app.include_router(patient_full_router, prefix="/api")
 app.include_router(case_router, prefix="/api")
 app.include_router(prom_router, prefix="/api")   # CLEAN JSON PROMS
+app.include_router(outcome_router, prefix="/api")
+app.include_router(theatre_router, prefix="/api")
 
 @app.get("/")
 def root():
@@ -1,5 +1,19 @@
 from .patient import Patient
 from .patient_file import PatientFile
+from .file_blob import FileBlob
 from .case_episode import CaseEpisode
 from .prom_schedule import PromSchedule
 from .prom_response import PromResponse
+from .prom_answer_layout import PromAnswerLayout
+from .prom_answer_set import PromAnswerSet
+from .prom_score import PromScore
+from .prom_outcome_fact import PromOutcomeFact
+from .prom_outcome_rollup import PromOutcomeRollup
+from .prom_outcome_bin import PromOutcomeBin
+from .theatre_case_fact import TheatreCaseFact
+from .theatre_daily_rollup import TheatreDailyRollup
+from .theatre_daily_bin import TheatreDailyBin
+from .intake_job import IntakeJob
+from .ocr_cache_entry import OcrCacheEntry
+from .job_run import JobRun
+from .prom_reminder import PromReminder
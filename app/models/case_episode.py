@@ -1,9 +1,31 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from datetime import timezone
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from sqlalchemy.types import TypeDecorator
 from app.core.config import Base
+from app.utils.case_times import as_utc, to_hhmm
+
+
+class UTCDateTime(TypeDecorator):
+    """Aware datetimes stored as UTC (SQLite keeps no offset, so values come back tagged UTC)."""
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return as_utc(value)
+
+    def process_result_value(self, value, dialect):
+        if value is not None and value.tzinfo is None:
+            return value.replace(tzinfo=timezone.utc)
+        return value
 
 
 class CaseEpisode(Base):
     __tablename__ = "case_episodes"
+    __table_args__ = (
+        # Cases for a patient, newest surgery first
+        Index("ix_case_episodes_patient_id_date_of_surgery", "patient_id", "date_of_surgery"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
@@ -12,12 +34,12 @@ class CaseEpisode(Base):
     joint_type = Column(String, nullable=False)
     date_of_surgery = Column(Date, nullable=False)
 
-    # Keep as HH:MM strings for MVP
-    cutting_time = Column(String, nullable=True)   # "10:15"
-    closing_time = Column(String, nullable=True)   # "11:05"
+    # Knife to skin / closure (UTC). A case may run past midnight.
+    started_at = Column(UTCDateTime, nullable=True)
+    stopped_at = Column(UTCDateTime, nullable=True)
 
-    # Stored duration (minutes) - auto-calculated when times are set
-    duration_minutes = Column(Integer, nullable=True)
+    # Computed from started_at/stopped_at whenever they are written
+    duration_minutes = Column(Integer, nullable=True, index=True)
 
     # Consistent name across DB + schemas + routes
     case_status = Column(String, nullable=False, default="PLANNED")  # PLANNED / IN_PROGRESS / COMPLETED / CANCELLED
@@ -25,3 +47,12 @@ class CaseEpisode(Base):
     surgeon_name = Column(String, nullable=True)
     procedure_type = Column(String, nullable=True)
     implant_notes = Column(String, nullable=True)
+
+    # HH:MM wall-clock views (CASE_TIMEZONE) kept for the API
+    @property
+    def cutting_time(self) -> str | None:
+        return to_hhmm(self.started_at)
+
+    @property
+    def closing_time(self) -> str | None:
+        return to_hhmm(self.stopped_at)
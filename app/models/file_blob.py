@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime
+from app.core.config import Base
+
+
+class FileBlob(Base):
+    __tablename__ = "file_blobs"
+
+    # Content address: the file lives at uploaded_files/blobs/<sha[:2]>/<sha[2:4]>/<sha>
+    sha256 = Column(String, primary_key=True)
+
+    size = Column(Integer, nullable=False)
+    mime_type = Column(String, nullable=False)
+
+    # Rows pointing at this blob (patient_files + intake jobs not yet turned into one)
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,35 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
+from app.core.config import Base
+
+
+class IntakeJob(Base):
+    __tablename__ = "intake_jobs"
+    __table_args__ = (
+        # Workers claim the oldest queued job
+        Index("ix_intake_jobs_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    status = Column(String, nullable=False, default="queued")  # queued / running / done / failed
+
+    # Uploaded file waiting for OCR
+    file_path = Column(String, nullable=False)
+    filename = Column(String, nullable=False)
+    sha256 = Column(String, ForeignKey("file_blobs.sha256"), nullable=True)
+
+    # Results once done
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    patient_file_id = Column(Integer, ForeignKey("patient_files.id"), nullable=True)
+    parsed = Column(JSON, nullable=True)
+    error = Column(String, nullable=True)
+
+    attempts = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    # Refreshed by the worker running the job; a stale one means that worker is gone
+    heartbeat_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
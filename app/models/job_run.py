@@ -0,0 +1,15 @@
+from sqlalchemy import Column, String, Date, DateTime, JSON
+from app.core.config import Base
+
+
+class JobRun(Base):
+    """Last-run state of a periodic job (e.g. the overdue PROM sweep)."""
+    __tablename__ = "job_runs"
+
+    name = Column(String, primary_key=True)
+
+    # Date the job last processed up to; the next run starts from here
+    watermark = Column(Date, nullable=True)
+
+    last_run_at = Column(DateTime, nullable=True)
+    last_result = Column(JSON, nullable=True)
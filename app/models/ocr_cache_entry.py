@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, JSON
+from app.core.config import Base
+
+
+class OcrCacheEntry(Base):
+    __tablename__ = "ocr_cache"
+
+    # sha256(file bytes) + ":" + OCR settings fingerprint
+    cache_key = Column(String, primary_key=True)
+
+    sha256 = Column(String, nullable=False)
+    settings = Column(String, nullable=False)  # "dpi=300;lang=eng+afr;engine=5.3.0;..."
+
+    text = Column(Text, nullable=False)
+    parsed = Column(JSON, nullable=True)
+
+    # Approximate stored size, used for the LRU size bound
+    size_bytes = Column(Integer, nullable=False, default=0)
+    hits = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_used_at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
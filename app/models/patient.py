@@ -1,4 +1,5 @@
 from sqlalchemy import Column, Integer, String
+from sqlalchemy.orm import relationship
 from app.core.config import Base
 
 class Patient(Base):
@@ -22,3 +23,17 @@ class Patient(Base):
 
     # NEW — needed for PROM routing
     joint_type = Column(String, nullable=True)  # "shoulder" | "knee" | "hip"
+
+    # Read side for eager loading (GET /patients/{id}/overview); rows are
+    # still written through their own patient_id columns
+    cases = relationship(
+        "CaseEpisode",
+        order_by="(CaseEpisode.date_of_surgery.desc(), CaseEpisode.id.desc())",
+        viewonly=True,
+    )
+    files = relationship("PatientFile", order_by="PatientFile.id", viewonly=True)
+    prom_schedules = relationship(
+        "PromSchedule",
+        order_by="(PromSchedule.due_date, PromSchedule.id)",
+        viewonly=True,
+    )
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
 from app.core.config import Base
 
 class PatientFile(Base):
@@ -7,7 +9,14 @@ class PatientFile(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # Allow NULL for raw uploads (patient linked later)
-    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=True, index=True)
 
     file_path = Column(String, nullable=False)
     filename = Column(String, nullable=False)
+
+    # Content address in the blob store (NULL for files stored before it existed)
+    sha256 = Column(String, ForeignKey("file_blobs.sha256"), nullable=True, index=True)
+    size = Column(Integer, nullable=True)
+    mime_type = Column(String, nullable=True)
+
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow)
@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, JSON
+from app.core.config import Base
+
+
+class PromAnswerLayout(Base):
+    __tablename__ = "prom_answer_layouts"
+
+    # sha1(prom_name + question ids): a template version as far as packing goes
+    layout_key = Column(String, primary_key=True)
+
+    prom_name = Column(String, nullable=False)
+
+    # ["1", "2", ...] - position i of a packed answer array answers question_ids[i]
+    question_ids = Column(JSON, nullable=False)
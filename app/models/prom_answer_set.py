@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, String, JSON, ForeignKey
+from app.core.config import Base
+
+
+class PromAnswerSet(Base):
+    __tablename__ = "prom_answer_sets"
+
+    # All answers of one completed PROM instance, in a single row
+    schedule_id = Column(Integer, ForeignKey("prom_schedules.id"), primary_key=True)
+
+    layout_key = Column(String, ForeignKey("prom_answer_layouts.layout_key"), nullable=False)
+
+    # [3, 1, null, ...] aligned with the layout's question_ids (null = not answered)
+    answers = Column(JSON, nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String
+from app.core.config import Base
+
+
+class PromOutcomeBin(Base):
+    __tablename__ = "prom_outcome_bins"
+
+    # Histogram of a prom_outcome_rollups cohort, for medians
+    prom_name = Column(String, primary_key=True)
+    joint_type = Column(String, primary_key=True)
+    surgeon_name = Column(String, primary_key=True)
+    offset_days = Column(Integer, primary_key=True)
+
+    kind = Column(String, primary_key=True)   # "score" (0..100) or "delta" (-100..100)
+    bin = Column(Integer, primary_key=True)   # whole points
+    n = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+from app.core.config import Base
+
+
+class PromOutcomeFact(Base):
+    __tablename__ = "prom_outcome_facts"
+
+    # One row per scored PROM instance: what it contributes to prom_outcome_rollups
+    schedule_id = Column(Integer, ForeignKey("prom_schedules.id"), primary_key=True)
+    case_id = Column(Integer, ForeignKey("case_episodes.id"), nullable=False, index=True)
+
+    # Cohort (copied from the case so rollups can be corrected when it changes)
+    prom_name = Column(String, nullable=False)
+    joint_type = Column(String, nullable=False)    # upper case, "" if unknown
+    surgeon_name = Column(String, nullable=False)  # "" if unknown
+    offset_days = Column(Integer, nullable=False)  # timepoint, days from surgery
+
+    score = Column(Float, nullable=False)   # normalised 0-100
+    delta = Column(Float, nullable=True)    # score - pre-op score (post-op timepoints only)
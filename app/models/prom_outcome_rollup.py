@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, DateTime
+from app.core.config import Base
+
+
+class PromOutcomeRollup(Base):
+    __tablename__ = "prom_outcome_rollups"
+
+    # Finest cohort; joint / surgeon / overall views add these rows up
+    prom_name = Column(String, primary_key=True)
+    joint_type = Column(String, primary_key=True)
+    surgeon_name = Column(String, primary_key=True)
+    offset_days = Column(Integer, primary_key=True)
+
+    n_scores = Column(Integer, nullable=False, default=0)
+    sum_score = Column(Float, nullable=False, default=0)
+
+    n_deltas = Column(Integer, nullable=False, default=0)
+    sum_delta = Column(Float, nullable=False, default=0)
+    sum_delta_sq = Column(Float, nullable=False, default=0)
+
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint
+from app.core.config import Base
+
+
+class PromReminder(Base):
+    """
+    One reminder per (schedule, kind, channel). The unique constraint is the
+    idempotency key: a row is claimed before sending, so nobody is reminded
+    twice even with several dispatchers running.
+    """
+    __tablename__ = "prom_reminders"
+    __table_args__ = (
+        UniqueConstraint("schedule_id", "kind", "channel", name="uq_prom_reminders_schedule_kind_channel"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    schedule_id = Column(Integer, ForeignKey("prom_schedules.id"), nullable=False)
+    kind = Column(String, nullable=False)     # due / overdue
+    channel = Column(String, nullable=False)  # email / sms
+
+    recipient = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="sending")  # sending / sent / failed / rejected
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(String, nullable=True)
+
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
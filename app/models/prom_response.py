@@ -8,7 +8,7 @@ class PromResponse(Base):
     id = Column(Integer, primary_key=True, index=True)
 
     # This links each answer to a row in prom_schedules
-    prom_instance_id = Column(Integer, ForeignKey("prom_schedules.id"), nullable=False)
+    prom_instance_id = Column(Integer, ForeignKey("prom_schedules.id"), nullable=False, index=True)
 
     # Question ID from the template (e.g. 1, "P1", "Sy3")
     question_id = Column(String, nullable=False)
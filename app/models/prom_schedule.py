@@ -1,17 +1,32 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Index
+from sqlalchemy.orm import relationship
 from app.core.config import Base
 
 
 class PromSchedule(Base):
     __tablename__ = "prom_schedules"
+    __table_args__ = (
+        # Patient timeline (list_schedule) and due/overdue worklists
+        Index("ix_prom_schedules_patient_id_due_date", "patient_id", "due_date"),
+        Index("ix_prom_schedules_status_due_date", "status", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
     patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False)
-    case_id = Column(Integer, ForeignKey("case_episodes.id"), nullable=False)
+    case_id = Column(Integer, ForeignKey("case_episodes.id"), nullable=False, index=True)
 
     prom_name = Column(String, nullable=False)
     due_date = Column(Date, nullable=False)
 
-    status = Column(String, default="pending")  # pending / completed
+    # Protocol timepoint this row was planned from (see app/proms/protocols)
+    protocol = Column(String, nullable=True)
+    offset_days = Column(Integer, nullable=True)  # relative to surgery date
+    window_start = Column(Date, nullable=True)
+    window_end = Column(Date, nullable=True)
+
+    status = Column(String, default="pending")  # pending / completed / cancelled
     completed_date = Column(Date, nullable=True)
+
+    # Stored score, once completed (read only, see prom_scores.save_score)
+    score = relationship("PromScore", uselist=False, viewonly=True)
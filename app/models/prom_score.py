@@ -0,0 +1,26 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, ForeignKey
+from app.core.config import Base
+
+
+class PromScore(Base):
+    __tablename__ = "prom_scores"
+
+    # One computed score per completed PROM instance
+    schedule_id = Column(Integer, ForeignKey("prom_schedules.id"), primary_key=True)
+
+    prom_name = Column(String, nullable=False)
+
+    total = Column(Float, nullable=True)
+    max_possible = Column(Float, nullable=True)
+    normalised = Column(Float, nullable=True)  # 0-100, 100 = best
+
+    # {"pain": 72.2, "symptoms": 64.3, ...} for subscale instruments
+    subscales = Column(JSON, nullable=True)
+
+    answered = Column(Integer, nullable=False, default=0)
+
+    # ScoringPlan.version that produced this row (re-score when it changes)
+    plan_version = Column(String, nullable=False)
+    scored_at = Column(DateTime, nullable=False, default=datetime.utcnow)
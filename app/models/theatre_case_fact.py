@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from app.core.config import Base
+
+
+class TheatreCaseFact(Base):
+    __tablename__ = "theatre_case_facts"
+
+    # One row per completed case with a duration: what it contributes to theatre_daily_rollups
+    case_id = Column(Integer, ForeignKey("case_episodes.id"), primary_key=True)
+
+    # Cohort (copied from the case so rollups can be corrected when it changes)
+    day = Column(Date, nullable=False)
+    joint_type = Column(String, nullable=False)      # upper case, "" if unknown
+    procedure_type = Column(String, nullable=False)  # "" if unknown
+    surgeon_name = Column(String, nullable=False)    # "" if unknown
+
+    duration_minutes = Column(Integer, nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, Date
+from app.core.config import Base
+
+
+class TheatreDailyBin(Base):
+    __tablename__ = "theatre_daily_bins"
+
+    # Cases per whole-minute duration in a theatre_daily_rollups cohort-day, for percentiles
+    day = Column(Date, primary_key=True)
+    joint_type = Column(String, primary_key=True)
+    procedure_type = Column(String, primary_key=True)
+    surgeon_name = Column(String, primary_key=True)
+
+    minutes = Column(Integer, primary_key=True)
+    n = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,20 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime
+from app.core.config import Base
+
+
+class TheatreDailyRollup(Base):
+    __tablename__ = "theatre_daily_rollups"
+
+    # Finest cohort; date-range and per-surgeon/procedure/joint views add these rows up
+    day = Column(Date, primary_key=True)
+    joint_type = Column(String, primary_key=True)
+    procedure_type = Column(String, primary_key=True)
+    surgeon_name = Column(String, primary_key=True)
+
+    n_cases = Column(Integer, nullable=False, default=0)
+    sum_minutes = Column(Integer, nullable=False, default=0)
+    sum_minutes_sq = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
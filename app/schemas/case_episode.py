@@ -18,8 +18,12 @@ class CaseEpisodeBase(BaseModel):
     joint_type: str
     date_of_surgery: date
 
+    # Wall-clock HH:MM on the day of surgery (closing before cutting = next day)...
     cutting_time: Optional[str] = None
     closing_time: Optional[str] = None
+    # ...or exact timestamps (naive = theatre local time); these win if both are sent
+    started_at: Optional[datetime] = None
+    stopped_at: Optional[datetime] = None
 
     surgeon_name: Optional[str] = None
     procedure_type: Optional[str] = None
@@ -51,6 +55,8 @@ class CaseEpisodeUpdate(BaseModel):
     date_of_surgery: Optional[date] = None
     cutting_time: Optional[str] = None
     closing_time: Optional[str] = None
+    started_at: Optional[datetime] = None
+    stopped_at: Optional[datetime] = None
     surgeon_name: Optional[str] = None
     procedure_type: Optional[str] = None
     implant_notes: Optional[str] = None
@@ -0,0 +1,22 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel, ConfigDict
+
+
+class IntakeJobOut(BaseModel):
+    id: int
+    status: str  # queued / running / done / failed
+    filename: str
+
+    patient_id: Optional[int] = None
+    patient_file_id: Optional[int] = None
+    parsed: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    attempts: int = 0
+
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,12 @@
+from typing import Any, Dict, List
+
+from pydantic import BaseModel
+
+
+class Page(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: str | None = None
+
+    @classmethod
+    def build(cls, items: List[BaseModel], next_cursor: str | None, fields: set[str] | None = None) -> "Page":
+        return cls(items=[i.model_dump(include=fields) for i in items], next_cursor=next_cursor)
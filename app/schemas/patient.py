@@ -1,4 +1,10 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, ConfigDict
+
+from app.schemas.case_episode import CaseEpisodeOut
+from app.schemas.patient_file import PatientFileOut
+from app.schemas.prom_schedule import PromScheduleScoredOut
 
 class PatientBase(BaseModel):
     full_name: str
@@ -25,5 +31,11 @@ class PatientCreate(PatientBase):
 class PatientOut(PatientBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PatientOverviewOut(PatientOut):
+    """Everything the patient page shows, in one response."""
+    cases: List[CaseEpisodeOut] = []
+    files: List[PatientFileOut] = []
+    prom_schedules: List[PromScheduleScoredOut] = []
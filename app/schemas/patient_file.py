@@ -1,4 +1,7 @@
-from pydantic import BaseModel
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
 
 class PatientFileBase(BaseModel):
     patient_id: int
@@ -11,5 +14,9 @@ class PatientFileCreate(PatientFileBase):
 class PatientFileOut(PatientFileBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+    mime_type: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -7,6 +7,7 @@ class PromFormOut(BaseModel):
     schedule_id: int
     prom_name: str
     due_date: date
+    status: str | None = None
 
     patient_id: int
     case_id: int
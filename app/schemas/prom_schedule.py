@@ -1,5 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, model_validator
 from datetime import date
+from typing import Dict, List, Optional
 
 class PromScheduleBase(BaseModel):
     patient_id: int
@@ -10,6 +11,67 @@ class PromScheduleBase(BaseModel):
 
 class PromScheduleOut(PromScheduleBase):
     id: int
+    completed_date: Optional[date] = None
 
-    class Config:
-        orm_mode = True
+    protocol: Optional[str] = None
+    offset_days: Optional[int] = None
+    window_start: Optional[date] = None
+    window_end: Optional[date] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PromScoreOut(BaseModel):
+    total: Optional[float] = None
+    max_possible: Optional[float] = None
+    normalised: Optional[float] = None
+    subscales: Optional[Dict[str, Optional[float]]] = None
+    plan_version: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PromScheduleScoredOut(PromScheduleOut):
+    # Only set for completed instances
+    score: Optional[PromScoreOut] = None
+
+
+class PromBulkScheduleIn(BaseModel):
+    """Either explicit case_ids or a filter (at least one criterion)."""
+    case_ids: Optional[List[int]] = None
+
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    joint_type: Optional[str] = None
+    surgeon_name: Optional[str] = None
+    case_status: Optional[str] = None
+
+    dry_run: bool = False
+
+    @model_validator(mode="after")
+    def check_selection(self):
+        filters = (self.date_from, self.date_to, self.joint_type, self.surgeon_name, self.case_status)
+        if self.case_ids is None and all(f is None for f in filters):
+            raise ValueError("Give case_ids or at least one filter")
+        if self.case_ids is not None and any(f is not None for f in filters):
+            raise ValueError("Give either case_ids or filters, not both")
+        return self
+
+
+class PromWorklistItemOut(BaseModel):
+    id: int
+    patient_id: int
+    case_id: int
+    prom_name: str
+    due_date: date
+    window_start: Optional[date] = None
+    window_end: Optional[date] = None
+    status: str
+    completed_date: Optional[date] = None
+
+    patient_name: Optional[str] = None
+    surgeon_name: Optional[str] = None
+    joint_type: Optional[str] = None
+    date_of_surgery: Optional[date] = None
+
+    model_config = ConfigDict(from_attributes=True)
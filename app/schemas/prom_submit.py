@@ -1,9 +1,21 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List
 
+SUBMIT_BATCH_MAX = 1000
+
+
 class PromAnswer(BaseModel):
     id: str | int
     value: int
 
 class PromSubmitIn(BaseModel):
     answers: List[PromAnswer]
+
+
+class PromSubmitItemIn(PromSubmitIn):
+    schedule_id: int
+
+
+class PromSubmitBatchIn(BaseModel):
+    # Bounded so each batch is one IN (...) per query
+    items: List[PromSubmitItemIn] = Field(..., min_length=1, max_length=SUBMIT_BATCH_MAX)
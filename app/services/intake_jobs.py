@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, null, or_, select, update
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import SessionLocal
+from app.models.file_blob import FileBlob
+from app.models.intake_job import IntakeJob
+from app.models.patient import Patient
+from app.models.patient_file import PatientFile
+from app.services.ocr_cache import OcrResultCache, ocr_cache, sha256_file
+from app.services.patient_files import release_blob, remove_blob_file
+
+log = logging.getLogger(__name__)
+
+# Worker processes running OCR (0 disables the worker, e.g. for API-only nodes)
+INTAKE_WORKERS = int(os.getenv("INTAKE_WORKERS", "2"))
+INTAKE_POLL_SECONDS = float(os.getenv("INTAKE_POLL_SECONDS", "1.0"))
+INTAKE_MAX_ATTEMPTS = int(os.getenv("INTAKE_MAX_ATTEMPTS", "3"))
+# A running job whose heartbeat is older than this goes back to the queue
+INTAKE_LEASE_SECONDS = float(os.getenv("INTAKE_LEASE_SECONDS", "300"))
+
+
+def run_intake_extraction(file_path: str) -> dict:
+    """
+    Runs in a worker process: read the intake form from page 1, using the
+    PDF text layer when present and OCR of the form region otherwise.
+    """
+    from app.services.pdf_extraction import extract_intake
+
+    return extract_intake(file_path)
+
+
+class DatabaseJobQueue:
+    """
+    Job queue stored in the intake_jobs table (the default, local backend).
+    Producers just insert a 'queued' row; claiming is a conditional UPDATE,
+    so several workers can share a table.
+
+    A claim is a lease: the worker keeps heartbeat_at fresh while the job
+    runs, and only jobs whose heartbeat has gone stale are requeued.
+    `attempts` identifies the claim - complete() and fail() only apply to
+    the attempt the caller claimed, so a job that was requeued and picked
+    up elsewhere is never finished twice.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal):
+        self.session_factory = session_factory
+
+    def claim(self, limit: int) -> list[IntakeJob]:
+        claimed = []
+        with self.session_factory() as db:
+            candidates = db.execute(
+                select(IntakeJob.id)
+                .where(IntakeJob.status == "queued")
+                .order_by(IntakeJob.id)
+                .limit(limit)
+            ).scalars().all()
+
+            for job_id in candidates:
+                result = db.execute(
+                    update(IntakeJob)
+                    .where(IntakeJob.id == job_id, IntakeJob.status == "queued")
+                    .values(
+                        status="running",
+                        started_at=datetime.utcnow(),
+                        heartbeat_at=datetime.utcnow(),
+                        attempts=IntakeJob.attempts + 1,
+                    )
+                )
+                if result.rowcount == 1:
+                    claimed.append(job_id)
+            db.commit()
+
+            if not claimed:
+                return []
+            return db.execute(select(IntakeJob).where(IntakeJob.id.in_(claimed))).scalars().all()
+
+    def _claimed(self, job_id: int, attempt: int):
+        return IntakeJob.id == job_id, IntakeJob.status == "running", IntakeJob.attempts == attempt
+
+    def complete(self, job_id: int, attempt: int, parsed: dict) -> None:
+        """Create the patient + file from the parsed form and mark the job done."""
+        with self.session_factory() as db:
+            job = db.execute(
+                update(IntakeJob)
+                .where(*self._claimed(job_id, attempt))
+                .values(status="done", parsed=parsed, error=None, finished_at=datetime.utcnow())
+                .returning(IntakeJob.file_path, IntakeJob.filename, IntakeJob.sha256)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if job is None:
+                log.warning("Intake job %s attempt %s is no longer running; result dropped", job_id, attempt)
+                return
+
+            patient = Patient(
+                full_name=parsed.get("full_name") or "Unknown (OCR intake)",
+                preferred_name=parsed.get("preferred_name"),
+                id_number=parsed.get("id_number"),
+                email=parsed.get("email"),
+                phone=parsed.get("phone"),
+            )
+            db.add(patient)
+            db.flush()
+
+            # The job's blob reference passes to the file record
+            blob = db.get(FileBlob, job.sha256) if job.sha256 else None
+            record = PatientFile(
+                patient_id=patient.id,
+                file_path=job.file_path,
+                filename=job.filename,
+                sha256=job.sha256,
+                size=blob.size if blob else None,
+                mime_type=blob.mime_type if blob else None,
+            )
+            db.add(record)
+            db.flush()
+
+            db.execute(
+                update(IntakeJob)
+                .where(IntakeJob.id == job_id)
+                .values(patient_id=patient.id, patient_file_id=record.id)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+
+    def fail(self, job_id: int, attempt: int, error: str) -> None:
+        with self.session_factory() as db:
+            # Retry transient failures until attempts run out
+            job = db.execute(
+                update(IntakeJob)
+                .where(*self._claimed(job_id, attempt))
+                .values(
+                    status=case((IntakeJob.attempts < INTAKE_MAX_ATTEMPTS, "queued"), else_="failed"),
+                    error=error[:2000],
+                    heartbeat_at=None,
+                    finished_at=case((IntakeJob.attempts < INTAKE_MAX_ATTEMPTS, null()), else_=datetime.utcnow()),
+                )
+                .returning(IntakeJob.status, IntakeJob.sha256)
+                .execution_options(synchronize_session=False)
+            ).first()
+
+            orphaned = None
+            if job is not None and job.status == "failed" and job.sha256:
+                # The job's blob reference would only have passed to a PatientFile
+                db.execute(
+                    update(IntakeJob)
+                    .where(IntakeJob.id == job_id)
+                    .values(sha256=None)
+                    .execution_options(synchronize_session=False)
+                )
+                orphaned = release_blob(db, job.sha256)
+            db.commit()
+
+        if orphaned:
+            remove_blob_file(orphaned)
+
+    def heartbeat(self, job_ids: list[int]) -> None:
+        if not job_ids:
+            return
+        with self.session_factory() as db:
+            db.execute(
+                update(IntakeJob)
+                .where(IntakeJob.id.in_(job_ids), IntakeJob.status == "running")
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.commit()
+
+    def release(self, claims: list[tuple[int, int]]) -> int:
+        """Claimed (job_id, attempt)s that were never started go back to the queue."""
+        released = 0
+        with self.session_factory() as db:
+            for job_id, attempt in claims:
+                result = db.execute(
+                    update(IntakeJob)
+                    .where(*self._claimed(job_id, attempt))
+                    .values(status="queued", started_at=None, heartbeat_at=None)
+                )
+                released += result.rowcount
+            db.commit()
+        return released
+
+    def requeue_expired(self, lease_seconds: float = INTAKE_LEASE_SECONDS) -> int:
+        """Running jobs whose worker stopped heartbeating (crashed / killed) go back to the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+        with self.session_factory() as db:
+            result = db.execute(
+                update(IntakeJob)
+                .where(
+                    IntakeJob.status == "running",
+                    or_(IntakeJob.heartbeat_at.is_(None), IntakeJob.heartbeat_at < cutoff),
+                )
+                .values(status="queued", started_at=None, heartbeat_at=None)
+            )
+            db.commit()
+            return result.rowcount
+
+
+class IntakeWorker:
+    """
+    Dispatcher thread that claims queued jobs and runs extraction/OCR in a
+    process pool, so the API event loop never does OCR itself. Files already
+    seen (same bytes, same settings) are answered from the OCR cache.
+    """
+
+    def __init__(
+        self,
+        queue: DatabaseJobQueue,
+        cache: OcrResultCache,
+        workers: int = INTAKE_WORKERS,
+        poll_seconds: float = INTAKE_POLL_SECONDS,
+        lease_seconds: float = INTAKE_LEASE_SECONDS,
+    ):
+        self.queue = queue
+        self.cache = cache
+        self.workers = workers
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._last_heartbeat = 0.0
+
+        self._pool: ProcessPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._in_flight: set[int] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._thread is not None:
+            return
+        self.queue.requeue_expired(self.lease_seconds)
+        self._stop.clear()
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        self._thread = threading.Thread(target=self._loop, name="intake-dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def notify(self) -> None:
+        """Wake the dispatcher now instead of at the next poll."""
+        self._wake.set()
+
+    def _keep_leases(self) -> None:
+        """Heartbeat our running jobs and reclaim those of dead workers, a few times per lease."""
+        now = time.monotonic()
+        if now - self._last_heartbeat < self.lease_seconds / 3:
+            return
+        self._last_heartbeat = now
+        with self._lock:
+            running = list(self._in_flight)
+        self.queue.heartbeat(running)
+        self.queue.requeue_expired(self.lease_seconds)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._keep_leases()
+            except Exception:
+                log.exception("Failed to refresh intake job leases")
+
+            with self._lock:
+                free = self.workers - len(self._in_flight)
+
+            if free > 0:
+                pending: list[IntakeJob] = []
+                try:
+                    pending = self.queue.claim(free)
+                    while pending:
+                        self._submit(pending[0])
+                        pending.pop(0)
+                except Exception:
+                    log.exception("Failed to dispatch intake jobs")
+                    self._release(pending)
+
+            self._wake.wait(self.poll_seconds)
+            self._wake.clear()
+
+    def _release(self, jobs: list[IntakeJob]) -> None:
+        """Requeue claimed jobs that were not handed to the pool (instead of waiting out their lease)."""
+        if not jobs:
+            return
+        with self._lock:
+            self._in_flight.difference_update(job.id for job in jobs)
+        try:
+            self.queue.release([(job.id, job.attempts) for job in jobs])
+        except Exception:
+            log.exception("Failed to release intake jobs; they are requeued when their lease expires")
+
+    def _submit(self, job: IntakeJob) -> None:
+        try:
+            sha256 = job.sha256 or sha256_file(job.file_path)
+            cached = self.cache.get(sha256)
+        except OSError as e:
+            self.queue.fail(job.id, job.attempts, f"{type(e).__name__}: {e}")
+            return
+
+        if cached is not None:
+            self.queue.complete(job.id, job.attempts, cached.parsed or {})
+            return
+
+        with self._lock:
+            self._in_flight.add(job.id)
+        future = self._pool.submit(run_intake_extraction, job.file_path)
+        future.add_done_callback(
+            lambda f, job_id=job.id, attempt=job.attempts: self._finished(job_id, attempt, sha256, f)
+        )
+
+    def _finished(self, job_id: int, attempt: int, sha256: str, future: Future) -> None:
+        try:
+            if future.cancelled():
+                return
+            exc = future.exception()
+            if exc is not None:
+                self.queue.fail(job_id, attempt, f"{type(exc).__name__}: {exc}")
+            else:
+                result = future.result()
+                self.cache.put(sha256, result["text"], result["parsed"])
+                self.queue.complete(job_id, attempt, result["parsed"])
+        except Exception:
+            log.exception("Failed to record result of intake job %s", job_id)
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+            self._wake.set()
+
+
+job_queue = DatabaseJobQueue()
+intake_worker = IntakeWorker(job_queue, ocr_cache)
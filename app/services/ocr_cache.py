@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import SessionLocal
+from app.models.ocr_cache_entry import OcrCacheEntry
+from app.services.pdf_extraction import extraction_fingerprint
+
+OCR_CACHE_MAX_BYTES = int(os.getenv("OCR_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedOcr:
+    sha256: str
+    text: str
+    parsed: dict | None
+
+
+class OcrResultCache:
+    """
+    Persistent OCR results keyed by file content + OCR settings, so a
+    re-uploaded referral skips rasterisation and Tesseract entirely.
+
+    Bounded by total stored bytes; least recently used entries go first.
+    """
+
+    def __init__(self, session_factory: sessionmaker = SessionLocal, max_bytes: int = OCR_CACHE_MAX_BYTES):
+        self.session_factory = session_factory
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key_for(sha256: str, settings: str | None = None) -> str:
+        return f"{sha256}:{settings or extraction_fingerprint()}"
+
+    def get(self, sha256: str) -> CachedOcr | None:
+        key = self.key_for(sha256)
+        with self.session_factory() as db:
+            entry = db.get(OcrCacheEntry, key)
+            if entry is None:
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            entry.hits += 1
+            entry.last_used_at = datetime.utcnow()
+            result = CachedOcr(sha256=entry.sha256, text=entry.text, parsed=entry.parsed)
+            db.commit()
+
+        with self._lock:
+            self.hits += 1
+        return result
+
+    def put(self, sha256: str, text: str, parsed: dict | None) -> None:
+        settings = extraction_fingerprint()
+        size = len(text.encode("utf-8")) + len(repr(parsed or {}))
+
+        with self.session_factory() as db:
+            db.merge(OcrCacheEntry(
+                cache_key=self.key_for(sha256, settings),
+                sha256=sha256,
+                settings=settings,
+                text=text,
+                parsed=parsed,
+                size_bytes=size,
+                hits=0,
+                created_at=datetime.utcnow(),
+                last_used_at=datetime.utcnow(),
+            ))
+            db.flush()
+            self._evict(db)
+            db.commit()
+
+    def _evict(self, db) -> None:
+        total = db.execute(select(func.coalesce(func.sum(OcrCacheEntry.size_bytes), 0))).scalar_one()
+        if total <= self.max_bytes:
+            return
+
+        # Walk from least recently used (indexed) until back under the bound
+        for key, size in db.execute(
+            select(OcrCacheEntry.cache_key, OcrCacheEntry.size_bytes).order_by(OcrCacheEntry.last_used_at)
+        ).all():
+            if total <= self.max_bytes:
+                break
+            db.query(OcrCacheEntry).filter(OcrCacheEntry.cache_key == key).delete(synchronize_session=False)
+            total -= size
+            with self._lock:
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self.session_factory() as db:
+            entries, stored = db.execute(
+                select(func.count(), func.coalesce(func.sum(OcrCacheEntry.size_bytes), 0)).select_from(OcrCacheEntry)
+            ).one()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "stored_bytes": stored,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+ocr_cache = OcrResultCache()
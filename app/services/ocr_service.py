@@ -0,0 +1,36 @@
+import os
+from functools import lru_cache
+
+import fitz  # PyMuPDF
+
+from app.utils.pdf_reader import RelRect, region_rect, render_page
+
+# Settings that change OCR output. They are part of the OCR cache key, so
+# changing any of them (or upgrading Tesseract) naturally bypasses old results.
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "eng+afr")
+
+
+def _pytesseract():
+    # pdf_parser configures pytesseract's tesseract_cmd on import
+    from app.utils.pdf_parser import pytesseract
+
+    return pytesseract
+
+
+@lru_cache(maxsize=1)
+def ocr_engine_version() -> str:
+    try:
+        return str(_pytesseract().get_tesseract_version())
+    except Exception:
+        return "unknown"
+
+
+def ocr_settings_fingerprint() -> str:
+    return f"dpi={OCR_DPI};lang={OCR_LANG};engine={ocr_engine_version()}"
+
+
+def ocr_page(page: fitz.Page, region: RelRect | None = None, dpi: int = OCR_DPI, lang: str = OCR_LANG) -> str:
+    """OCR a page, or only `region` of it (fractions of the page size)."""
+    clip = region_rect(page, region) if region else None
+    return _pytesseract().image_to_string(render_page(page, dpi, clip), lang=lang)
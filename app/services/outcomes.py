@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Iterable, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.case_episode import CaseEpisode
+from app.models.prom_outcome_bin import PromOutcomeBin
+from app.models.prom_outcome_fact import PromOutcomeFact
+from app.models.prom_outcome_rollup import PromOutcomeRollup
+from app.models.prom_schedule import PromSchedule
+from app.models.prom_score import PromScore
+from app.services import rollups
+from app.services.rollups import Rollup, RollupSpec, norm
+
+# Histogram bins: whole points, scores 0..100 and deltas -100..100
+SCORE_BINS = 101
+DELTA_OFFSET = 100
+
+# Rows per fetch in rebuild_outcomes()
+REBUILD_CHUNK_SIZE = 5000
+
+GROUP_FIELDS = {"joint": "joint_type", "surgeon": "surgeon_name"}
+
+_TIMEPOINT_LABELS = {42: "6w", 90: "3m", 180: "6m", 365: "12m", 730: "24m"}
+
+
+def timepoint_label(offset_days: int) -> str:
+    if offset_days <= 0:
+        return "pre-op"
+    return _TIMEPOINT_LABELS.get(offset_days, f"{offset_days}d")
+
+
+def parse_group_by(group_by: str | None) -> tuple[str, ...]:
+    """'surgeon,joint' -> ("joint_type", "surgeon_name"); None -> by instrument only."""
+    return rollups.parse_group_by(group_by, GROUP_FIELDS)
+
+
+def _bin(value: float, lo: int, hi: int) -> int:
+    return min(max(int(round(value)), lo), hi)
+
+
+# =========================================================
+# FACTS (one per scored instance)
+# =========================================================
+@dataclass(frozen=True)
+class Fact:
+    schedule_id: int
+    case_id: int
+    prom_name: str
+    joint_type: str
+    surgeon_name: str
+    offset_days: int
+    score: float
+    delta: float | None
+
+    @property
+    def cohort(self) -> tuple[str, str, str, int]:
+        return self.prom_name, self.joint_type, self.surgeon_name, self.offset_days
+
+    def as_row(self) -> dict:
+        return {
+            "schedule_id": self.schedule_id,
+            "case_id": self.case_id,
+            "prom_name": self.prom_name,
+            "joint_type": self.joint_type,
+            "surgeon_name": self.surgeon_name,
+            "offset_days": self.offset_days,
+            "score": self.score,
+            "delta": self.delta,
+        }
+
+    def contribution(self) -> tuple[dict, list[tuple]]:
+        sums = {"n_scores": 1, "sum_score": self.score}
+        bins = [("score", _bin(self.score, 0, SCORE_BINS - 1))]
+        if self.delta is not None:
+            sums.update(n_deltas=1, sum_delta=self.delta, sum_delta_sq=self.delta * self.delta)
+            bins.append(("delta", _bin(self.delta, -DELTA_OFFSET, DELTA_OFFSET)))
+        return sums, bins
+
+
+def _scored_rows(db: Session, *conditions):
+    """Scored instances with their case, ordered so each (case, instrument) is contiguous."""
+    return db.execute(
+        select(
+            PromSchedule.id,
+            PromSchedule.case_id,
+            PromSchedule.prom_name,
+            PromSchedule.offset_days,
+            PromSchedule.due_date,
+            CaseEpisode.date_of_surgery,
+            CaseEpisode.joint_type,
+            CaseEpisode.surgeon_name,
+            PromScore.normalised,
+        )
+        .join(PromScore, PromScore.schedule_id == PromSchedule.id)
+        .join(CaseEpisode, CaseEpisode.id == PromSchedule.case_id)
+        .where(PromScore.normalised.is_not(None), *conditions)
+        .order_by(PromSchedule.case_id, PromSchedule.prom_name, PromSchedule.id)
+        .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    )
+
+
+def _facts(rows: Iterable) -> Iterable[Fact]:
+    """
+    Facts per (case, instrument) group. The pre-op score is the one at the
+    latest timepoint on or before surgery; post-op timepoints get a delta
+    against it.
+    """
+    for _, group in groupby(rows, key=lambda r: (r.case_id, r.prom_name)):
+        group = list(group)
+        offsets = [
+            r.offset_days if r.offset_days is not None else (r.due_date - r.date_of_surgery).days
+            for r in group
+        ]
+        pre_op = [(off, r.normalised) for off, r in zip(offsets, group) if off <= 0]
+        baseline = max(pre_op)[1] if pre_op else None
+
+        for off, r in zip(offsets, group):
+            yield Fact(
+                schedule_id=r.id,
+                case_id=r.case_id,
+                prom_name=r.prom_name,
+                joint_type=norm(r.joint_type, upper=True),
+                surgeon_name=norm(r.surgeon_name),
+                offset_days=off,
+                score=r.normalised,
+                delta=(r.normalised - baseline) if off > 0 and baseline is not None else None,
+            )
+
+
+# =========================================================
+# ROLLUPS (sums + histograms per finest cohort)
+# =========================================================
+SPEC = RollupSpec(
+    fact_cls=Fact,
+    fact_model=PromOutcomeFact,
+    fact_id="schedule_id",
+    scope="case_id",
+    rollup_model=PromOutcomeRollup,
+    bin_model=PromOutcomeBin,
+    key=("prom_name", "joint_type", "surgeon_name", "offset_days"),
+    sums=("n_scores", "sum_score", "n_deltas", "sum_delta", "sum_delta_sq"),
+    bin_cols=("kind", "bin"),
+    count="n_scores",
+)
+
+
+def update_outcomes(db: Session, schedule_ids: Sequence[int] = (), case_ids: Sequence[int] = ()) -> int:
+    """
+    Bring facts and rollups up to date for the cases behind the given
+    schedules / cases, e.g. after a submission (a pre-op score changes the
+    deltas of its case's later timepoints) or a surgeon change.
+
+    Only the difference between the old and new facts of those cases is
+    applied to the rollups. Does not commit. Returns the facts changed.
+    """
+    db.flush()  # the session does not autoflush; read the caller's pending changes
+    cases = set(case_ids)
+    if schedule_ids:
+        cases.update(db.execute(
+            select(PromSchedule.case_id).where(PromSchedule.id.in_(list(schedule_ids)))
+        ).scalars())
+    if not cases:
+        return 0
+
+    cases = list(cases)
+    return rollups.sync_facts(db, SPEC, cases, _facts(_scored_rows(db, PromSchedule.case_id.in_(cases))))
+
+
+def rebuild_outcomes(db: Session) -> dict:
+    """
+    Recompute every fact and rollup from prom_scores in one streaming pass
+    (set-based reads, bulk inserts, one commit). For first use and repairs.
+    """
+    rollups.clear(db, SPEC)
+    totals = rollups.write_facts(db, SPEC, _facts(_scored_rows(db)))
+    rollups.write_rollups(db, SPEC, totals)
+
+    db.commit()
+    return {"facts": sum(int(r.get("n_scores")) for r in totals.values()), "cohorts": len(totals)}
+
+
+def ensure_outcomes(db: Session) -> dict | None:
+    """Rebuild once at startup if scores exist but no facts do (new or reset tables)."""
+    scored = select(PromScore.schedule_id).where(PromScore.normalised.is_not(None))
+    return rollups.rebuild_if_empty(db, SPEC, scored, rebuild_outcomes)
+
+
+# =========================================================
+# DASHBOARD READS
+# =========================================================
+def _median(rollup: Rollup, kind: str, n: int) -> float | None:
+    """Median to the nearest point from a whole-point histogram."""
+    if n <= 0:
+        return None
+    hist = {b: c for (k, b), c in rollup.bins.items() if k == kind}
+    lo_rank, hi_rank = (n - 1) // 2, n // 2
+    lo = hi = None
+    seen = 0
+    for b in sorted(hist):
+        seen += hist[b]
+        if lo is None and seen > lo_rank:
+            lo = b
+        if seen > hi_rank:
+            hi = b
+            break
+    return (lo + hi) / 2
+
+
+def outcome_summary(
+    db: Session,
+    group_by: tuple[str, ...] = (),
+    prom_name: str | None = None,
+    joint_type: str | None = None,
+    surgeon_name: str | None = None,
+) -> list[dict]:
+    """
+    Mean / median score and change from pre-op per timepoint, per
+    instrument and the requested cohort fields. Reads only the rollups.
+    """
+    conditions = []
+    if prom_name:
+        conditions.append(PromOutcomeRollup.prom_name == prom_name)
+    if joint_type:
+        conditions.append(PromOutcomeRollup.joint_type == norm(joint_type, upper=True))
+    if surgeon_name is not None:
+        conditions.append(PromOutcomeRollup.surgeon_name == norm(surgeon_name))
+
+    cohorts: dict[tuple, dict[int, Rollup]] = {}
+    for cohort, rollup in rollups.read_rollups(db, SPEC, *conditions):
+        key = (cohort["prom_name"], *(cohort[f] for f in group_by))
+        cohorts.setdefault(key, {}).setdefault(cohort["offset_days"], Rollup()).merge(rollup)
+
+    out = []
+    for key in sorted(cohorts):
+        timepoints = []
+        for offset in sorted(cohorts[key]):
+            acc = cohorts[key][offset]
+            n_scores = int(acc.get("n_scores"))
+            n = int(acc.get("n_deltas"))
+            sum_delta = acc.get("sum_delta")
+            variance = (acc.get("sum_delta_sq") - sum_delta ** 2 / n) / (n - 1) if n > 1 else None
+            timepoints.append({
+                "offset_days": offset,
+                "timepoint": timepoint_label(offset),
+                "n": n_scores,
+                "mean_score": round(acc.get("sum_score") / n_scores, 2) if n_scores else None,
+                "median_score": _median(acc, "score", n_scores),
+                "n_delta": n,
+                "mean_delta": round(sum_delta / n, 2) if n else None,
+                "median_delta": _median(acc, "delta", n),
+                "sd_delta": round(math.sqrt(max(variance, 0.0)), 2) if variance is not None else None,
+            })
+        out.append({"prom_name": key[0], **dict(zip(group_by, key[1:])), "timepoints": timepoints})
+    return out
+
+
+if __name__ == "__main__":
+    # python -m app.services.outcomes  (rebuild facts + rollups from stored scores)
+    rollups.run_rebuild_cli("Rebuild PROM outcome rollups from prom_scores", rebuild_outcomes)
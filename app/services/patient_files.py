@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app.models.file_blob import FileBlob
+from app.models.patient_file import PatientFile
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploaded_files")
+BLOB_DIR = os.path.join(UPLOAD_DIR, "blobs")
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+
+# Blob files younger than this are never deleted: an upload of the same bytes
+# may have just (re)written the file and not yet committed its reference.
+BLOB_DELETE_GRACE_SECONDS = int(os.getenv("BLOB_DELETE_GRACE_SECONDS", "60"))
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9._-]+")
+_CONTROL_CHARS = re.compile(r"[\x00-\x1f\x7f]")
+
+# Leading bytes -> type, checked before trusting the client's content type
+_MAGIC = (
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+
+
+class UploadTooLarge(ValueError):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File exceeds the {max_bytes // (1024 * 1024)} MB upload limit")
+        self.max_bytes = max_bytes
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: str
+    filename: str
+    sha256: str
+    size: int
+    mime_type: str
+
+
+def display_filename(filename: str | None) -> str:
+    """
+    The uploaded name as the user gave it, minus any directory part and
+    control characters. Stored as is; headers use safe_filename().
+    """
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = _CONTROL_CHARS.sub("", name).strip()
+    return name[:255] or "upload"
+
+
+def safe_filename(filename: str | None) -> str:
+    name = os.path.basename((filename or "").replace("\\", "/"))
+    name = _UNSAFE_CHARS.sub("_", name).strip("._")
+    return name[:120] or "upload"
+
+
+def blob_path(sha256: str) -> str:
+    """Hash-sharded location of a blob: blobs/ab/cd/abcd...  (<= 65536 dirs)."""
+    return f"{BLOB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}".replace(os.sep, "/")
+
+
+def detect_mime_type(head: bytes, filename: str | None, content_type: str | None = None) -> str:
+    for magic, mime_type in _MAGIC:
+        if head.startswith(magic):
+            return mime_type
+    if content_type and content_type != "application/octet-stream":
+        return content_type
+    return mimetypes.guess_type(filename or "")[0] or "application/octet-stream"
+
+
+def _copy_to_temp(src: BinaryIO, directory: str, max_bytes: int) -> tuple[str, str, int, bytes]:
+    """Chunked copy into a temp file in `directory`, hashing as we go."""
+    h = hashlib.sha256()
+    size = 0
+    head = b""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(CHUNK_SIZE):
+                if not head:
+                    head = chunk[:16]
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(max_bytes)
+                h.update(chunk)
+                out.write(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return tmp_path, h.hexdigest(), size, head
+
+
+def _place_blob(tmp_path: str, sha256: str) -> str:
+    final_path = blob_path(sha256)
+    os.makedirs(os.path.dirname(final_path), exist_ok=True)
+    # Same hash = same bytes, so replacing an existing blob is harmless; it
+    # also refreshes the mtime that protects it from a concurrent delete.
+    os.replace(tmp_path, final_path)
+    return final_path
+
+
+def _store_sync(src: BinaryIO, filename: str | None, content_type: str | None, max_bytes: int) -> StoredFile:
+    os.makedirs(BLOB_DIR, exist_ok=True)
+
+    tmp_path, sha256, size, head = _copy_to_temp(src, BLOB_DIR, max_bytes)
+    path = _place_blob(tmp_path, sha256)
+
+    return StoredFile(
+        path=path,
+        filename=display_filename(filename),
+        sha256=sha256,
+        size=size,
+        mime_type=detect_mime_type(head, filename, content_type),
+    )
+
+
+async def store_upload(upload: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> StoredFile:
+    """
+    Stream an upload into the blob store off the event loop: one pass
+    computes the SHA-256 and byte count, enforces `max_bytes`, and the file
+    only appears at its content address once it is complete. Identical
+    uploads share one physical copy.
+
+    The caller records the reference with acquire_blob() in the same
+    transaction as the row that points at it.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(max_bytes)
+
+    return await run_in_threadpool(_store_sync, upload.file, upload.filename, upload.content_type, max_bytes)
+
+
+# =========================================================
+# REFERENCE COUNTING
+# =========================================================
+def acquire_blob(db: Session, stored: StoredFile) -> bool:
+    """
+    Count one more reference to `stored`'s blob (creating its row on first
+    use). Returns True if the content was already in the store.
+    Does not commit.
+    """
+    incr = (
+        update(FileBlob)
+        .where(FileBlob.sha256 == stored.sha256)
+        .values(ref_count=FileBlob.ref_count + 1)
+    )
+    if db.execute(incr).rowcount:
+        return True
+
+    try:
+        with db.begin_nested():
+            db.execute(
+                insert(FileBlob).values(
+                    sha256=stored.sha256,
+                    size=stored.size,
+                    mime_type=stored.mime_type,
+                    ref_count=1,
+                )
+            )
+        return False
+    except IntegrityError:
+        # Another request inserted it first
+        db.execute(incr)
+        return True
+
+
+def release_blob(db: Session, sha256: str | None) -> str | None:
+    """
+    Drop one reference. When none are left the blob row is deleted and its
+    path returned, to be removed with remove_blob_file() after commit.
+    """
+    if sha256 is None:
+        return None
+
+    db.execute(
+        update(FileBlob)
+        .where(FileBlob.sha256 == sha256, FileBlob.ref_count > 0)
+        .values(ref_count=FileBlob.ref_count - 1)
+    )
+    blob = db.get(FileBlob, sha256, populate_existing=True)
+    if blob is None or blob.ref_count > 0:
+        return None
+
+    db.delete(blob)
+    return blob_path(sha256)
+
+
+def remove_blob_file(path: str, grace_seconds: int = BLOB_DELETE_GRACE_SECONDS) -> bool:
+    try:
+        if time.time() - os.path.getmtime(path) < grace_seconds:
+            return False
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+# =========================================================
+# DOWNLOADS
+# =========================================================
+def etag_for(record: PatientFile) -> str | None:
+    """Strong ETag: the bytes behind a content address never change."""
+    return f'"{record.sha256}"' if record.sha256 else None
+
+
+def etag_matches(if_none_match: str | None, etag: str | None) -> bool:
+    """If-None-Match uses weak comparison, so W/"x" matches "x"."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+def find_duplicates(db: Session, sha256: str):
+    """Files with exactly these bytes (index lookup on patient_files.sha256)."""
+    return db.query(PatientFile).filter(PatientFile.sha256 == sha256).order_by(PatientFile.id)
+
+
+# =========================================================
+# MAINTENANCE
+# =========================================================
+def adopt_legacy_files(db: Session, batch_size: int = 200) -> dict:
+    """
+    Move files stored before the blob store (one copy per upload, no hash)
+    into it. Duplicates collapse to one blob and the extra copies are removed.
+    """
+    summary = {"adopted": 0, "deduplicated": 0, "missing": 0}
+    last_id = 0
+
+    while True:
+        rows = (
+            db.query(PatientFile)
+            .filter(PatientFile.sha256.is_(None), PatientFile.id > last_id)
+            .order_by(PatientFile.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        for record in rows:
+            if not os.path.isfile(record.file_path):
+                summary["missing"] += 1
+                continue
+
+            with open(record.file_path, "rb") as src:
+                os.makedirs(BLOB_DIR, exist_ok=True)
+                tmp_path, sha256, size, head = _copy_to_temp(src, BLOB_DIR, max_bytes=2 ** 62)
+            legacy_path = record.file_path
+            stored = StoredFile(
+                path=_place_blob(tmp_path, sha256),
+                filename=record.filename,
+                sha256=sha256,
+                size=size,
+                mime_type=detect_mime_type(head, record.filename),
+            )
+
+            if acquire_blob(db, stored):
+                summary["deduplicated"] += 1
+            record.file_path = stored.path
+            record.sha256 = stored.sha256
+            record.size = stored.size
+            record.mime_type = stored.mime_type
+            db.commit()
+
+            # Old uploads could share a path (same filename); the last one removes it
+            still_used = (
+                db.query(PatientFile.id)
+                .filter(PatientFile.file_path == legacy_path, PatientFile.sha256.is_(None))
+                .first()
+            )
+            if still_used is None and os.path.abspath(legacy_path) != os.path.abspath(stored.path):
+                os.unlink(legacy_path)
+            summary["adopted"] += 1
+
+    return summary
+
+
+def sweep_orphan_blobs(db: Session, grace_seconds: int = BLOB_DELETE_GRACE_SECONDS) -> int:
+    """Remove blob files no row refers to (e.g. left behind inside the delete grace period), with their thumbnails."""
+    from app.services.thumbnails import remove_thumbnails  # thumbnails imports this module
+
+    removed = 0
+    if not os.path.isdir(BLOB_DIR):
+        return removed
+
+    for root, _dirs, files in os.walk(BLOB_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.startswith(".upload-"):
+                # Abandoned temp file from a crashed upload
+                if time.time() - os.path.getmtime(path) > 24 * 3600:
+                    os.unlink(path)
+                    removed += 1
+                continue
+            if db.execute(select(FileBlob.sha256).where(FileBlob.sha256 == name)).first() is None:
+                if remove_blob_file(path, grace_seconds):
+                    remove_thumbnails(name)
+                    removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    # python -m app.services.patient_files [--adopt-legacy] [--sweep]
+    from app.core.config import SessionLocal
+    import app.models  # noqa: F401  (register tables)
+
+    parser = argparse.ArgumentParser(description="Blob store maintenance for patient files")
+    parser.add_argument("--adopt-legacy", action="store_true", help="move pre-blob-store files into the store")
+    parser.add_argument("--sweep", action="store_true", help="delete blob files with no references")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.adopt_legacy:
+            print(adopt_legacy_files(db))
+        if args.sweep:
+            print({"removed": sweep_orphan_blobs(db)})
+    finally:
+        db.close()
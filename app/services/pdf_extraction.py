@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import os
+import time
+from dataclasses import dataclass, field
+
+from app.services.ocr_service import OCR_DPI, OCR_LANG, ocr_page, ocr_settings_fingerprint
+from app.services.pdf_parser import is_valid_sa_id, parse_patient_data
+from app.utils.pdf_reader import RelRect, open_pdf, page_lines
+
+# A page with fewer native characters than this is treated as a scan
+NATIVE_MIN_CHARS = int(os.getenv("NATIVE_MIN_CHARS", "40"))
+
+# Part of page 1 holding the personal-details block of the intake form
+# (x0, y0, x1, y1 as fractions of the page). Only this area is OCR'd.
+INTAKE_FORM_REGION: RelRect = tuple(
+    float(v) for v in os.getenv("INTAKE_FORM_REGION", "0,0,1,0.65").split(",")
+)
+
+
+def extraction_fingerprint() -> str:
+    """Everything that can change extract_intake() output, for cache keys."""
+    region = ",".join(f"{v:g}" for v in INTAKE_FORM_REGION)
+    return f"{ocr_settings_fingerprint()};native_min={NATIVE_MIN_CHARS};native_check=sa_id;region={region}"
+
+
+@dataclass
+class PageExtraction:
+    page: int
+    method: str  # "native" / "ocr"
+    chars: int
+    ms: float
+
+
+@dataclass
+class Extraction:
+    text: str
+    pages: list[PageExtraction] = field(default_factory=list)
+
+    @property
+    def ocr_used(self) -> bool:
+        return any(p.method == "ocr" for p in self.pages)
+
+
+def _has_usable_text(text: str) -> bool:
+    return len(text.strip()) >= NATIVE_MIN_CHARS
+
+
+def extract_text(path: str, max_pages: int | None = None, dpi: int = OCR_DPI, lang: str = OCR_LANG) -> Extraction:
+    """
+    Text of a PDF, page by page: PyMuPDF's text layer where there is one,
+    OCR only for pages that have no usable text.
+    """
+    out = Extraction(text="")
+    chunks = []
+
+    with open_pdf(path) as doc:
+        for page in doc.pages(0, min(max_pages or doc.page_count, doc.page_count)):
+            start = time.perf_counter()
+            text = page_lines(page)
+            method = "native"
+            if not _has_usable_text(text):
+                text = ocr_page(page, dpi=dpi, lang=lang)
+                method = "ocr"
+            out.pages.append(PageExtraction(page.number + 1, method, len(text), (time.perf_counter() - start) * 1000))
+            chunks.append(text)
+
+    out.text = "\n\f\n".join(chunks)
+    return out
+
+
+def extract_intake(path: str, dpi: int = OCR_DPI, lang: str = OCR_LANG, region: RelRect = INTAKE_FORM_REGION) -> dict:
+    """
+    Intake form fields from page 1 of a referral.
+
+    Native text is tried first; OCR of the form region is the fallback when
+    the page has no text layer or the text layer doesn't yield a valid ID
+    number (checksum and birth date).
+    """
+    with open_pdf(path) as doc:
+        if doc.page_count == 0:
+            return {"text": "", "parsed": parse_patient_data(""), "method": "empty"}
+        page = doc[0]
+
+        start = time.perf_counter()
+        text = page_lines(page)
+        if _has_usable_text(text):
+            parsed = parse_patient_data(text)
+            # Some referrals carry an embedded OCR layer that is garbled; only
+            # trust it when the ID it yields is a valid SA ID.
+            if is_valid_sa_id(parsed.get("id_number")):
+                return {"text": text, "parsed": parsed, "method": "native", "ms": (time.perf_counter() - start) * 1000}
+
+        text = ocr_page(page, region=region, dpi=dpi, lang=lang)
+        return {
+            "text": text,
+            "parsed": parse_patient_data(text),
+            "method": "ocr",
+            "ms": (time.perf_counter() - start) * 1000,
+        }
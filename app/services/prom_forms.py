@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterable
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.case_episode import CaseEpisode
+from app.models.patient import Patient
+from app.models.prom_schedule import PromSchedule
+from app.schemas.prom_forms import PromFormOut
+from app.utils.prom_loader import PromTemplate, get_cached_template
+
+# Assembled forms kept in memory (least recently used go first)
+FORM_CACHE_SIZE = int(os.getenv("FORM_CACHE_SIZE", "10000"))
+# Upper bound on staleness for changes made by other processes (cron, workers)
+FORM_CACHE_TTL_SECONDS = float(os.getenv("FORM_CACHE_TTL_SECONDS", "300"))
+
+
+@dataclass(frozen=True)
+class _Entry:
+    form: PromFormOut
+    template: PromTemplate
+    expires_at: float
+
+
+def load_prom_form(db: Session, schedule_id: int) -> tuple[PromFormOut, PromTemplate] | None:
+    """Schedule + case + patient in one joined query, questions from the template registry."""
+    row = db.execute(
+        select(
+            PromSchedule.id,
+            PromSchedule.prom_name,
+            PromSchedule.due_date,
+            PromSchedule.status,
+            PromSchedule.patient_id,
+            PromSchedule.case_id,
+            Patient.full_name,
+            CaseEpisode.joint_type,
+        )
+        .join(CaseEpisode, CaseEpisode.id == PromSchedule.case_id)
+        .join(Patient, Patient.id == PromSchedule.patient_id)
+        .where(PromSchedule.id == schedule_id)
+    ).first()
+    if row is None:
+        return None
+
+    template = get_cached_template(row.prom_name)
+    form = PromFormOut(
+        schedule_id=row.id,
+        prom_name=row.prom_name,
+        due_date=row.due_date,
+        status=row.status,
+        patient_id=row.patient_id,
+        case_id=row.case_id,
+        patient_name=row.full_name,
+        joint_type=row.joint_type,
+        questions=template.raw.get("questions", []),
+    )
+    return form, template
+
+
+class PromFormCache:
+    """
+    Assembled PromFormOut per schedule_id.
+
+    Whatever changes a schedule (submit, replan, overdue sweep) invalidates
+    its entry; a template edit is picked up because a hit is only served
+    while the registry still returns the same template object. Entries are
+    shared between requests - treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = FORM_CACHE_SIZE, ttl_seconds: float = FORM_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by every invalidation; a load that raced one is not stored
+        self._generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def _cached(self, schedule_id: int) -> PromFormOut | None:
+        with self._lock:
+            entry = self._entries.get(schedule_id)
+            if entry is None or entry.expires_at <= time.monotonic():
+                return None
+            self._entries.move_to_end(schedule_id)
+
+        try:
+            current = get_cached_template(entry.form.prom_name)
+        except FileNotFoundError:
+            current = None
+        return entry.form if current is entry.template else None
+
+    def get(self, db: Session, schedule_id: int) -> PromFormOut | None:
+        """
+        The form for a schedule, or None if it does not exist.
+        Raises FileNotFoundError when its template is missing.
+        """
+        form = self._cached(schedule_id)
+        if form is not None:
+            with self._lock:
+                self.hits += 1
+            return form
+
+        with self._lock:
+            self.misses += 1
+            generation = self._generation
+
+        loaded = load_prom_form(db, schedule_id)
+        if loaded is None:
+            return None
+
+        form, template = loaded
+        with self._lock:
+            if generation != self._generation or self.max_entries <= 0:
+                return form
+            self._entries[schedule_id] = _Entry(form, template, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(schedule_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return form
+
+    def invalidate(self, schedule_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._generation += 1
+            for schedule_id in schedule_ids:
+                self._entries.pop(schedule_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "forms": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+form_cache = PromFormCache()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, timedelta
+from types import MappingProxyType
+from typing import Mapping
+
+from app.utils.prom_loader import PROM_DIR, get_cached_template
+
+log = logging.getLogger(__name__)
+
+# joint/procedure -> instruments + timepoints, see protocols.json
+PROTOCOL_FILE = os.getenv("PROM_PROTOCOL_FILE", os.path.join(PROM_DIR, "protocols", "protocols.json"))
+
+# Matches any joint type / procedure in a protocol definition
+WILDCARD = "*"
+
+
+class InvalidProtocol(ValueError):
+    """Raised when the protocol file is not a usable definition."""
+
+
+@dataclass(frozen=True)
+class Timepoint:
+    prom_name: str
+    offset_days: int
+    window_before_days: int
+    window_after_days: int
+
+    def due_date(self, surgery_date: date) -> date:
+        return surgery_date + timedelta(days=self.offset_days)
+
+    def window(self, surgery_date: date) -> tuple[date, date]:
+        due = self.due_date(surgery_date)
+        return due - timedelta(days=self.window_before_days), due + timedelta(days=self.window_after_days)
+
+
+@dataclass(frozen=True)
+class Protocol:
+    name: str
+    joint_type: str
+    procedure_type: str | None
+
+    # Sorted by (offset_days, prom_name)
+    timepoints: tuple[Timepoint, ...]
+
+    @property
+    def prom_names(self) -> tuple[str, ...]:
+        return tuple(dict.fromkeys(tp.prom_name for tp in self.timepoints))
+
+
+@dataclass(frozen=True)
+class ProtocolTable:
+    """
+    Protocols compiled into a lookup keyed by (JOINT, PROCEDURE or None),
+    so picking the protocol for a case is at most three dict lookups.
+    """
+    path: str
+    mtime_ns: int
+    checksum: str
+    protocols: tuple[Protocol, ...]
+    lookup: Mapping[tuple[str, str | None], Protocol]
+
+    @property
+    def window_after_days(self) -> tuple[int, int]:
+        """(shortest, longest) window after the due date over all timepoints."""
+        afters = [tp.window_after_days for p in self.protocols for tp in p.timepoints]
+        return min(afters, default=0), max(afters, default=0)
+
+    @property
+    def max_window_before_days(self) -> int:
+        return max((tp.window_before_days for p in self.protocols for tp in p.timepoints), default=0)
+
+    def for_case(self, joint_type: str | None, procedure_type: str | None = None) -> Protocol | None:
+        joint = _norm(joint_type) or WILDCARD
+        procedure = _norm(procedure_type)
+        lookup = self.lookup
+        return (
+            (lookup.get((joint, procedure)) if procedure else None)
+            or lookup.get((joint, None))
+            or lookup.get((WILDCARD, None))
+        )
+
+
+def _norm(value: str | None) -> str | None:
+    value = (value or "").strip().upper()
+    return value or None
+
+
+def _int(spec: dict, key: str, default: int | None, where: str) -> int:
+    value = spec.get(key, default)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise InvalidProtocol(f"{where}: '{key}' must be an integer")
+    return value
+
+
+def compile_protocols(path: str, mtime_ns: int, data: bytes) -> ProtocolTable:
+    try:
+        raw = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise InvalidProtocol(f"{path} is not valid JSON: {e}") from e
+
+    if not isinstance(raw, dict) or not isinstance(raw.get("protocols"), list):
+        raise InvalidProtocol(f"{path}: expected an object with a 'protocols' list")
+
+    defaults = raw.get("defaults") or {}
+    default_before = _int(defaults, "window_before_days", 7, "defaults")
+    default_after = _int(defaults, "window_after_days", 28, "defaults")
+
+    protocols = []
+    lookup: dict[tuple[str, str | None], Protocol] = {}
+
+    for i, spec in enumerate(raw["protocols"]):
+        name = str(spec.get("name") or f"protocol-{i}")
+        joint = _norm(spec.get("joint_type"))
+        if joint is None:
+            raise InvalidProtocol(f"protocol {name}: joint_type is required (use \"*\" for any)")
+        procedure = _norm(spec.get("procedure_type"))
+
+        timepoints = []
+        seen = set()
+        for instrument in spec.get("instruments") or []:
+            prom_name = instrument.get("prom_name")
+            if not prom_name:
+                raise InvalidProtocol(f"protocol {name}: instrument without prom_name")
+
+            for tp in instrument.get("timepoints") or []:
+                where = f"protocol {name} / {prom_name}"
+                if isinstance(tp, int):
+                    tp = {"offset_days": tp}
+                offset = _int(tp, "offset_days", None, where)
+                if (prom_name, offset) in seen:
+                    raise InvalidProtocol(f"{where}: duplicate timepoint {offset}")
+                seen.add((prom_name, offset))
+
+                timepoints.append(Timepoint(
+                    prom_name=prom_name,
+                    offset_days=offset,
+                    window_before_days=_int(tp, "window_before_days", default_before, where),
+                    window_after_days=_int(tp, "window_after_days", default_after, where),
+                ))
+
+        if not timepoints:
+            raise InvalidProtocol(f"protocol {name}: no timepoints")
+
+        key = (joint, procedure)
+        if key in lookup:
+            raise InvalidProtocol(f"protocol {name}: duplicates {lookup[key].name} for {joint}/{procedure}")
+
+        protocol = Protocol(
+            name=name,
+            joint_type=joint,
+            procedure_type=procedure,
+            timepoints=tuple(sorted(timepoints, key=lambda t: (t.offset_days, t.prom_name))),
+        )
+        protocols.append(protocol)
+        lookup[key] = protocol
+
+    return ProtocolTable(
+        path=path,
+        mtime_ns=mtime_ns,
+        checksum=hashlib.sha1(data).hexdigest(),
+        protocols=tuple(protocols),
+        lookup=MappingProxyType(lookup),
+    )
+
+
+_table: ProtocolTable | None = None
+_table_lock = threading.Lock()
+
+
+def get_protocol_table(path: str = PROTOCOL_FILE) -> ProtocolTable:
+    """
+    The compiled protocol table. Like the template registry, the file is
+    only re-read when its mtime changes.
+    """
+    global _table
+
+    mtime_ns = os.stat(path).st_mtime_ns
+    with _table_lock:
+        if _table is None or _table.path != path or _table.mtime_ns != mtime_ns:
+            with open(path, "rb") as f:
+                _table = compile_protocols(path, mtime_ns, f.read())
+        return _table
+
+
+def load_protocols() -> ProtocolTable:
+    """Compile the protocols at startup and warn about instruments without a template."""
+    table = get_protocol_table()
+    for protocol in table.protocols:
+        for prom_name in protocol.prom_names:
+            try:
+                get_cached_template(prom_name)
+            except (FileNotFoundError, ValueError) as e:
+                log.warning("PROM protocol %s: %s - cases will not be scheduled", protocol.name, e)
+    return table
@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import threading
+from typing import Mapping, Sequence
+
+from sqlalchemy import exists, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.prom_answer_layout import PromAnswerLayout
+from app.models.prom_answer_set import PromAnswerSet
+from app.models.prom_response import PromResponse
+
+# packed: one prom_answer_sets row per completed instance (default)
+# rows: one prom_responses row per answer (the original layout)
+# Reads always cover both, so switching only affects new submissions.
+PROM_RESPONSE_STORAGE = os.getenv("PROM_RESPONSE_STORAGE", "packed")
+
+
+def layout_key(prom_name: str, question_ids: Sequence[str]) -> str:
+    return hashlib.sha1("\x1f".join([prom_name, *question_ids]).encode("utf-8")).hexdigest()
+
+
+def pack(question_ids: Sequence[str], answers: Mapping[str, int]) -> list[int | None]:
+    return [answers.get(qid) for qid in question_ids]
+
+
+def unpack(question_ids: Sequence[str], packed: Sequence[int | None]) -> dict[str, int]:
+    return {qid: value for qid, value in zip(question_ids, packed) if value is not None}
+
+
+class AnswerLayouts:
+    """
+    layout_key -> question ids. Layouts never change once written, so they
+    are cached for the life of the process.
+    """
+
+    def __init__(self):
+        self._layouts: dict[str, tuple[str, ...]] = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, db: Session, prom_name: str, question_ids: Sequence[str]) -> str:
+        """The key for this question order, writing the layout row if it is new."""
+        key = layout_key(prom_name, question_ids)
+        with self._lock:
+            if key in self._layouts:
+                return key
+
+        if db.get(PromAnswerLayout, key) is not None:
+            with self._lock:
+                self._layouts[key] = tuple(question_ids)
+            return key
+
+        # Not cached until a later call sees it committed (this transaction may roll back)
+        try:
+            with db.begin_nested():
+                db.add(PromAnswerLayout(layout_key=key, prom_name=prom_name, question_ids=list(question_ids)))
+        except IntegrityError:
+            pass  # written concurrently by another request
+        return key
+
+    def get_many(self, db: Session, keys: set[str]) -> dict[str, tuple[str, ...]]:
+        with self._lock:
+            missing = keys - self._layouts.keys()
+        if missing:
+            rows = db.execute(
+                select(PromAnswerLayout.layout_key, PromAnswerLayout.question_ids)
+                .where(PromAnswerLayout.layout_key.in_(missing))
+            ).all()
+            with self._lock:
+                for key, question_ids in rows:
+                    self._layouts[key] = tuple(question_ids)
+        with self._lock:
+            return {key: self._layouts[key] for key in keys if key in self._layouts}
+
+
+answer_layouts = AnswerLayouts()
+
+
+def has_answers(schedule_id_column):
+    """SQL condition: the schedule has stored answers (either storage)."""
+    return or_(
+        exists().where(PromAnswerSet.schedule_id == schedule_id_column),
+        exists().where(PromResponse.prom_instance_id == schedule_id_column),
+    )
+
+
+def store_answers(
+    db: Session,
+    submissions: Sequence[tuple[int, str, Sequence[str], Mapping[str, int]]],
+    storage: str | None = None,
+) -> None:
+    """
+    Stage answers for (schedule_id, prom_name, template question ids,
+    answers) tuples with one bulk insert. Does not commit.
+    """
+    if not submissions:
+        return
+
+    if (storage or PROM_RESPONSE_STORAGE) == "rows":
+        rows = [
+            {"prom_instance_id": schedule_id, "question_id": qid, "answer_value": value}
+            for schedule_id, _, _, answers in submissions
+            for qid, value in answers.items()
+        ]
+        if rows:
+            db.execute(insert(PromResponse), rows)
+        return
+
+    keys: dict[tuple[str, tuple[str, ...]], str] = {}
+    sets = []
+    for schedule_id, prom_name, question_ids, answers in submissions:
+        layout = (prom_name, tuple(question_ids))
+        if layout not in keys:
+            keys[layout] = answer_layouts.ensure(db, prom_name, question_ids)
+        sets.append({
+            "schedule_id": schedule_id,
+            "layout_key": keys[layout],
+            "answers": pack(question_ids, answers),
+        })
+    db.execute(insert(PromAnswerSet), sets)
+
+
+def load_answers(db: Session, schedule_ids: Sequence[int]) -> dict[int, dict[str, int]]:
+    """
+    schedule_id -> {question_id: value} for the schedules that have answers,
+    whichever storage they are in. Packed sets keep template question order.
+    """
+    ids = list(schedule_ids)
+    if not ids:
+        return {}
+
+    sets = db.execute(
+        select(PromAnswerSet.schedule_id, PromAnswerSet.layout_key, PromAnswerSet.answers)
+        .where(PromAnswerSet.schedule_id.in_(ids))
+    ).all()
+    layouts = answer_layouts.get_many(db, {s.layout_key for s in sets})
+
+    out: dict[int, dict[str, int]] = {}
+    for s in sets:
+        out[s.schedule_id] = unpack(layouts[s.layout_key], s.answers)
+
+    for sid, qid, value in db.execute(
+        select(PromResponse.prom_instance_id, PromResponse.question_id, PromResponse.answer_value)
+        .where(PromResponse.prom_instance_id.in_(ids))
+        .order_by(PromResponse.prom_instance_id, PromResponse.id)
+    ):
+        out.setdefault(sid, {})[qid] = value
+
+    return out
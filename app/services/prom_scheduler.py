@@ -1,41 +1,73 @@
 from __future__ import annotations
 
-from datetime import timedelta
+from collections import Counter
+from datetime import date
+from typing import Iterable, Sequence
+
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.orm import Session
 
 from app.models.case_episode import CaseEpisode
 from app.models.prom_schedule import PromSchedule
-from app.utils.prom_loader import load_prom_template
+from app.services.prom_forms import form_cache
+from app.services.prom_protocols import Protocol, ProtocolTable, get_protocol_table
+from app.utils.prom_loader import get_cached_template
+
 
+# Cases per set-based lookup + bulk insert in schedule_proms_bulk()
+BULK_CHUNK_SIZE = 500
 
-# Simple joint -> PROM mapping for MVP.
-# Expand later as you add templates.
-JOINT_PROM_MAP: dict[str, str] = {
-    "KNEE": "OxfordKneeScore",
-    # Examples for later:
-    # "HIP": "OxfordHipScore",
-    # "SHOULDER": "ASES",
-    # "ELBOW": "MEPS",
-}
 
+def protocol_for_case(case, table: ProtocolTable | None = None) -> Protocol | None:
+    """Protocol (instruments + timepoints) for a case, from app/proms/protocols/protocols.json."""
+    table = table or get_protocol_table()
+    return table.for_case(case.joint_type, getattr(case, "procedure_type", None))
 
-DEFAULT_PROM_NAME = "OxfordKneeScore"
 
+def open_status(window_end: date | None, today: date | None = None) -> str:
+    """Status of a not-completed schedule: 'overdue' once its window has closed."""
+    if window_end is not None and window_end < (today or date.today()):
+        return "overdue"
+    return "pending"
 
-# Schedule offsets in days relative to surgery date
-DEFAULT_INTERVALS_DAYS = [
-    -14,   # 2 weeks pre-op
-    42,    # 6 weeks
-    90,    # 3 months
-    180,   # 6 months
-    365,   # 12 months
-    730,   # 24 months
-]
 
+def build_schedule_rows(case_id: int, patient_id: int, surgery_date: date, protocol: Protocol) -> list[dict]:
+    """
+    prom_schedules rows (as dicts, ready for a bulk insert) for one case.
+    Back-loaded cases get timepoints whose window already closed as 'overdue'.
+    """
+    today = date.today()
+    rows = []
+    for tp in protocol.timepoints:
+        window_start, window_end = tp.window(surgery_date)
+        rows.append({
+            "patient_id": patient_id,
+            "case_id": case_id,
+            "prom_name": tp.prom_name,
+            "protocol": protocol.name,
+            "offset_days": tp.offset_days,
+            "due_date": tp.due_date(surgery_date),
+            "window_start": window_start,
+            "window_end": window_end,
+            "status": open_status(window_end, today),
+            "completed_date": None,
+        })
+    return rows
 
-def pick_prom_name_for_case(case: CaseEpisode) -> str:
-    jt = (case.joint_type or "").strip().upper()
-    return JOINT_PROM_MAP.get(jt, DEFAULT_PROM_NAME)
+
+def _check_templates(protocol: Protocol, known: dict[str, bool]) -> list[str]:
+    """Instruments of `protocol` without a usable template (memoised in `known`)."""
+    missing = []
+    for prom_name in protocol.prom_names:
+        if prom_name not in known:
+            try:
+                get_cached_template(prom_name)
+                known[prom_name] = True
+            except (FileNotFoundError, ValueError):
+                known[prom_name] = False
+        if not known[prom_name]:
+            missing.append(prom_name)
+    return missing
 
 
 def schedule_proms_for_case(db: Session, case_id: int) -> dict:
@@ -61,33 +93,333 @@ def schedule_proms_for_case(db: Session, case_id: int) -> dict:
             "message": "Schedule already exists",
         }
 
-    prom_name = pick_prom_name_for_case(case)
-
-    # Ensure template exists (fail fast)
-    load_prom_template(prom_name)
+    protocol = protocol_for_case(case)
+    if protocol is None:
+        return {
+            "case_id": case_id,
+            "prom_name": None,
+            "created": 0,
+            "existing": 0,
+            "message": f"No PROM protocol for joint type {case.joint_type}",
+        }
 
-    surgery_date = case.date_of_surgery
-    created = 0
+    # Ensure templates exist (fail fast)
+    for prom_name in protocol.prom_names:
+        get_cached_template(prom_name)
 
-    for days in DEFAULT_INTERVALS_DAYS:
-        due = surgery_date + timedelta(days=days)
-        entry = PromSchedule(
-            patient_id=case.patient_id,
-            case_id=case.id,
-            prom_name=prom_name,
-            due_date=due,
-            status="pending",
-            completed_date=None,
-        )
-        db.add(entry)
-        created += 1
+    rows = build_schedule_rows(case.id, case.patient_id, case.date_of_surgery, protocol)
+    db.execute(insert(PromSchedule), rows)
+    created = len(rows)
 
     db.commit()
 
     return {
         "case_id": case_id,
-        "prom_name": prom_name,
+        "prom_name": protocol.prom_names[0],
+        "prom_names": list(protocol.prom_names),
+        "protocol": protocol.name,
         "created": created,
         "existing": 0,
         "message": "Schedule created",
     }
+
+
+def _chunks(items: Sequence, size: int) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def select_cases_for_scheduling(
+    db: Session,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    joint_type: str | None = None,
+    surgeon_name: str | None = None,
+    case_status: str | None = None,
+) -> list[int]:
+    """Case ids matching a bulk scheduling filter, in id order."""
+    q = select(CaseEpisode.id)
+    if date_from is not None:
+        q = q.where(CaseEpisode.date_of_surgery >= date_from)
+    if date_to is not None:
+        q = q.where(CaseEpisode.date_of_surgery <= date_to)
+    if joint_type:
+        q = q.where(func.upper(CaseEpisode.joint_type) == joint_type.strip().upper())
+    if surgeon_name:
+        q = q.where(CaseEpisode.surgeon_name == surgeon_name)
+    if case_status:
+        q = q.where(CaseEpisode.case_status == case_status.strip().upper())
+    return list(db.execute(q.order_by(CaseEpisode.id)).scalars())
+
+
+def schedule_proms_bulk(
+    db: Session,
+    case_ids: Sequence[int],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    dry_run: bool = False,
+) -> dict:
+    """
+    schedule_proms_for_case() for many cases in one transaction.
+
+    Per chunk of cases: one query for the cases, one grouped count of their
+    existing schedules and one executemany insert of all new rows. Templates
+    are checked once per instrument. Same idempotency rule as the single-case
+    call: a case that already has schedules is left alone.
+
+    Returns totals plus one outcome per case:
+    created / existing / not_found / no_protocol / template_missing.
+    """
+    results: list[dict] = []
+    created_total = 0
+    template_ok: dict[str, bool] = {}
+    table = get_protocol_table()
+
+    # Keep first occurrence order, drop duplicates
+    case_ids = list(dict.fromkeys(case_ids))
+
+    for chunk in _chunks(case_ids, chunk_size):
+        cases = {
+            row.id: row
+            for row in db.execute(
+                select(
+                    CaseEpisode.id,
+                    CaseEpisode.patient_id,
+                    CaseEpisode.joint_type,
+                    CaseEpisode.procedure_type,
+                    CaseEpisode.date_of_surgery,
+                )
+                .where(CaseEpisode.id.in_(chunk))
+            )
+        }
+        existing = dict(
+            db.execute(
+                select(PromSchedule.case_id, func.count())
+                .where(PromSchedule.case_id.in_(list(cases)))
+                .group_by(PromSchedule.case_id)
+            ).all()
+        )
+
+        rows: list[dict] = []
+        for case_id in chunk:
+            case = cases.get(case_id)
+            if case is None:
+                results.append({"case_id": case_id, "outcome": "not_found", "prom_name": None, "created": 0})
+                continue
+
+            if existing.get(case_id):
+                results.append({"case_id": case_id, "outcome": "existing", "prom_name": None, "created": 0})
+                continue
+
+            protocol = protocol_for_case(case, table)
+            if protocol is None:
+                results.append({"case_id": case_id, "outcome": "no_protocol", "prom_name": None, "created": 0})
+                continue
+
+            missing = _check_templates(protocol, template_ok)
+            if missing:
+                results.append({"case_id": case_id, "outcome": "template_missing", "prom_name": ", ".join(missing), "created": 0})
+                continue
+
+            case_rows = build_schedule_rows(case.id, case.patient_id, case.date_of_surgery, protocol)
+            rows.extend(case_rows)
+            results.append({"case_id": case_id, "outcome": "created", "prom_name": protocol.prom_names[0], "created": len(case_rows)})
+
+        if rows and not dry_run:
+            db.execute(insert(PromSchedule), rows)
+        created_total += len(rows)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    return {
+        "cases": len(case_ids),
+        "created": created_total,
+        "dry_run": dry_run,
+        "outcomes": dict(Counter(r["outcome"] for r in results)),
+        "results": results,
+    }
+
+
+def _plan_case(protocol: Protocol | None, case, existing: list) -> tuple[list[dict], list[dict], int]:
+    """
+    Diff one case's schedule rows against its protocol.
+    Returns (rows to insert, rows to update by id, unchanged count).
+    """
+    desired = {}
+    if protocol is not None:
+        for row in build_schedule_rows(case.id, case.patient_id, case.date_of_surgery, protocol):
+            desired[(row["prom_name"], row["offset_days"])] = row
+
+    inserts, updates, unchanged = [], [], 0
+    seen = set()
+
+    for sched in existing:
+        key = (sched.prom_name, sched.offset_days)
+        status = (sched.status or "pending").lower()
+
+        if status == "completed":
+            # Collected data is never rewritten
+            seen.add(key)
+            unchanged += 1
+            continue
+
+        want = desired.get(key)
+        if want is None or key in seen:
+            if status != "cancelled":
+                updates.append({
+                    "id": sched.id,
+                    "status": "cancelled",
+                    "due_date": sched.due_date,
+                    "window_start": sched.window_start,
+                    "window_end": sched.window_end,
+                    "protocol": sched.protocol,
+                })
+            else:
+                unchanged += 1
+            continue
+
+        seen.add(key)
+        target = {
+            "id": sched.id,
+            "status": want["status"],
+            "due_date": want["due_date"],
+            "window_start": want["window_start"],
+            "window_end": want["window_end"],
+            "protocol": want["protocol"],
+        }
+        current = {
+            "id": sched.id,
+            "status": status,
+            "due_date": sched.due_date,
+            "window_start": sched.window_start,
+            "window_end": sched.window_end,
+            "protocol": sched.protocol,
+        }
+        if target != current:
+            updates.append(target)
+        else:
+            unchanged += 1
+
+    inserts = [row for key, row in desired.items() if key not in seen]
+    return inserts, updates, unchanged
+
+
+def replan_proms_bulk(
+    db: Session,
+    case_ids: Sequence[int],
+    chunk_size: int = BULK_CHUNK_SIZE,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Bring already-scheduled cases in line with the current protocols,
+    writing only the difference.
+
+    Schedule rows are matched to protocol timepoints on (prom_name,
+    offset_days). Missing timepoints are inserted, pending rows that are no
+    longer in the protocol are cancelled, pending rows whose due date or
+    window moved are updated (and become pending/overdue to match the new
+    window) and cancelled rows that are back are re-opened.
+    Completed rows are never touched. Cases without any schedule are left
+    to schedule_proms_bulk().
+
+    Per chunk: one case query, one schedule query, one bulk insert and one
+    bulk update by primary key; one commit at the end.
+    """
+    results: list[dict] = []
+    totals = Counter()
+    template_ok: dict[str, bool] = {}
+    table = get_protocol_table()
+    updated_ids: list[int] = []
+
+    case_ids = list(dict.fromkeys(case_ids))
+
+    for chunk in _chunks(case_ids, chunk_size):
+        cases = {
+            row.id: row
+            for row in db.execute(
+                select(
+                    CaseEpisode.id,
+                    CaseEpisode.patient_id,
+                    CaseEpisode.joint_type,
+                    CaseEpisode.procedure_type,
+                    CaseEpisode.date_of_surgery,
+                )
+                .where(CaseEpisode.id.in_(chunk))
+            )
+        }
+
+        by_case: dict[int, list] = {}
+        for sched in db.execute(
+            select(
+                PromSchedule.id,
+                PromSchedule.case_id,
+                PromSchedule.prom_name,
+                PromSchedule.offset_days,
+                PromSchedule.status,
+                PromSchedule.due_date,
+                PromSchedule.window_start,
+                PromSchedule.window_end,
+                PromSchedule.protocol,
+            )
+            .where(PromSchedule.case_id.in_(list(cases)))
+            .order_by(PromSchedule.id)
+        ):
+            by_case.setdefault(sched.case_id, []).append(sched)
+
+        inserts: list[dict] = []
+        updates: list[dict] = []
+
+        for case_id in chunk:
+            case = cases.get(case_id)
+            if case is None:
+                results.append({"case_id": case_id, "outcome": "not_found"})
+                continue
+            if case_id not in by_case:
+                results.append({"case_id": case_id, "outcome": "not_scheduled"})
+                continue
+
+            protocol = protocol_for_case(case, table)
+            if protocol is not None and _check_templates(protocol, template_ok):
+                results.append({"case_id": case_id, "outcome": "template_missing"})
+                continue
+
+            case_inserts, case_updates, unchanged = _plan_case(protocol, case, by_case[case_id])
+            cancelled = sum(1 for u in case_updates if u["status"] == "cancelled")
+
+            inserts.extend(case_inserts)
+            updates.extend(case_updates)
+            outcome = {
+                "case_id": case_id,
+                "outcome": "changed" if case_inserts or case_updates else "unchanged",
+                "protocol": protocol.name if protocol else None,
+                "inserted": len(case_inserts),
+                "updated": len(case_updates) - cancelled,
+                "cancelled": cancelled,
+                "unchanged": unchanged,
+            }
+            results.append(outcome)
+            totals.update({k: outcome[k] for k in ("inserted", "updated", "cancelled", "unchanged")})
+
+        if not dry_run:
+            if inserts:
+                db.execute(insert(PromSchedule), inserts)
+            if updates:
+                db.execute(update(PromSchedule), updates)
+                updated_ids.extend(u["id"] for u in updates)
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+        form_cache.invalidate(updated_ids)
+
+    return {
+        "cases": len(case_ids),
+        "dry_run": dry_run,
+        "protocols_checksum": table.checksum,
+        **{k: totals[k] for k in ("inserted", "updated", "cancelled", "unchanged")},
+        "outcomes": dict(Counter(r["outcome"] for r in results)),
+        "results": results,
+    }
@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from typing import Sequence
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.models.prom_schedule import PromSchedule
+from app.models.prom_score import PromScore
+from app.services.outcomes import update_outcomes
+from app.services.prom_responses import load_answers
+from app.services.prom_scoring import ScoreResult, get_scoring_plan, score_many
+
+
+def _score_values(schedule_id: int, result: ScoreResult) -> dict:
+    return {
+        "schedule_id": schedule_id,
+        "prom_name": result.prom_name,
+        "total": result.total,
+        "max_possible": result.max_possible,
+        "normalised": result.normalised,
+        "subscales": result.subscales or None,
+        "answered": result.answered,
+        "plan_version": result.plan_version,
+        "scored_at": datetime.utcnow(),
+    }
+
+
+def save_score(db: Session, schedule_id: int, result: ScoreResult) -> PromScore:
+    """
+    Stage the computed score for a schedule (insert or replace).
+    Does not commit - callers write it in the same transaction as the answers.
+    """
+    return db.merge(PromScore(**_score_values(schedule_id, result)))
+
+
+def save_scores_bulk(db: Session, scores: Sequence[tuple[int, ScoreResult]]) -> None:
+    """save_score() for many schedules: one DELETE + one bulk INSERT. Does not commit."""
+    if not scores:
+        return
+    db.execute(delete(PromScore).where(PromScore.schedule_id.in_([sid for sid, _ in scores])))
+    db.execute(insert(PromScore), [_score_values(sid, result) for sid, result in scores])
+
+
+def backfill_scores(db: Session, batch_size: int = 500, rescore: bool = False) -> dict:
+    """
+    Score completed PROM instances from their stored responses.
+
+    Only instances with no score (or, with rescore=True, a score from an
+    older plan version) are processed. Each batch is one schedule query, one
+    answer read (load_answers), one scoring pass per instrument and one commit.
+    """
+    summary = {"scored": 0, "skipped": 0, "batches": 0}
+    last_id = 0
+
+    while True:
+        q = (
+            db.query(PromSchedule.id, PromSchedule.prom_name, PromScore.plan_version)
+            .outerjoin(PromScore, PromScore.schedule_id == PromSchedule.id)
+            .filter(PromSchedule.status == "completed", PromSchedule.id > last_id)
+        )
+        if not rescore:
+            q = q.filter(PromScore.schedule_id.is_(None))
+
+        batch = q.order_by(PromSchedule.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+
+        answers = load_answers(db, [row.id for row in batch])
+
+        by_prom: dict[str, list] = defaultdict(list)
+        for row in batch:
+            if row.id in answers:
+                by_prom[row.prom_name].append(row)
+            else:
+                summary["skipped"] += 1
+
+        for prom_name, rows in by_prom.items():
+            try:
+                plan = get_scoring_plan(prom_name)
+            except (FileNotFoundError, ValueError):
+                summary["skipped"] += len(rows)
+                continue
+
+            todo = [r for r in rows if r.plan_version != plan.version]
+            summary["skipped"] += len(rows) - len(todo)
+
+            results = score_many(plan, [plan.vectorise(answers[r.id]) for r in todo])
+            for r, result in zip(todo, results):
+                save_score(db, r.id, result)
+            update_outcomes(db, schedule_ids=[r.id for r in todo])
+            summary["scored"] += len(todo)
+
+        db.commit()
+        summary["batches"] += 1
+
+    return summary
+
+
+def latest_scores_query(db: Session, patient_id: int | None = None, prom_name: str | None = None):
+    """Stored scores joined to their schedule, without reading the answers."""
+    q = db.query(PromSchedule, PromScore).join(PromScore, PromScore.schedule_id == PromSchedule.id)
+    if patient_id is not None:
+        q = q.filter(PromSchedule.patient_id == patient_id)
+    if prom_name is not None:
+        q = q.filter(PromScore.prom_name == prom_name)
+    return q.order_by(PromSchedule.due_date)
+
+
+if __name__ == "__main__":
+    # python -m app.services.prom_scores [--batch-size N] [--rescore]
+    from app.core.config import SessionLocal
+    import app.models  # noqa: F401  (register tables)
+
+    parser = argparse.ArgumentParser(description="Backfill prom_scores from stored PROM answers")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--rescore", action="store_true", help="also re-score rows from older plan versions")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        print(backfill_scores(db, batch_size=args.batch_size, rescore=args.rescore))
+    finally:
+        db.close()
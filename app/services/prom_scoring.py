@@ -0,0 +1,276 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Mapping, Sequence
+
+from app.utils.prom_loader import PromTemplate, get_cached_template
+
+
+# Per-instrument scoring rules. Everything else (item order, ranges,
+# subscale membership) comes from the JSON template.
+#
+# method:
+#   "sum"       - total = sum of items, missing items imputed with the mean
+#                 of the answered ones (up to max_missing)
+#   "subscale"  - each subscale transformed to 0-100 from its mean item score
+#                 (KOOS style, at least min_answered_fraction of items needed)
+#   "quickdash" - ((sum / n) - 1) * 25 over answered items (>= n - max_missing)
+#
+# higher_is_better describes the raw item direction; `normalised` scores are
+# always 0-100 with 100 = best. None means the direction is unknown and no
+# normalised score is produced.
+@dataclass(frozen=True)
+class ScoringRule:
+    method: str
+    version: str = "1"
+    higher_is_better: bool | None = None
+    max_missing: int = 0
+    min_answered_fraction: float = 0.5
+    reverse_items: tuple[str, ...] = ()
+
+
+SCORING_RULES: dict[str, ScoringRule] = {
+    # Original 12-60 Oxford scoring: 1 = no problem, 5 = worst
+    "OXFORDKNEESCORE": ScoringRule(method="sum", higher_is_better=False, max_missing=2),
+    "OXFORDHIPSCORE": ScoringRule(method="sum", higher_is_better=False, max_missing=2),
+    # Items 0 = none .. 4 = extreme, subscales 100 = no problems
+    "KOOS": ScoringRule(method="subscale", higher_is_better=False, min_answered_fraction=0.5),
+    # 11 items, 1-5, score 0 (no disability) - 100, at most one missing
+    "QUICKDASH": ScoringRule(method="quickdash", higher_is_better=False, max_missing=1),
+}
+
+DEFAULT_RULE = ScoringRule(method="sum")
+
+
+@dataclass(frozen=True)
+class ScoringPlan:
+    """
+    A template compiled for scoring: answers are laid out as a vector in
+    template question order and every rule works on integer positions.
+    """
+    prom_name: str
+    version: str
+    rule: ScoringRule
+    template_checksum: str
+
+    question_ids: tuple[str, ...]
+    positions: Mapping[str, int]
+    item_min: tuple[int, ...]
+    item_max: tuple[int, ...]
+    reversed_positions: frozenset[int]
+
+    # (subscale name, item positions) in template order
+    subscales: tuple[tuple[str, tuple[int, ...]], ...]
+
+    @property
+    def n_items(self) -> int:
+        return len(self.question_ids)
+
+    def vectorise(self, answers: Mapping[str, int]) -> list[int | None]:
+        """Answers keyed by question id -> vector in template order."""
+        row: list[int | None] = [None] * len(self.question_ids)
+        positions = self.positions
+        for qid, value in answers.items():
+            pos = positions.get(str(qid))
+            if pos is not None:
+                row[pos] = value
+        return row
+
+
+@dataclass(frozen=True)
+class ScoreResult:
+    prom_name: str
+    plan_version: str
+    method: str
+    answered: int
+
+    total: float | None = None
+    max_possible: float | None = None
+    normalised: float | None = None
+    subscales: dict[str, float | None] = field(default_factory=dict)
+
+    def to_payload(self) -> dict:
+        return {
+            "prom_name": self.prom_name,
+            "type": "subscales" if self.subscales else "total",
+            "value": self.total,
+            "max_possible": self.max_possible,
+            "normalised": self.normalised,
+            "subscales": self.subscales,
+            "plan_version": self.plan_version,
+        }
+
+
+def _rule_key(prom_name: str) -> str:
+    return prom_name.replace(" ", "").replace("_", "").upper()
+
+
+def _compile_subscales(template: PromTemplate, n_items: int) -> tuple[tuple[str, tuple[int, ...]], ...]:
+    declared = template.raw.get("subscales") or {}
+    if not isinstance(declared, dict):
+        raise ValueError(f"{template.prom_name}: 'subscales' must be an object")
+
+    out = []
+    cursor = 0
+    for name, spec in declared.items():
+        if isinstance(spec, int):
+            # Count form: the next `spec` questions in template order
+            positions = tuple(range(cursor, cursor + spec))
+            cursor += spec
+        elif isinstance(spec, list):
+            # Explicit list of question ids
+            unknown = [str(qid) for qid in spec if str(qid) not in template.question_index]
+            if unknown:
+                raise ValueError(f"{template.prom_name}: subscale {name} names unknown question ids {', '.join(unknown)}")
+            positions = tuple(template.question_index[str(qid)].position for qid in spec)
+        else:
+            raise ValueError(f"{template.prom_name}: subscale {name} must be a count or a list of question ids")
+        if not positions or positions[-1] >= n_items:
+            raise ValueError(f"{template.prom_name}: subscale {name} does not match the question list")
+        out.append((name, positions))
+    return tuple(out)
+
+
+def compile_plan(template: PromTemplate, rule: ScoringRule | None = None) -> ScoringPlan:
+    rule = rule or SCORING_RULES.get(_rule_key(template.prom_name), DEFAULT_RULE)
+    questions = template.questions
+
+    if not questions:
+        raise ValueError(f"{template.prom_name}: template has no questions")
+    if any(q.range_min is None or q.range_max is None for q in questions):
+        raise ValueError(f"{template.prom_name}: every question needs range_min and range_max to be scored")
+
+    subscales = _compile_subscales(template, len(questions))
+    if rule.method == "subscale" and not subscales:
+        raise ValueError(f"{template.prom_name}: subscale scoring needs 'subscales' in the template")
+
+    return ScoringPlan(
+        prom_name=template.prom_name,
+        version=f"{rule.method}-{rule.version}:{template.checksum[:8]}",
+        rule=rule,
+        template_checksum=template.checksum,
+        question_ids=template.question_ids,
+        positions=MappingProxyType({q.id: q.position for q in questions}),
+        item_min=tuple(q.range_min for q in questions),
+        item_max=tuple(q.range_max for q in questions),
+        reversed_positions=frozenset(template.question_index[qid].position for qid in rule.reverse_items),
+        subscales=subscales,
+    )
+
+
+def _normalise(raw: float, lo: float, hi: float, higher_is_better: bool | None) -> float | None:
+    if higher_is_better is None or hi == lo:
+        return None
+    pct = (raw - lo) * 100.0 / (hi - lo)
+    return round(pct if higher_is_better else 100.0 - pct, 2)
+
+
+def _score_sum(plan: ScoringPlan, row: Sequence[int | None]) -> ScoreResult:
+    answered = [v for v in row if v is not None]
+    n = plan.n_items
+    lo = sum(plan.item_min)
+    hi = sum(plan.item_max)
+
+    if not answered or n - len(answered) > plan.rule.max_missing:
+        return ScoreResult(plan.prom_name, plan.version, plan.rule.method, len(answered), max_possible=hi)
+
+    total = sum(answered)
+    if len(answered) < n:
+        total = round(total * n / len(answered), 2)
+
+    return ScoreResult(
+        plan.prom_name, plan.version, plan.rule.method, len(answered),
+        total=total,
+        max_possible=hi,
+        normalised=_normalise(total, lo, hi, plan.rule.higher_is_better),
+    )
+
+
+def _score_subscales(plan: ScoringPlan, row: Sequence[int | None]) -> ScoreResult:
+    rule = plan.rule
+    scores: dict[str, float | None] = {}
+    answered_total = 0
+
+    for name, positions in plan.subscales:
+        values = [row[p] for p in positions if row[p] is not None]
+        answered_total += len(values)
+
+        if not values or len(values) < rule.min_answered_fraction * len(positions):
+            scores[name] = None
+            continue
+
+        lo = plan.item_min[positions[0]]
+        hi = plan.item_max[positions[0]]
+        mean = sum(values) / len(values)
+        scores[name] = _normalise(mean, lo, hi, rule.higher_is_better)
+
+    return ScoreResult(plan.prom_name, plan.version, rule.method, answered_total, subscales=scores)
+
+
+def _score_quickdash(plan: ScoringPlan, row: Sequence[int | None]) -> ScoreResult:
+    answered = [v for v in row if v is not None]
+    if not answered or plan.n_items - len(answered) > plan.rule.max_missing:
+        return ScoreResult(plan.prom_name, plan.version, plan.rule.method, len(answered), max_possible=100)
+
+    disability = round((sum(answered) / len(answered) - 1) * 25, 2)
+    return ScoreResult(
+        plan.prom_name, plan.version, plan.rule.method, len(answered),
+        total=disability,
+        max_possible=100,
+        normalised=round(100 - disability, 2),
+    )
+
+
+_METHODS = {
+    "sum": _score_sum,
+    "subscale": _score_subscales,
+    "quickdash": _score_quickdash,
+}
+
+
+def _apply_reversal(plan: ScoringPlan, row: Sequence[int | None]) -> Sequence[int | None]:
+    if not plan.reversed_positions:
+        return row
+    out = list(row)
+    for p in plan.reversed_positions:
+        if out[p] is not None:
+            out[p] = plan.item_min[p] + plan.item_max[p] - out[p]
+    return out
+
+
+def score_vector(plan: ScoringPlan, row: Sequence[int | None]) -> ScoreResult:
+    return _METHODS[plan.rule.method](plan, _apply_reversal(plan, row))
+
+
+def score_answers(plan: ScoringPlan, answers: Mapping[str, int]) -> ScoreResult:
+    return score_vector(plan, plan.vectorise(answers))
+
+
+def score_many(plan: ScoringPlan, rows: Iterable[Sequence[int | None]]) -> list[ScoreResult]:
+    """Score a batch of answer vectors (e.g. for re-scoring stored submissions)."""
+    method = _METHODS[plan.rule.method]
+    if plan.reversed_positions:
+        return [method(plan, _apply_reversal(plan, row)) for row in rows]
+    return [method(plan, row) for row in rows]
+
+
+_plans: dict[str, ScoringPlan] = {}
+_plans_lock = threading.Lock()
+
+
+def get_scoring_plan(prom_name: str) -> ScoringPlan:
+    """
+    Compiled plan for an instrument. Recompiled only when the underlying
+    template changes (the template registry handles file invalidation).
+    """
+    template = get_cached_template(prom_name)
+    key = _rule_key(template.prom_name)
+
+    with _plans_lock:
+        plan = _plans.get(key)
+        if plan is None or plan.template_checksum != template.checksum:
+            plan = compile_plan(template)
+            _plans[key] = plan
+        return plan
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from app.models.prom_schedule import PromSchedule
+from app.schemas.prom_submit import PromAnswer, PromSubmitItemIn
+from app.services.outcomes import update_outcomes
+from app.services.prom_forms import form_cache
+from app.services.prom_responses import has_answers, store_answers
+from app.services.prom_scores import save_scores_bulk
+from app.services.prom_scoring import get_scoring_plan, score_many
+from app.utils.prom_loader import InvalidPromTemplate, PromTemplate, get_cached_template
+
+class SubmissionError(ValueError):
+    """An answer set that cannot be accepted; `reason` is a stable code for clients."""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
+def check_schedule(status: str | None, has_responses: bool) -> None:
+    status = (status or "").lower()
+    if status == "completed":
+        raise SubmissionError("completed", "PROM already completed")
+    if status == "cancelled":
+        raise SubmissionError("cancelled", "PROM was cancelled")
+    if has_responses:
+        raise SubmissionError("already_answered", "Responses already exist for this PROM")
+
+
+def check_answers(template: PromTemplate, answers: Sequence[PromAnswer]) -> dict[str, int]:
+    """Validate answers against the template; question id -> value."""
+    if not template.questions:
+        raise SubmissionError("invalid", "Template has no questions")
+
+    valid_ids = template.question_index
+    checked: dict[str, int] = {}
+
+    for answer in answers:
+        qid = str(answer.id)
+
+        q_meta = valid_ids.get(qid)
+        if q_meta is None:
+            raise SubmissionError("invalid", f"Invalid question ID: {qid}")
+
+        min_val = q_meta.range_min
+        max_val = q_meta.range_max
+        if min_val is not None and max_val is not None:
+            if not (min_val <= answer.value <= max_val):
+                raise SubmissionError(
+                    "invalid",
+                    f"Answer for question {qid} out of range ({min_val}-{max_val})",
+                )
+
+        checked[qid] = answer.value
+
+    return checked
+
+
+@dataclass
+class _Accepted:
+    prom_name: str
+    question_ids: tuple[str, ...]
+    checked: dict[str, int]
+    result: dict
+
+
+def submit_many(db: Session, items: Sequence[PromSubmitItemIn]) -> dict:
+    """
+    Store many answer sets at once (paper form entry, kiosk sync).
+
+    Each item succeeds or fails on its own: invalid items are reported and
+    the rest are stored. Schedule state for the whole batch is one query;
+    the accepted schedules are completed with one UPDATE ... RETURNING, so a
+    schedule completed concurrently by another request is reported instead
+    of answered twice. Answers and scores are bulk inserted, scores
+    computed per instrument with score_many(), then one commit.
+    """
+    ids = list(dict.fromkeys(item.schedule_id for item in items))
+    state = {
+        row.id: row
+        for row in db.execute(
+            select(
+                PromSchedule.id,
+                PromSchedule.prom_name,
+                PromSchedule.status,
+                has_answers(PromSchedule.id).label("has_responses"),
+            )
+            .where(PromSchedule.id.in_(ids))
+        )
+    }
+
+    results: list[dict] = []
+    accepted: dict[int, _Accepted] = {}
+
+    for item in items:
+        result = {"schedule_id": item.schedule_id, "ok": False}
+        results.append(result)
+        try:
+            if item.schedule_id in accepted:
+                raise SubmissionError("duplicate", "Schedule appears more than once in this batch")
+
+            row = state.get(item.schedule_id)
+            if row is None:
+                raise SubmissionError("not_found", "Schedule not found")
+            check_schedule(row.status, row.has_responses)
+
+            try:
+                template = get_cached_template(row.prom_name)
+            except FileNotFoundError:
+                raise SubmissionError("template_missing", "PROM template missing")
+            except InvalidPromTemplate as e:
+                raise SubmissionError("template_invalid", str(e))
+
+            checked = check_answers(template, item.answers)
+            accepted[item.schedule_id] = _Accepted(row.prom_name, template.question_ids, checked, result)
+        except SubmissionError as e:
+            result.update({"reason": e.reason, "error": str(e)})
+
+    completed: list[int] = []
+    if accepted:
+        completed = db.execute(
+            update(PromSchedule)
+            .where(
+                PromSchedule.id.in_(list(accepted)),
+                PromSchedule.status.not_in(("completed", "cancelled")),
+            )
+            .values(status="completed", completed_date=date.today())
+            .returning(PromSchedule.id)
+            .execution_options(synchronize_session=False)
+        ).scalars().all()
+
+    done = set(completed)
+    for schedule_id, a in accepted.items():
+        if schedule_id not in done:
+            a.result.update({"reason": "completed", "error": "PROM already completed"})
+
+    store_answers(db, [
+        (schedule_id, accepted[schedule_id].prom_name, accepted[schedule_id].question_ids, accepted[schedule_id].checked)
+        for schedule_id in completed
+    ])
+
+    by_prom: dict[str, list[int]] = defaultdict(list)
+    for schedule_id in completed:
+        by_prom[accepted[schedule_id].prom_name].append(schedule_id)
+
+    scores = []
+    for prom_name, schedule_ids in by_prom.items():
+        try:
+            plan = get_scoring_plan(prom_name)
+        except ValueError:
+            # Template can't be compiled into a scoring plan (e.g. unbounded items)
+            for schedule_id in schedule_ids:
+                accepted[schedule_id].result["score"] = {"prom_name": prom_name, "type": "not_implemented", "value": None}
+            continue
+
+        vectors = [plan.vectorise(accepted[sid].checked) for sid in schedule_ids]
+        for schedule_id, score in zip(schedule_ids, score_many(plan, vectors)):
+            scores.append((schedule_id, score))
+            accepted[schedule_id].result["score"] = score.to_payload()
+
+    save_scores_bulk(db, scores)
+    update_outcomes(db, schedule_ids=[sid for sid, _ in scores])
+    db.commit()
+    form_cache.invalidate(completed)
+
+    for schedule_id in completed:
+        a = accepted[schedule_id]
+        a.result.update({"ok": True, "prom_name": a.prom_name, "answered_questions": len(a.checked)})
+
+    return {
+        "items": len(items),
+        "submitted": len(completed),
+        "failed": len(items) - len(completed),
+        "reasons": dict(Counter(r["reason"] for r in results if not r["ok"])),
+        "results": results,
+    }
@@ -0,0 +1,229 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+from datetime import date, datetime, timedelta
+from typing import Sequence
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import SessionLocal
+from app.models.case_episode import CaseEpisode
+from app.models.job_run import JobRun
+from app.models.patient import Patient
+from app.models.prom_schedule import PromSchedule
+from app.services.prom_forms import form_cache
+from app.services.prom_protocols import get_protocol_table
+
+log = logging.getLogger(__name__)
+
+WORKLIST_STATUSES = ("pending", "overdue", "completed", "cancelled")
+DEFAULT_WORKLIST_STATUSES = ("pending", "overdue")
+
+# Rows scheduled before protocols (no window_end) go overdue this long after due_date
+OVERDUE_GRACE_DAYS = int(os.getenv("OVERDUE_GRACE_DAYS", "28"))
+# Seconds between sweeps (0 disables the background sweeper)
+OVERDUE_SWEEP_SECONDS = float(os.getenv("OVERDUE_SWEEP_SECONDS", "3600"))
+
+SWEEP_JOB = "prom_overdue_sweep"
+
+
+def parse_statuses(statuses: str | None) -> tuple[str, ...]:
+    """'pending,overdue' -> ("pending", "overdue"); None -> open statuses."""
+    if not statuses:
+        return DEFAULT_WORKLIST_STATUSES
+    requested = tuple(dict.fromkeys(s.strip().lower() for s in statuses.split(",") if s.strip()))
+    unknown = set(requested) - set(WORKLIST_STATUSES)
+    if unknown:
+        raise ValueError(f"Unknown status: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def worklist_query(
+    db: Session,
+    statuses: Sequence[str] = DEFAULT_WORKLIST_STATUSES,
+    due_from: date | None = None,
+    due_to: date | None = None,
+    open_on: date | None = None,
+    surgeon_name: str | None = None,
+    joint_type: str | None = None,
+    prom_name: str | None = None,
+):
+    """
+    Schedules across all patients with their case/patient context.
+    status + due_date ranges are served by ix_prom_schedules_status_due_date.
+    """
+    q = (
+        db.query(
+            PromSchedule.id,
+            PromSchedule.patient_id,
+            PromSchedule.case_id,
+            PromSchedule.prom_name,
+            PromSchedule.due_date,
+            PromSchedule.window_start,
+            PromSchedule.window_end,
+            PromSchedule.status,
+            PromSchedule.completed_date,
+            Patient.full_name.label("patient_name"),
+            CaseEpisode.surgeon_name,
+            CaseEpisode.joint_type,
+            CaseEpisode.date_of_surgery,
+        )
+        .join(CaseEpisode, CaseEpisode.id == PromSchedule.case_id)
+        .join(Patient, Patient.id == PromSchedule.patient_id)
+        .filter(PromSchedule.status.in_(statuses))
+    )
+    if due_from is not None:
+        q = q.filter(PromSchedule.due_date >= due_from)
+    if due_to is not None:
+        q = q.filter(PromSchedule.due_date <= due_to)
+    if open_on is not None:
+        # Collection window contains the date ("due today")
+        q = q.filter(PromSchedule.window_start <= open_on, PromSchedule.window_end >= open_on)
+    if surgeon_name:
+        q = q.filter(CaseEpisode.surgeon_name == surgeon_name)
+    if joint_type:
+        q = q.filter(CaseEpisode.joint_type.ilike(joint_type.strip()))
+    if prom_name:
+        q = q.filter(PromSchedule.prom_name == prom_name)
+    return q
+
+
+def _stored_window_after_bounds(db: Session) -> tuple[int, int] | None:
+    """(shortest, longest) window_end - due_date over pending rows (one scan)."""
+    shortest = longest = None
+    for due_date, window_end in db.execute(
+        select(PromSchedule.due_date, PromSchedule.window_end)
+        .where(PromSchedule.status == "pending", PromSchedule.window_end.is_not(None))
+        .execution_options(yield_per=5000)
+    ):
+        after = (window_end - due_date).days
+        shortest = after if shortest is None else min(shortest, after)
+        longest = after if longest is None else max(longest, after)
+    return None if shortest is None else (shortest, longest)
+
+
+def _window_after_bounds(db: Session, state: JobRun) -> tuple[str, int, int]:
+    """
+    (protocols checksum, shortest, longest) window after due_date that
+    pending rows can have. New rows get the current protocol windows, but
+    rows stored under an earlier protocol version keep theirs, so when the
+    checksum differs from the last run the stored rows are scanned once and
+    the bounds carried forward in the job state.
+    """
+    table = get_protocol_table()
+    shortest, longest = table.window_after_days
+    last = state.last_result or {}
+    if last.get("protocols_checksum") == table.checksum and last.get("window_after_days"):
+        stored = last["window_after_days"]
+    else:
+        stored = _stored_window_after_bounds(db)
+    if stored:
+        shortest, longest = min(shortest, stored[0]), max(longest, stored[1])
+    return table.checksum, min(shortest, OVERDUE_GRACE_DAYS), max(longest, OVERDUE_GRACE_DAYS)
+
+
+def sweep_overdue(db: Session, today: date | None = None) -> dict:
+    """
+    Move pending schedules whose collection window has closed to 'overdue'.
+
+    A row closes when due_date + window_after < today, so only pending rows
+    with due_date < today - (shortest window) can qualify, and rows that
+    closed before the previous run were already moved, which bounds
+    due_date from below by the last watermark - (longest window). Window
+    bounds cover the current protocols and rows stored under earlier
+    protocol versions (see _window_after_bounds). The update is one range
+    scan on (status, due_date) whose size depends on the rows near the
+    boundary, not on the table.
+    """
+    today = today or date.today()
+
+    state = db.get(JobRun, SWEEP_JOB)
+    if state is None:
+        state = JobRun(name=SWEEP_JOB)
+        db.add(state)
+    checksum, min_after, max_after = _window_after_bounds(db, state)
+
+    conditions = [
+        PromSchedule.status == "pending",
+        PromSchedule.due_date < today - timedelta(days=min_after),
+        or_(
+            PromSchedule.window_end < today,
+            and_(
+                PromSchedule.window_end.is_(None),
+                PromSchedule.due_date < today - timedelta(days=OVERDUE_GRACE_DAYS),
+            ),
+        ),
+    ]
+    if state.watermark is not None:
+        conditions.append(PromSchedule.due_date >= state.watermark - timedelta(days=max_after))
+
+    swept = db.execute(
+        update(PromSchedule)
+        .where(*conditions)
+        .values(status="overdue")
+        .returning(PromSchedule.id)
+        .execution_options(synchronize_session=False)
+    ).scalars().all()
+
+    summary = {
+        "overdue": len(swept),
+        "today": today.isoformat(),
+        "since": state.watermark.isoformat() if state.watermark else None,
+    }
+    state.watermark = today
+    state.last_run_at = datetime.utcnow()
+    # Bounds already include OVERDUE_GRACE_DAYS; that only widens them
+    state.last_result = {**summary, "protocols_checksum": checksum, "window_after_days": [min_after, max_after]}
+    db.commit()
+    form_cache.invalidate(swept)
+    return summary
+
+
+class OverdueSweeper:
+    """Background thread running sweep_overdue() every `interval_seconds`."""
+
+    def __init__(self, interval_seconds: float = OVERDUE_SWEEP_SECONDS, session_factory: sessionmaker = SessionLocal):
+        self.interval_seconds = interval_seconds
+        self.session_factory = session_factory
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="prom-overdue-sweep", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with self.session_factory() as db:
+                    sweep_overdue(db)
+            except Exception:
+                log.exception("Overdue PROM sweep failed")
+            self._stop.wait(self.interval_seconds)
+
+
+overdue_sweeper = OverdueSweeper()
+
+
+if __name__ == "__main__":
+    # python -m app.services.prom_worklist  (one sweep, e.g. from cron)
+    import app.models  # noqa: F401  (register tables)
+
+    argparse.ArgumentParser(description="Mark PROM schedules past their window as overdue").parse_args()
+
+    with SessionLocal() as db:
+        print(sweep_overdue(db))
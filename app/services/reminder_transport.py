@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import random
+import smtplib
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.message import EmailMessage
+
+from starlette.concurrency import run_in_threadpool
+
+log = logging.getLogger(__name__)
+
+# file: write messages to REMINDER_OUTBOX (offline default)
+# smtp: send email via SMTP_HOST:SMTP_PORT, e.g. `python -m aiosmtpd -n -l localhost:1025`
+REMINDER_TRANSPORT = os.getenv("REMINDER_TRANSPORT", "file")
+REMINDER_OUTBOX = os.getenv("REMINDER_OUTBOX", "reminder_outbox")
+REMINDER_FROM = os.getenv("REMINDER_FROM", "proms@surgiflow.local")
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "1025"))
+
+REMINDER_CONCURRENCY = int(os.getenv("REMINDER_CONCURRENCY", "8"))
+REMINDER_MAX_RETRIES = int(os.getenv("REMINDER_MAX_RETRIES", "3"))
+REMINDER_BACKOFF_SECONDS = float(os.getenv("REMINDER_BACKOFF_SECONDS", "0.5"))
+
+
+@dataclass
+class Message:
+    reminder_id: int
+    channel: str  # email / sms
+    recipient: str
+    subject: str
+    body: str
+
+    # Filled in by the dispatcher
+    sent: bool = False
+    attempts: int = 0
+    error: str | None = None
+    permanent: bool = False
+
+
+class TransportError(Exception):
+    """Send failed. permanent=True means retrying will not help (bad address...)."""
+
+    def __init__(self, message: str, permanent: bool = False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+class RateLimiter:
+    """Token bucket: at most `rate` sends per second, bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Transport:
+    name = "base"
+    channels: tuple[str, ...] = ()
+
+    def __init__(self, rate_per_second: float = 0, burst: int = 1):
+        self.limiter = RateLimiter(rate_per_second, burst)
+
+    async def send(self, message: Message) -> None:
+        raise NotImplementedError
+
+
+class FileTransport(Transport):
+    """
+    Offline stand-in for every channel: appends each message as a JSON line
+    to <outbox>/<channel>.jsonl.
+    """
+    name = "file"
+    channels = ("email", "sms")
+
+    def __init__(self, outbox: str = REMINDER_OUTBOX, rate_per_second: float = 0, burst: int = 1):
+        super().__init__(rate_per_second, burst)
+        self.outbox = outbox
+
+    def _write(self, message: Message) -> None:
+        os.makedirs(self.outbox, exist_ok=True)
+        record = {
+            "at": datetime.utcnow().isoformat(),
+            "reminder_id": message.reminder_id,
+            "to": message.recipient,
+            "subject": message.subject,
+            "body": message.body,
+        }
+        with open(os.path.join(self.outbox, f"{message.channel}.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+
+    async def send(self, message: Message) -> None:
+        await run_in_threadpool(self._write, message)
+
+
+class SmtpTransport(Transport):
+    """Email over plain SMTP (a local debugging server by default)."""
+    name = "smtp"
+    channels = ("email",)
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, sender: str = REMINDER_FROM,
+                 rate_per_second: float = 5, burst: int = 5):
+        super().__init__(rate_per_second, burst)
+        self.host = host
+        self.port = port
+        self.sender = sender
+
+    def _send(self, message: Message) -> None:
+        email = EmailMessage()
+        email["From"] = self.sender
+        email["To"] = message.recipient
+        email["Subject"] = message.subject
+        email.set_content(message.body)
+        try:
+            with smtplib.SMTP(self.host, self.port, timeout=10) as smtp:
+                smtp.send_message(email)
+        except smtplib.SMTPRecipientsRefused as e:
+            raise TransportError(f"Recipient refused: {e}", permanent=True) from e
+
+    async def send(self, message: Message) -> None:
+        await run_in_threadpool(self._send, message)
+
+
+def default_transports() -> dict[str, Transport]:
+    """channel -> transport, from REMINDER_TRANSPORT."""
+    file_transport = FileTransport()
+    if REMINDER_TRANSPORT == "smtp":
+        # No SMS provider yet: SMS still goes to the outbox
+        return {"email": SmtpTransport(), "sms": file_transport}
+    return {"email": file_transport, "sms": file_transport}
+
+
+@dataclass
+class Dispatcher:
+    """
+    Sends messages concurrently (bounded by a semaphore), honouring each
+    transport's rate limit and retrying transient failures with exponential
+    backoff + jitter. Never raises for a single message: the outcome is
+    recorded on the Message.
+    """
+    transports: dict[str, Transport] = field(default_factory=default_transports)
+    concurrency: int = REMINDER_CONCURRENCY
+    max_retries: int = REMINDER_MAX_RETRIES
+    backoff_seconds: float = REMINDER_BACKOFF_SECONDS
+
+    async def _send_one(self, message: Message, semaphore: asyncio.Semaphore) -> Message:
+        transport = self.transports.get(message.channel)
+        if transport is None:
+            message.error = f"No transport for channel {message.channel}"
+            return message
+
+        async with semaphore:
+            for attempt in range(1, self.max_retries + 2):
+                message.attempts = attempt
+                await transport.limiter.acquire()
+                try:
+                    await transport.send(message)
+                    message.sent = True
+                    message.error = None
+                    return message
+                except TransportError as e:
+                    message.error = str(e)
+                    if e.permanent:
+                        message.permanent = True
+                        return message
+                except Exception as e:
+                    message.error = f"{type(e).__name__}: {e}"
+
+                if attempt <= self.max_retries:
+                    delay = self.backoff_seconds * 2 ** (attempt - 1)
+                    await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+            log.warning("Reminder %s failed after %s attempts: %s", message.reminder_id, message.attempts, message.error)
+            return message
+
+    async def dispatch(self, messages: list[Message]) -> list[Message]:
+        semaphore = asyncio.Semaphore(max(self.concurrency, 1))
+        return await asyncio.gather(*(self._send_one(m, semaphore) for m in messages))
+
+
+def message_summary(messages: list[Message]) -> dict:
+    return {
+        "sent": sum(1 for m in messages if m.sent),
+        "failed": sum(1 for m in messages if not m.sent),
+        "errors": [
+            {"reminder_id": m.reminder_id, "channel": m.channel, "attempts": m.attempts, "error": m.error}
+            for m in messages if not m.sent
+        ][:20],
+    }
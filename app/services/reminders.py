@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from string import Template
+
+from sqlalchemy import and_, case, exists, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import SessionLocal
+from app.models.case_episode import CaseEpisode
+from app.models.patient import Patient
+from app.models.prom_reminder import PromReminder
+from app.models.prom_schedule import PromSchedule
+from app.services.prom_protocols import get_protocol_table
+from app.services.prom_worklist import OVERDUE_GRACE_DAYS
+from app.services.reminder_transport import Dispatcher, Message, message_summary
+from app.utils.prom_loader import PROM_DIR
+
+REMINDER_TEMPLATE_DIR = os.path.join(PROM_DIR, "reminders")
+REMINDER_FORM_URL = os.getenv("REMINDER_FORM_URL", "http://127.0.0.1:8000/api/proms/form/{schedule_id}")
+
+# Schedules per run (the rest go out on the next run)
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Failed reminders are retried on later runs until this many runs tried them
+REMINDER_MAX_RUNS = int(os.getenv("REMINDER_MAX_RUNS", "3"))
+# Only remind about PROMs that went overdue recently (not back-loaded history)
+REMINDER_OVERDUE_DAYS = int(os.getenv("REMINDER_OVERDUE_DAYS", "14"))
+
+
+# =========================================================
+# MESSAGE TEMPLATES
+# =========================================================
+@dataclass(frozen=True)
+class ReminderTemplate:
+    path: str
+    mtime_ns: int
+    subject: Template
+    body: Template
+
+
+class ReminderTemplates:
+    """
+    <kind>_<channel>.txt from REMINDER_TEMPLATE_DIR: first line is the
+    subject, the rest the body ($placeholders). Re-read only on mtime change.
+    """
+
+    def __init__(self, template_dir: str = REMINDER_TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self._cache: dict[str, ReminderTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind: str, channel: str) -> ReminderTemplate:
+        path = os.path.join(self.template_dir, f"{kind}_{channel}.txt")
+        mtime_ns = os.stat(path).st_mtime_ns
+
+        with self._lock:
+            cached = self._cache.get(path)
+            if cached is not None and cached.mtime_ns == mtime_ns:
+                return cached
+
+            with open(path, encoding="utf-8") as f:
+                subject, _, body = f.read().partition("\n")
+            template = ReminderTemplate(path, mtime_ns, Template(subject.strip()), Template(body.strip() + "\n"))
+            self._cache[path] = template
+            return template
+
+    def render(self, kind: str, channel: str, context: dict) -> tuple[str, str]:
+        template = self.get(kind, channel)
+        return template.subject.safe_substitute(context), template.body.safe_substitute(context)
+
+
+reminder_templates = ReminderTemplates()
+
+
+# =========================================================
+# SELECTION + IDEMPOTENT CLAIM
+# =========================================================
+@dataclass(frozen=True)
+class ReminderCandidate:
+    schedule_id: int
+    kind: str     # due / overdue
+    channel: str  # email / sms
+    recipient: str
+    context: dict
+
+
+def select_candidates(db: Session, today: date | None = None, limit: int = REMINDER_BATCH_SIZE) -> list[ReminderCandidate]:
+    """
+    Schedules to remind about, in one query:
+    - 'due': pending and inside their collection window
+    - 'overdue': overdue, window closed within REMINDER_OVERDUE_DAYS
+    skipping channels that already have a reminder of that kind (unless it
+    failed and runs are left). Both branches are due_date ranges on
+    (status, due_date).
+    """
+    today = today or date.today()
+    table = get_protocol_table()
+    longest_after = max(table.window_after_days[1], OVERDUE_GRACE_DAYS)
+
+    due_now = and_(
+        PromSchedule.status == "pending",
+        PromSchedule.due_date <= today + timedelta(days=table.max_window_before_days),
+        PromSchedule.due_date >= today - timedelta(days=longest_after),
+        or_(
+            and_(PromSchedule.window_start <= today, PromSchedule.window_end >= today),
+            # Rows scheduled before protocols have no window
+            and_(PromSchedule.window_start.is_(None), PromSchedule.due_date <= today),
+        ),
+    )
+    recently_overdue = and_(
+        PromSchedule.status == "overdue",
+        PromSchedule.due_date >= today - timedelta(days=REMINDER_OVERDUE_DAYS + longest_after),
+        or_(
+            PromSchedule.window_end >= today - timedelta(days=REMINDER_OVERDUE_DAYS),
+            PromSchedule.window_end.is_(None),
+        ),
+    )
+    kind = case((PromSchedule.status == "overdue", "overdue"), else_="due")
+
+    def already(channel: str):
+        return exists().where(
+            PromReminder.schedule_id == PromSchedule.id,
+            PromReminder.kind == kind,
+            PromReminder.channel == channel,
+            or_(PromReminder.status != "failed", PromReminder.attempts >= REMINDER_MAX_RUNS),
+        )
+
+    # Per channel, so a failed SMS is retried even when the email went out
+    email_to = case((already("email"), None), else_=Patient.email)
+    sms_to = case((already("sms"), None), else_=Patient.phone)
+
+    rows = db.execute(
+        select(
+            PromSchedule.id,
+            PromSchedule.prom_name,
+            PromSchedule.due_date,
+            PromSchedule.window_end,
+            kind.label("kind"),
+            Patient.full_name,
+            Patient.preferred_name,
+            email_to.label("email"),
+            sms_to.label("phone"),
+            CaseEpisode.joint_type,
+        )
+        .join(Patient, Patient.id == PromSchedule.patient_id)
+        .join(CaseEpisode, CaseEpisode.id == PromSchedule.case_id)
+        .where(or_(due_now, recently_overdue))
+        .where(or_(email_to.is_not(None), sms_to.is_not(None)))
+        .order_by(PromSchedule.due_date, PromSchedule.id)
+        .limit(limit)
+    ).all()
+
+    candidates = []
+    for r in rows:
+        context = {
+            "patient_name": r.preferred_name or r.full_name,
+            "prom_name": r.prom_name,
+            "due_date": r.due_date.isoformat(),
+            "window_end": (r.window_end or r.due_date + timedelta(days=OVERDUE_GRACE_DAYS)).isoformat(),
+            "joint_type": (r.joint_type or "").lower(),
+            "form_url": REMINDER_FORM_URL.format(schedule_id=r.id),
+        }
+        for channel, recipient in (("email", r.email), ("sms", r.phone)):
+            if recipient and recipient.strip():
+                candidates.append(ReminderCandidate(r.id, r.kind, channel, recipient.strip(), context))
+    return candidates
+
+
+def claim(db: Session, candidates: list[ReminderCandidate]) -> list[tuple[PromReminder, ReminderCandidate]]:
+    """
+    Record a 'sending' row per candidate before anything is sent. The
+    (schedule, kind, channel) unique key makes this the idempotency check:
+    a candidate another dispatcher claimed first is skipped. Commits.
+    """
+    if not candidates:
+        return []
+
+    keys = {(c.schedule_id, c.kind, c.channel) for c in candidates}
+    retry = {
+        (r.schedule_id, r.kind, r.channel): r
+        for r in db.execute(
+            select(PromReminder).where(
+                PromReminder.schedule_id.in_({c.schedule_id for c in candidates}),
+                PromReminder.status == "failed",
+                PromReminder.attempts < REMINDER_MAX_RUNS,
+            )
+        ).scalars()
+        if (r.schedule_id, r.kind, r.channel) in keys
+    }
+
+    claimed = []
+    for c in candidates:
+        key = (c.schedule_id, c.kind, c.channel)
+        reminder = retry.get(key)
+        try:
+            with db.begin_nested():
+                if reminder is not None:
+                    reminder.status = "sending"
+                    reminder.recipient = c.recipient
+                else:
+                    reminder = PromReminder(
+                        schedule_id=c.schedule_id,
+                        kind=c.kind,
+                        channel=c.channel,
+                        recipient=c.recipient,
+                        status="sending",
+                        attempts=0,
+                    )
+                    db.add(reminder)
+                db.flush()
+        except IntegrityError:
+            continue
+        claimed.append((reminder, c))
+
+    db.commit()
+    return claimed
+
+
+def record_results(db: Session, messages: list[Message]) -> None:
+    by_id = {m.reminder_id: m for m in messages}
+    now = datetime.utcnow()
+    for reminder in db.execute(select(PromReminder).where(PromReminder.id.in_(list(by_id)))).scalars():
+        m = by_id[reminder.id]
+        reminder.attempts += 1
+        # Permanent failures (bad address...) are not retried by later runs
+        reminder.status = "sent" if m.sent else "rejected" if m.permanent else "failed"
+        reminder.error = None if m.sent else (m.error or "")[:2000]
+        reminder.sent_at = now if m.sent else None
+    db.commit()
+
+
+# =========================================================
+# RUN
+# =========================================================
+def _prepare(session_factory: sessionmaker, today: date | None, limit: int, dry_run: bool) -> tuple[list[Message], int]:
+    with session_factory() as db:
+        candidates = select_candidates(db, today, limit)
+        if dry_run:
+            return [], len(candidates)
+
+        messages = []
+        for reminder, c in claim(db, candidates):
+            subject, body = reminder_templates.render(c.kind, c.channel, c.context)
+            messages.append(Message(reminder.id, c.channel, c.recipient, subject, body))
+        return messages, len(candidates)
+
+
+def _record(session_factory: sessionmaker, messages: list[Message]) -> None:
+    with session_factory() as db:
+        record_results(db, messages)
+
+
+async def run_reminders(
+    today: date | None = None,
+    limit: int = REMINDER_BATCH_SIZE,
+    dry_run: bool = False,
+    dispatcher: Dispatcher | None = None,
+    session_factory: sessionmaker = SessionLocal,
+) -> dict:
+    """One reminder run: select + claim (one transaction), send, record."""
+    messages, selected = await run_in_threadpool(_prepare, session_factory, today, limit, dry_run)
+    if dry_run:
+        return {"selected": selected, "claimed": 0, "dry_run": True}
+
+    await (dispatcher or Dispatcher()).dispatch(messages)
+    await run_in_threadpool(_record, session_factory, messages)
+
+    return {"selected": selected, "claimed": len(messages), "dry_run": False, **message_summary(messages)}
+
+
+if __name__ == "__main__":
+    # python -m app.services.reminders [--dry-run] [--limit N]  (e.g. from cron)
+    import app.models  # noqa: F401  (register tables)
+
+    parser = argparse.ArgumentParser(description="Send due/overdue PROM reminders")
+    parser.add_argument("--dry-run", action="store_true", help="only count what would be sent")
+    parser.add_argument("--limit", type=int, default=REMINDER_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(asyncio.run(run_reminders(limit=args.limit, dry_run=args.dry_run)))
@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Iterable, Mapping, Sequence
+
+from sqlalchemy import and_, delete, insert, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# Rows per bulk insert when writing facts / rollups
+INSERT_CHUNK_SIZE = 5000
+
+
+def parse_group_by(group_by: str | None, fields: Mapping[str, str]) -> tuple[str, ...]:
+    """'surgeon,joint' -> the mapped column names, sorted; None -> no grouping."""
+    if not group_by:
+        return ()
+    requested = {g.strip().lower() for g in group_by.split(",") if g.strip()}
+    unknown = requested - fields.keys()
+    if unknown:
+        raise ValueError(f"Unknown group_by: {', '.join(sorted(unknown))}")
+    return tuple(fields[g] for g in sorted(requested))
+
+
+def norm(value: str | None, upper: bool = False) -> str:
+    """Cohort value as stored in facts / rollups ("" if unknown)."""
+    value = (value or "").strip()
+    return value.upper() if upper else value
+
+
+@dataclass
+class Rollup:
+    """Additive totals for one cohort: named sums and histogram bin counts."""
+    sums: dict[str, float] = field(default_factory=dict)
+    bins: dict[tuple, int] = field(default_factory=dict)
+
+    def add(self, sums: Mapping[str, float], bins: Iterable[tuple], sign: int = 1) -> None:
+        for name, value in sums.items():
+            self.sums[name] = self.sums.get(name, 0) + sign * value
+        for b in bins:
+            self.bins[b] = self.bins.get(b, 0) + sign
+
+    def merge(self, other: "Rollup") -> None:
+        for name, value in other.sums.items():
+            self.sums[name] = self.sums.get(name, 0) + value
+        for b, n in other.bins.items():
+            self.bins[b] = self.bins.get(b, 0) + n
+
+    def get(self, name: str) -> float:
+        return self.sums.get(name, 0)
+
+
+@dataclass(frozen=True)
+class RollupSpec:
+    """
+    How a service's facts map onto its rollup and bin tables.
+
+    Fact classes are frozen dataclasses whose fields are the fact table's
+    columns, with `cohort` (values of `key`, in order), `as_row()` and
+    `contribution()` -> (sums, bins) for Rollup.add().
+    """
+    fact_cls: type
+    fact_model: type
+    fact_id: str              # primary key column of fact_model
+    scope: str                # column facts are refreshed by, e.g. case_id
+    rollup_model: type
+    bin_model: type           # key + bin columns + n
+    key: tuple[str, ...]      # cohort columns of rollup_model and bin_model
+    sums: tuple[str, ...]     # additive columns of rollup_model
+    bin_cols: tuple[str, ...] # columns of a Rollup.bins key
+    count: str                # the sum that is 0 once a cohort is empty
+
+
+def _rows(spec: RollupSpec, rollups: Mapping[tuple, Rollup]) -> tuple[list[dict], list[dict]]:
+    """Rollup and bin table rows, in key order (upserts lock rows in the same order everywhere)."""
+    now = datetime.utcnow()
+    rollup_rows, bin_rows = [], []
+    for key in sorted(rollups):
+        rollup = rollups[key]
+        cohort = dict(zip(spec.key, key))
+        rollup_rows.append({**cohort, **{name: rollup.get(name) for name in spec.sums}, "updated_at": now})
+        bin_rows.extend(
+            {**cohort, **dict(zip(spec.bin_cols, b)), "n": n}
+            for b, n in sorted(rollup.bins.items()) if n
+        )
+    return rollup_rows, bin_rows
+
+
+def _upsert(db: Session, model: type, rows: list[dict], index: Sequence[str], add: Sequence[str]) -> None:
+    """INSERT ... ON CONFLICT DO UPDATE adding `add` columns onto the stored row, in one statement."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        raise ValueError(f"Rollup upserts are not supported on {dialect}")
+
+    stmt = dialect_insert(model)
+    update = {c: getattr(model, c) + stmt.excluded[c] for c in add}
+    if "updated_at" in rows[0]:
+        update["updated_at"] = stmt.excluded.updated_at
+    db.execute(stmt.on_conflict_do_update(index_elements=list(index), set_=update), rows)
+
+
+def _apply(db: Session, spec: RollupSpec, changes: dict[tuple, Rollup]) -> None:
+    """
+    Add per-cohort changes to the rollup and bin rows. Each row is updated
+    by an atomic upsert, so concurrent writers (including two creating the
+    same cohort) never lose or reject an update. Rows left empty are dropped.
+    """
+    if not changes:
+        return
+
+    rollup_rows, bin_rows = _rows(spec, changes)
+    _upsert(db, spec.rollup_model, rollup_rows, spec.key, spec.sums)
+    if bin_rows:
+        _upsert(db, spec.bin_model, bin_rows, spec.key + spec.bin_cols, ("n",))
+
+    keys = list(changes)
+    for model, column in ((spec.rollup_model, spec.count), (spec.bin_model, "n")):
+        db.execute(
+            delete(model)
+            .where(tuple_(*(getattr(model, k) for k in spec.key)).in_(keys), getattr(model, column) <= 0)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def sync_facts(db: Session, spec: RollupSpec, scope_ids: Sequence[int], new_facts: Iterable) -> int:
+    """
+    Replace the stored facts of the given scope (e.g. cases) with
+    `new_facts` and apply only the difference to the rollups.
+    Does not commit. Returns the facts changed.
+    """
+    fact_id = lambda f: getattr(f, spec.fact_id)  # noqa: E731
+    new = {fact_id(f): f for f in new_facts}
+    old = {
+        fact_id(r): spec.fact_cls(**{c: getattr(r, c) for c in spec.fact_cls.__dataclass_fields__})
+        for r in db.execute(
+            select(spec.fact_model).where(getattr(spec.fact_model, spec.scope).in_(list(scope_ids)))
+        ).scalars()
+    }
+
+    changes: dict[tuple, Rollup] = {}
+    removed = [f for fid, f in old.items() if new.get(fid) != f]
+    added = [f for fid, f in new.items() if old.get(fid) != f]
+    for fact in removed:
+        changes.setdefault(fact.cohort, Rollup()).add(*fact.contribution(), sign=-1)
+    for fact in added:
+        changes.setdefault(fact.cohort, Rollup()).add(*fact.contribution())
+
+    if removed:
+        id_col = getattr(spec.fact_model, spec.fact_id)
+        db.execute(delete(spec.fact_model).where(id_col.in_([fact_id(f) for f in removed])))
+    if added:
+        db.execute(insert(spec.fact_model), [f.as_row() for f in added])
+
+    _apply(db, spec, changes)
+    return len(removed) + len(added)
+
+
+def clear(db: Session, spec: RollupSpec) -> None:
+    db.execute(delete(spec.bin_model))
+    db.execute(delete(spec.rollup_model))
+    db.execute(delete(spec.fact_model))
+
+
+def write_facts(db: Session, spec: RollupSpec, facts: Iterable) -> dict[tuple, Rollup]:
+    """Bulk insert facts (streamed in chunks); returns their rollups per cohort."""
+    rollups: dict[tuple, Rollup] = {}
+    chunk: list[dict] = []
+    for fact in facts:
+        rollups.setdefault(fact.cohort, Rollup()).add(*fact.contribution())
+        chunk.append(fact.as_row())
+        if len(chunk) >= INSERT_CHUNK_SIZE:
+            db.execute(insert(spec.fact_model), chunk)
+            chunk = []
+    if chunk:
+        db.execute(insert(spec.fact_model), chunk)
+    return rollups
+
+
+def write_rollups(db: Session, spec: RollupSpec, rollups: dict[tuple, Rollup]) -> None:
+    """Bulk insert rollups into emptied tables (see clear())."""
+    for model, rows in zip((spec.rollup_model, spec.bin_model), _rows(spec, rollups)):
+        for i in range(0, len(rows), INSERT_CHUNK_SIZE):
+            db.execute(insert(model), rows[i:i + INSERT_CHUNK_SIZE])
+
+
+def read_rollups(db: Session, spec: RollupSpec, *conditions) -> list[tuple[dict, Rollup]]:
+    """
+    (cohort column -> value, Rollup) for every rollup row matching the
+    conditions (expressions on spec.rollup_model), with its bins.
+    """
+    rollup, bins = spec.rollup_model, spec.bin_model
+    out: dict[tuple, tuple[dict, Rollup]] = {}
+    for row in db.execute(select(rollup).where(*conditions)).scalars():
+        key = tuple(getattr(row, k) for k in spec.key)
+        out[key] = (dict(zip(spec.key, key)), Rollup(sums={name: getattr(row, name) for name in spec.sums}))
+
+    same_cohort = [getattr(bins, k) == getattr(rollup, k) for k in spec.key]
+    for row in db.execute(
+        select(bins).join(rollup, and_(*same_cohort)).where(*conditions)
+    ).scalars():
+        key = tuple(getattr(row, k) for k in spec.key)
+        out[key][1].bins[tuple(getattr(row, c) for c in spec.bin_cols)] = row.n
+    return list(out.values())
+
+
+def rebuild_if_empty(db: Session, spec: RollupSpec, source, rebuild: Callable[[Session], dict]) -> dict | None:
+    """
+    Run `rebuild` when the fact table is empty but `source` (a SELECT of
+    the rows facts come from) is not, i.e. the first start after a
+    migration created or reset the tables. Returns its result, or None.
+    """
+    if db.execute(select(spec.fact_model).limit(1)).first() is not None:
+        return None
+    if db.execute(source.limit(1)).first() is None:
+        return None
+    try:
+        return rebuild(db)
+    except IntegrityError:
+        # Another process started at the same time and rebuilt first
+        db.rollback()
+        return None
+
+
+def run_rebuild_cli(description: str, rebuild: Callable[[Session], dict]) -> None:
+    """`python -m app.services.<module>` entry point for a full rebuild."""
+    from app.core.config import SessionLocal
+    import app.models  # noqa: F401  (register tables)
+
+    argparse.ArgumentParser(description=description).parse_args()
+
+    with SessionLocal() as db:
+        print(rebuild(db))
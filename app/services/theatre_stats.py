@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import math
+import os
+from dataclasses import dataclass
+from datetime import date
+from typing import Sequence
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+from app.models.case_episode import CaseEpisode
+from app.models.theatre_case_fact import TheatreCaseFact
+from app.models.theatre_daily_bin import TheatreDailyBin
+from app.models.theatre_daily_rollup import TheatreDailyRollup
+from app.services import rollups
+from app.services.rollups import Rollup, RollupSpec, norm
+
+# Scheduled theatre minutes per day (all theatres), the denominator for utilisation
+THEATRE_SESSION_MINUTES = int(os.getenv("THEATRE_SESSION_MINUTES", "480"))
+
+# Rows per fetch in rebuild_theatre_stats()
+REBUILD_CHUNK_SIZE = 5000
+
+GROUP_FIELDS = {"joint": "joint_type", "procedure": "procedure_type", "surgeon": "surgeon_name"}
+PERCENTILES = (10, 25, 50, 75, 90)
+
+_KEY = ("day", "joint_type", "procedure_type", "surgeon_name")
+
+
+def parse_group_by(group_by: str | None) -> tuple[str, ...]:
+    """'surgeon,joint' -> ("joint_type", "surgeon_name"); None -> all cases together."""
+    return rollups.parse_group_by(group_by, GROUP_FIELDS)
+
+
+# =========================================================
+# FACTS (one per completed, timed case)
+# =========================================================
+@dataclass(frozen=True)
+class CaseFact:
+    case_id: int
+    day: date
+    joint_type: str
+    procedure_type: str
+    surgeon_name: str
+    duration_minutes: int
+
+    @property
+    def cohort(self) -> tuple[date, str, str, str]:
+        return self.day, self.joint_type, self.procedure_type, self.surgeon_name
+
+    def as_row(self) -> dict:
+        return {"case_id": self.case_id, **dict(zip(_KEY, self.cohort)), "duration_minutes": self.duration_minutes}
+
+    def contribution(self) -> tuple[dict, list[tuple]]:
+        m = self.duration_minutes
+        return {"n_cases": 1, "sum_minutes": m, "sum_minutes_sq": m * m}, [(m,)]
+
+
+def _case_facts(*conditions):
+    """Facts as a SELECT over case_episodes (cohort fields normalised in SQL, as rollups.norm does)."""
+    return (
+        select(
+            CaseEpisode.id.label("case_id"),
+            CaseEpisode.date_of_surgery.label("day"),
+            func.upper(func.trim(func.coalesce(CaseEpisode.joint_type, ""))).label("joint_type"),
+            func.trim(func.coalesce(CaseEpisode.procedure_type, "")).label("procedure_type"),
+            func.trim(func.coalesce(CaseEpisode.surgeon_name, "")).label("surgeon_name"),
+            CaseEpisode.duration_minutes,
+        )
+        .where(
+            CaseEpisode.case_status == "COMPLETED",
+            CaseEpisode.duration_minutes.is_not(None),
+            *conditions,
+        )
+    )
+
+
+# =========================================================
+# ROLLUPS (counts + minute histogram per cohort-day)
+# =========================================================
+SPEC = RollupSpec(
+    fact_cls=CaseFact,
+    fact_model=TheatreCaseFact,
+    fact_id="case_id",
+    scope="case_id",
+    rollup_model=TheatreDailyRollup,
+    bin_model=TheatreDailyBin,
+    key=_KEY,
+    sums=("n_cases", "sum_minutes", "sum_minutes_sq"),
+    bin_cols=("minutes",),
+    count="n_cases",
+)
+
+
+def update_theatre_stats(db: Session, case_ids: Sequence[int]) -> int:
+    """
+    Bring facts and rollups up to date for the given cases after a write
+    (stop, edit of times / surgeon / procedure / date, restart, cancel).
+    Only the difference is applied to the rollups. Does not commit.
+    Returns the facts changed.
+    """
+    ids = list(case_ids)
+    if not ids:
+        return 0
+
+    db.flush()  # the session does not autoflush; read the caller's pending changes
+    new = [CaseFact(**row._mapping) for row in db.execute(_case_facts(CaseEpisode.id.in_(ids)))]
+    return rollups.sync_facts(db, SPEC, ids, new)
+
+
+def rebuild_theatre_stats(db: Session) -> dict:
+    """
+    Recompute every fact and rollup from case_episodes (one commit). For
+    first use and repairs. Facts are one INSERT ... SELECT; rollups come
+    from a GROUP BY over (cohort-day, duration), so Python only sees one
+    row per distinct duration in each cohort-day.
+    """
+    rollups.clear(db, SPEC)
+
+    facts = _case_facts().subquery()
+    db.execute(insert(TheatreCaseFact).from_select(list(facts.c.keys()), select(facts)))
+
+    key_cols = [getattr(TheatreCaseFact, k) for k in _KEY]
+    totals: dict[tuple, Rollup] = {}
+    for *key, minutes, n in db.execute(
+        select(*key_cols, TheatreCaseFact.duration_minutes, func.count())
+        .group_by(*key_cols, TheatreCaseFact.duration_minutes)
+        .execution_options(yield_per=REBUILD_CHUNK_SIZE)
+    ):
+        totals.setdefault(tuple(key), Rollup()).merge(Rollup(
+            sums={"n_cases": n, "sum_minutes": n * minutes, "sum_minutes_sq": n * minutes * minutes},
+            bins={(minutes,): n},
+        ))
+    rollups.write_rollups(db, SPEC, totals)
+
+    db.commit()
+    return {"cases": sum(int(r.get("n_cases")) for r in totals.values()), "cohort_days": len(totals)}
+
+
+def ensure_theatre_stats(db: Session) -> dict | None:
+    """Rebuild once at startup if timed cases exist but no facts do (new or reset tables)."""
+    return rollups.rebuild_if_empty(db, SPEC, _case_facts(), rebuild_theatre_stats)
+
+
+def _percentiles(rollup: Rollup) -> dict[str, int | None]:
+    """Nearest-rank percentiles in whole minutes."""
+    n_cases = int(rollup.get("n_cases"))
+    out: dict[str, int | None] = {f"p{p}": None for p in PERCENTILES}
+    if n_cases <= 0:
+        return out
+    ranks = [(p, max(1, math.ceil(p / 100 * n_cases))) for p in PERCENTILES]
+    seen = 0
+    i = 0
+    for (m,), n in sorted(rollup.bins.items()):
+        seen += n
+        while i < len(ranks) and seen >= ranks[i][1]:
+            out[f"p{ranks[i][0]}"] = m
+            i += 1
+    return out
+
+
+# =========================================================
+# REPORTS (rollups only)
+# =========================================================
+def _rollups(
+    db: Session,
+    date_from: date | None,
+    date_to: date | None,
+    joint_type: str | None,
+    procedure_type: str | None,
+    surgeon_name: str | None,
+) -> list[tuple[dict, Rollup]]:
+    conditions = []
+    if date_from:
+        conditions.append(TheatreDailyRollup.day >= date_from)
+    if date_to:
+        conditions.append(TheatreDailyRollup.day <= date_to)
+    if joint_type:
+        conditions.append(TheatreDailyRollup.joint_type == norm(joint_type, upper=True))
+    if procedure_type is not None:
+        conditions.append(TheatreDailyRollup.procedure_type == norm(procedure_type))
+    if surgeon_name is not None:
+        conditions.append(TheatreDailyRollup.surgeon_name == norm(surgeon_name))
+    return rollups.read_rollups(db, SPEC, *conditions)
+
+
+def duration_summary(
+    db: Session,
+    group_by: tuple[str, ...] = (),
+    date_from: date | None = None,
+    date_to: date | None = None,
+    joint_type: str | None = None,
+    procedure_type: str | None = None,
+    surgeon_name: str | None = None,
+) -> list[dict]:
+    """Case count, mean / sd and percentiles of duration per requested cohort."""
+    groups: dict[tuple, Rollup] = {}
+    for cohort, rollup in _rollups(db, date_from, date_to, joint_type, procedure_type, surgeon_name):
+        key = tuple(cohort[f] for f in group_by)
+        groups.setdefault(key, Rollup()).merge(rollup)
+
+    out = []
+    for key in sorted(groups):
+        acc = groups[key]
+        n = int(acc.get("n_cases"))
+        sum_minutes = acc.get("sum_minutes")
+        variance = (acc.get("sum_minutes_sq") - sum_minutes ** 2 / n) / (n - 1) if n > 1 else None
+        minutes = [m for (m,), c in acc.bins.items() if c]
+        out.append({
+            **dict(zip(group_by, key)),
+            "n": n,
+            "mean_minutes": round(sum_minutes / n, 1) if n else None,
+            "sd_minutes": round(math.sqrt(max(variance, 0.0)), 1) if variance is not None else None,
+            "min_minutes": min(minutes) if minutes else None,
+            "max_minutes": max(minutes) if minutes else None,
+            **_percentiles(acc),
+        })
+    return out
+
+
+def daily_utilisation(
+    db: Session,
+    date_from: date | None = None,
+    date_to: date | None = None,
+    joint_type: str | None = None,
+    procedure_type: str | None = None,
+    surgeon_name: str | None = None,
+    session_minutes: int = THEATRE_SESSION_MINUTES,
+) -> list[dict]:
+    """Cases and operating minutes per day, as a share of the scheduled session minutes."""
+    days: dict[date, list[int]] = {}
+    for cohort, rollup in _rollups(db, date_from, date_to, joint_type, procedure_type, surgeon_name):
+        totals = days.setdefault(cohort["day"], [0, 0])
+        totals[0] += int(rollup.get("n_cases"))
+        totals[1] += int(rollup.get("sum_minutes"))
+
+    return [
+        {
+            "day": day,
+            "cases": n,
+            "operating_minutes": minutes,
+            "session_minutes": session_minutes,
+            "utilisation": round(minutes / session_minutes, 3) if session_minutes > 0 else None,
+        }
+        for day, (n, minutes) in sorted(days.items())
+    ]
+
+
+if __name__ == "__main__":
+    # python -m app.services.theatre_stats  (rebuild facts + rollups from case_episodes)
+    rollups.run_rebuild_cli("Rebuild theatre duration rollups from case_episodes", rebuild_theatre_stats)
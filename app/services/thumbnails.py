@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+from app.services.patient_files import UPLOAD_DIR
+
+log = logging.getLogger(__name__)
+
+THUMB_DIR = os.path.join(UPLOAD_DIR, "thumbs")
+
+# Widths in px; the endpoint serves the smallest one >= the requested size
+THUMB_SIZES = tuple(sorted(int(s) for s in os.getenv("THUMB_SIZES", "128,256,512").split(",")))
+THUMB_WORKERS = int(os.getenv("THUMB_WORKERS", "1"))
+THUMB_JPEG_QUALITY = int(os.getenv("THUMB_JPEG_QUALITY", "80"))
+
+# Content types PyMuPDF can open, mapped to its filetype hint (blobs have no extension)
+RENDERABLE_TYPES = {
+    "application/pdf": "pdf",
+    "image/png": "png",
+    "image/jpeg": "jpeg",
+    "image/tiff": "tiff",
+}
+
+
+def thumbnail_path(sha256: str, width: int) -> str:
+    return f"{THUMB_DIR}/{sha256[:2]}/{sha256[2:4]}/{sha256}_{width}.jpg".replace(os.sep, "/")
+
+
+def pick_size(requested: int) -> int:
+    for width in THUMB_SIZES:
+        if width >= requested:
+            return width
+    return THUMB_SIZES[-1]
+
+
+def has_thumbnails(sha256: str) -> bool:
+    # The largest size is written last, so it marks a complete set
+    return os.path.isfile(thumbnail_path(sha256, THUMB_SIZES[-1]))
+
+
+def remove_thumbnails(sha256: str) -> None:
+    for width in THUMB_SIZES:
+        try:
+            os.unlink(thumbnail_path(sha256, width))
+        except FileNotFoundError:
+            pass
+
+
+def render_thumbnails(path: str, sha256: str, filetype: str) -> list[str]:
+    """
+    Runs in a worker process: render page 1 once per configured width and
+    write each as a JPEG next to the others.
+    """
+    import fitz  # PyMuPDF
+
+    written = []
+    with fitz.open(path, filetype=filetype) as doc:
+        page = doc[0]
+        for width in THUMB_SIZES:
+            scale = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+
+            out = thumbnail_path(sha256, width)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            tmp = f"{out}.{os.getpid()}.part"
+            with open(tmp, "wb") as f:
+                f.write(pix.tobytes("jpeg", jpg_quality=THUMB_JPEG_QUALITY))
+            os.replace(tmp, out)
+            written.append(out)
+    return written
+
+
+class ThumbnailWorker:
+    """
+    Renders thumbnails in a process pool, at most once per content hash:
+    requests for a hash already on disk or already rendering share the
+    same result.
+    """
+
+    def __init__(self, workers: int = THUMB_WORKERS):
+        self.workers = workers
+        self._pool: ProcessPoolExecutor | None = None
+        self._pending: dict[str, Future] = {}
+        self._failed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        if self.workers > 0 and self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+    def stop(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def request(self, sha256: str, path: str, mime_type: str | None) -> Future | None:
+        """
+        Schedule rendering if needed. Returns the pending future, or None when
+        the thumbnails already exist or cannot be produced.
+        """
+        filetype = RENDERABLE_TYPES.get(mime_type or "")
+        if filetype is None or self._pool is None or has_thumbnails(sha256):
+            return None
+
+        with self._lock:
+            if sha256 in self._failed:
+                return None
+            future = self._pending.get(sha256)
+            if future is not None:
+                return future
+            future = self._pool.submit(render_thumbnails, path, sha256, filetype)
+            self._pending[sha256] = future
+
+        # Outside the lock: the callback runs immediately if already done
+        future.add_done_callback(lambda f, key=sha256: self._finished(key, f))
+        return future
+
+    def _finished(self, sha256: str, future: Future) -> None:
+        with self._lock:
+            self._pending.pop(sha256, None)
+            if not future.cancelled() and future.exception() is not None:
+                # Unreadable/corrupt files are not retried until restart
+                self._failed.add(sha256)
+                log.warning("Thumbnail rendering failed for %s: %s", sha256, future.exception())
+
+
+thumbnail_worker = ThumbnailWorker()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import os
+from datetime import date, datetime, time, timedelta, timezone, tzinfo
+from zoneinfo import ZoneInfo
+
+# IANA zone of the theatres, e.g. Africa/Johannesburg; empty = the server's local time.
+# HH:MM times in the API are wall-clock times in this zone; timestamps are stored in UTC.
+CASE_TIMEZONE = os.getenv("CASE_TIMEZONE", "")
+
+_TZ: tzinfo | None = ZoneInfo(CASE_TIMEZONE) if CASE_TIMEZONE else None
+
+
+def now_utc() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime | None) -> datetime | None:
+    """Aware UTC; a naive value is taken as theatre-local wall-clock time."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=_TZ) if _TZ else value.astimezone()
+    return value.astimezone(timezone.utc)
+
+
+def to_local(value: datetime | None) -> datetime | None:
+    if value is None:
+        return None
+    return value.astimezone(_TZ) if _TZ else value.astimezone()
+
+
+def to_hhmm(value: datetime | None) -> str | None:
+    local = to_local(value)
+    return local.strftime("%H:%M") if local else None
+
+
+def parse_hhmm(value: str) -> time:
+    return datetime.strptime(value, "%H:%M").time()
+
+
+def theatre_times(
+    day: date,
+    cutting_time: str | None,
+    closing_time: str | None,
+) -> tuple[datetime | None, datetime | None]:
+    """
+    Start / stop timestamps for HH:MM times on the day of surgery.
+    A closing time earlier than the cutting time is on the next day
+    (a case running past midnight).
+    """
+    start = stop = None
+    if cutting_time:
+        start = as_utc(datetime.combine(day, parse_hhmm(cutting_time)))
+    if closing_time:
+        close = parse_hhmm(closing_time)
+        close_day = day
+        if cutting_time and close < parse_hhmm(cutting_time):
+            close_day = day + timedelta(days=1)
+        stop = as_utc(datetime.combine(close_day, close))
+    return start, stop
+
+
+def shift_days(value: datetime | None, days: int) -> datetime | None:
+    """The same theatre-local wall-clock time (to the second) `days` later."""
+    local = to_local(value)
+    if local is None:
+        return None
+    return as_utc(local.replace(tzinfo=None) + timedelta(days=days))
+
+
+def duration_minutes(started_at: datetime | None, stopped_at: datetime | None) -> int | None:
+    """Whole minutes between start and stop; None if either is missing or stop is before start."""
+    if started_at is None or stopped_at is None:
+        return None
+    seconds = (as_utc(stopped_at) - as_utc(started_at)).total_seconds()
+    if seconds < 0:
+        return None
+    return int(seconds // 60)
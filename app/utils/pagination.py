@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, Iterable
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value: Any, python_type: type) -> Any:
+    if value is None:
+        return None
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return python_type(value)
+
+
+def encode_cursor(values: Iterable[Any]) -> str:
+    raw = json.dumps([_to_json(v) for v in values], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError("cursor shape does not match ordering")
+        return [_from_json(v, col.type.python_type) for v, col in zip(values, columns)]
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {e}") from e
+
+
+def parse_fields(fields: str | None, allowed: Iterable[str]) -> set[str] | None:
+    """'id,full_name' -> {"id", "full_name"}; None means all fields."""
+    if not fields:
+        return None
+    requested = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = requested - set(allowed)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return requested
+
+
+def _after(order_by: list[tuple[Any, bool]], values: list):
+    # Row-value comparison "(a, b, c) > (x, y, z)" spelled out so that mixed
+    # ASC/DESC orderings and SQLite both work.
+    clauses = []
+    for i, (col, desc) in enumerate(order_by):
+        prefix = [order_by[j][0] == values[j] for j in range(i)]
+        step = col < values[i] if desc else col > values[i]
+        clauses.append(and_(*prefix, step))
+    return or_(*clauses)
+
+
+def keyset_page(
+    query: Query,
+    order_by: list[tuple[Any, bool]],
+    cursor: str | None,
+    limit: int,
+) -> tuple[list, str | None]:
+    """
+    One page of `query` ordered by `order_by` ([(column, descending), ...]).
+    The last column must be unique (normally the primary key) so the
+    ordering is stable. Returns (rows, next_cursor).
+    """
+    columns = [col for col, _ in order_by]
+
+    if cursor:
+        query = query.filter(_after(order_by, decode_cursor(cursor, columns)))
+
+    query = query.order_by(*[col.desc() if desc else col.asc() for col, desc in order_by])
+    rows = query.limit(limit + 1).all()
+
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, col.key) for col in columns)
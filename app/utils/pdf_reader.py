@@ -0,0 +1,48 @@
+import fitz  # PyMuPDF
+
+# Relative page rectangle: (x0, y0, x1, y1) as fractions of width/height
+RelRect = tuple[float, float, float, float]
+
+
+def open_pdf(path: str) -> fitz.Document:
+    return fitz.open(path)
+
+
+def page_lines(page: fitz.Page, clip: fitz.Rect | None = None) -> str:
+    """
+    Native text of a page rebuilt into visual lines.
+
+    Form PDFs often store labels and filled-in values as separate text
+    runs, so plain get_text() puts "ID nr :" and its value far apart.
+    Grouping words by vertical position keeps each label next to its value.
+    """
+    words = [w for w in page.get_text("words", clip=clip) if w[4].strip()]
+    words.sort(key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+
+    lines: list[tuple[float, float, list]] = []  # (center y, height, words)
+    for w in words:
+        cy = (w[1] + w[3]) / 2
+        h = w[3] - w[1]
+        if lines and abs(cy - lines[-1][0]) <= max(h, lines[-1][1]) / 2:
+            lines[-1][2].append(w)
+        else:
+            lines.append((cy, h, [w]))
+
+    return "\n".join(
+        " ".join(w[4] for w in sorted(line_words, key=lambda w: w[0]))
+        for _, _, line_words in lines
+    )
+
+
+def region_rect(page: fitz.Page, region: RelRect) -> fitz.Rect:
+    r = page.rect
+    x0, y0, x1, y1 = region
+    return fitz.Rect(r.x0 + x0 * r.width, r.y0 + y0 * r.height, r.x0 + x1 * r.width, r.y0 + y1 * r.height)
+
+
+def render_page(page: fitz.Page, dpi: int, clip: fitz.Rect | None = None):
+    """Rasterise (part of) a page to a PIL image."""
+    from PIL import Image
+
+    pix = page.get_pixmap(dpi=dpi, clip=clip, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
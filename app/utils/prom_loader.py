@@ -1,14 +1,204 @@
+from __future__ import annotations
+
+import hashlib
 import json
 import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+PROM_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "proms")
+
+
+class InvalidPromTemplate(ValueError):
+    """Raised when a template file exists but is not a usable PROM definition."""
+
+
+@dataclass(frozen=True)
+class PromQuestion:
+    id: str
+    position: int
+    text: str
+    range_min: int | None
+    range_max: int | None
+
+
+@dataclass(frozen=True)
+class PromTemplate:
+    """
+    Parsed, validated and pre-indexed PROM template.
+
+    Instances are shared between requests - treat them (and `raw`) as read-only.
+    """
+    prom_name: str
+    path: str
+    mtime_ns: int
+    checksum: str
+
+    raw: dict[str, Any]
+    questions: tuple[PromQuestion, ...]
+    question_index: Mapping[str, PromQuestion]
+
+    # Bounds over all questions (None if any question is unbounded)
+    range_min: int | None
+    range_max: int | None
+
+    @property
+    def question_ids(self) -> tuple[str, ...]:
+        return tuple(q.id for q in self.questions)
+
+
+def _template_key(prom_name: str) -> str:
+    return prom_name.lower().replace(" ", "_")
+
+
+def _parse_template(prom_name: str, path: str, mtime_ns: int, data: bytes) -> PromTemplate:
+    try:
+        raw = json.loads(data)
+    except json.JSONDecodeError as e:
+        raise InvalidPromTemplate(f"PROM template {prom_name} is not valid JSON: {e}") from e
+
+    if not isinstance(raw, dict):
+        raise InvalidPromTemplate(f"PROM template {prom_name} must be a JSON object")
+
+    raw_questions = raw.get("questions") or []
+    if not isinstance(raw_questions, list):
+        raise InvalidPromTemplate(f"PROM template {prom_name}: 'questions' must be a list")
+
+    questions = []
+    index: dict[str, PromQuestion] = {}
+
+    for pos, q in enumerate(raw_questions):
+        if not isinstance(q, dict) or "id" not in q:
+            raise InvalidPromTemplate(f"PROM template {prom_name}: question {pos} has no id")
+
+        qid = str(q["id"])
+        if qid in index:
+            raise InvalidPromTemplate(f"PROM template {prom_name}: duplicate question id {qid}")
+
+        lo = q.get("range_min")
+        hi = q.get("range_max")
+        if lo is not None and hi is not None and lo > hi:
+            raise InvalidPromTemplate(f"PROM template {prom_name}: question {qid} has range_min > range_max")
+
+        question = PromQuestion(id=qid, position=pos, text=q.get("text", ""), range_min=lo, range_max=hi)
+        questions.append(question)
+        index[qid] = question
+
+    bounded = questions and all(q.range_min is not None and q.range_max is not None for q in questions)
+
+    return PromTemplate(
+        prom_name=raw.get("prom_name") or prom_name,
+        path=path,
+        mtime_ns=mtime_ns,
+        checksum=hashlib.sha1(data).hexdigest(),
+        raw=raw,
+        questions=tuple(questions),
+        question_index=MappingProxyType(index),
+        range_min=min(q.range_min for q in questions) if bounded else None,
+        range_max=max(q.range_max for q in questions) if bounded else None,
+    )
+
+
+class PromTemplateRegistry:
+    """
+    In-process template cache.
+
+    Each lookup costs one stat() of the template file; the JSON is only
+    re-read and re-validated when the file's mtime changes.
+    """
+
+    def __init__(self, prom_dir: str = PROM_DIR):
+        self.prom_dir = prom_dir
+        self._lock = threading.Lock()
+        self._templates: dict[str, PromTemplate] = {}
+        self._paths: dict[str, str] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    def _index_dir(self) -> None:
+        # Map lower-cased file stems to real file names so "OxfordKneeScore"
+        # resolves to OxfordKneeScore.json on case-sensitive filesystems too.
+        paths = {}
+        if os.path.isdir(self.prom_dir):
+            for name in os.listdir(self.prom_dir):
+                stem, ext = os.path.splitext(name)
+                if ext.lower() == ".json":
+                    paths[_template_key(stem)] = os.path.join(self.prom_dir, name)
+        self._paths = paths
+
+    def _resolve(self, key: str) -> str | None:
+        path = self._paths.get(key)
+        if path is None or not os.path.exists(path):
+            self._index_dir()
+            path = self._paths.get(key)
+        return path
+
+    def get(self, prom_name: str) -> PromTemplate:
+        key = _template_key(prom_name)
+
+        with self._lock:
+            path = self._resolve(key)
+            if path is None:
+                self._templates.pop(key, None)
+                raise FileNotFoundError(f"No PROM template found: {prom_name}")
+
+            try:
+                mtime_ns = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                self._templates.pop(key, None)
+                raise FileNotFoundError(f"No PROM template found: {prom_name}")
+
+            cached = self._templates.get(key)
+            if cached is not None and cached.mtime_ns == mtime_ns and cached.path == path:
+                self.hits += 1
+                return cached
+
+            self.misses += 1
+            if cached is not None:
+                self.reloads += 1
+
+            with open(path, "rb") as f:
+                data = f.read()
+
+            template = _parse_template(prom_name, path, mtime_ns, data)
+            self._templates[key] = template
+            return template
+
+    def load_all(self) -> list[PromTemplate]:
+        """Load and validate every template in the directory (e.g. at startup)."""
+        with self._lock:
+            self._index_dir()
+            keys = list(self._paths)
+        return [self.get(k) for k in keys]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._paths.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "templates": len(self._templates),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+registry = PromTemplateRegistry()
 
-PROM_DIR = "app/proms"
 
-def load_prom_template(prom_name: str):
-    filename = prom_name.lower().replace(" ", "_") + ".json"
-    path = os.path.join(PROM_DIR, filename)
+def get_cached_template(prom_name: str) -> PromTemplate:
+    return registry.get(prom_name)
 
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"No PROM template found: {prom_name}")
 
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+def load_prom_template(prom_name: str) -> dict:
+    """Raw template JSON (shared - do not mutate)."""
+    return registry.get(prom_name).raw
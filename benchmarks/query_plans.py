@@ -0,0 +1,118 @@
+"""
+Query plans and timings for the hot access paths, before and after the
+0002_access_path_indexes migration.
+
+    python -m benchmarks.query_plans [--patients 20000]
+
+Runs against a throwaway SQLite file, never the app database.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from alembic import command
+from sqlalchemy import create_engine, insert, text
+
+from app.core.migrations import alembic_config
+from app.models import CaseEpisode, Patient, PatientFile, PromResponse, PromSchedule
+
+QUERIES = {
+    "cases by patient": (
+        "SELECT * FROM case_episodes WHERE patient_id = :pid ORDER BY date_of_surgery DESC"
+    ),
+    "files by patient": "SELECT * FROM patient_files WHERE patient_id = :pid",
+    "schedules by patient": (
+        "SELECT * FROM prom_schedules WHERE patient_id = :pid ORDER BY due_date"
+    ),
+    "schedules by case": "SELECT count(*) FROM prom_schedules WHERE case_id = :cid",
+    "due worklist": (
+        "SELECT * FROM prom_schedules WHERE status = 'pending' "
+        "AND due_date BETWEEN :lo AND :hi ORDER BY due_date"
+    ),
+    "responses by instance": "SELECT * FROM prom_responses WHERE prom_instance_id = :sid",
+}
+
+
+def seed(conn, n_patients: int) -> dict:
+    rnd = random.Random(42)
+    today = date.today()
+
+    conn.execute(insert(Patient), [{"id": i, "full_name": f"Patient {i}"} for i in range(1, n_patients + 1)])
+    conn.execute(insert(PatientFile), [
+        {"id": i, "patient_id": i, "file_path": f"uploaded_files/{i}.pdf", "filename": f"{i}.pdf"}
+        for i in range(1, n_patients + 1)
+    ])
+
+    cases, schedules, responses = [], [], []
+    for pid in range(1, n_patients + 1):
+        cid = len(cases) + 1
+        surgery = today - timedelta(days=rnd.randint(0, 900))
+        cases.append({
+            "id": cid, "patient_id": pid, "joint_type": "KNEE",
+            "date_of_surgery": surgery, "case_status": "COMPLETED",
+        })
+        for offset in (-14, 42, 90, 180, 365, 730):
+            due = surgery + timedelta(days=offset)
+            sid = len(schedules) + 1
+            done = due < today and rnd.random() < 0.7
+            schedules.append({
+                "id": sid, "patient_id": pid, "case_id": cid, "prom_name": "OxfordKneeScore",
+                "due_date": due, "status": "completed" if done else "pending",
+            })
+            if done:
+                responses.extend(
+                    {"prom_instance_id": sid, "question_id": str(q), "answer_value": rnd.randint(1, 5)}
+                    for q in range(1, 13)
+                )
+
+    conn.execute(insert(CaseEpisode), cases)
+    conn.execute(insert(PromSchedule), schedules)
+    conn.execute(insert(PromResponse), responses)
+
+    return {"pid": n_patients // 2, "cid": n_patients // 2, "sid": len(schedules) // 2,
+            "lo": today - timedelta(days=7), "hi": today}
+
+
+def report(conn, params: dict, label: str, repeat: int = 50) -> None:
+    print(f"\n=== {label} ===")
+    for name, sql in QUERIES.items():
+        plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(text(sql), params).fetchall()
+        ms = (time.perf_counter() - start) * 1000 / repeat
+        print(f"{name:24s} {ms:8.3f} ms   " + " | ".join(row[-1] for row in plan))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--patients", type=int, default=20000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        cfg = alembic_config()
+
+        with engine.begin() as conn:
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "0001_baseline")
+            params = seed(conn, args.patients)
+
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            report(conn, params, "before (0001_baseline)")
+
+        with engine.begin() as conn:
+            cfg.attributes["connection"] = conn
+            command.upgrade(cfg, "head")
+
+        with engine.connect() as conn:
+            conn.execute(text("ANALYZE"))
+            report(conn, params, "after (head)")
+
+
+if __name__ == "__main__":
+    main()
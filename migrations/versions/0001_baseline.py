@@ -0,0 +1,111 @@
+"""Baseline schema
+
+Matches the tables previously created by Base.metadata.create_all. Tables
+that already exist (databases created before migrations) are left alone,
+so existing installs can simply run `alembic upgrade head`.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001_baseline"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_table(name: str, *columns: sa.Column) -> None:
+    if sa.inspect(op.get_bind()).has_table(name):
+        return
+    op.create_table(name, *columns)
+    if any(c.name == "id" for c in columns):
+        # Column(..., index=True) on the models' id columns
+        op.create_index(f"ix_{name}_id", name, ["id"])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_table(
+        "patients",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("full_name", sa.String(), nullable=False),
+        sa.Column("preferred_name", sa.String(), nullable=True),
+        sa.Column("id_number", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("phone", sa.String(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("sex", sa.String(), nullable=True),
+        sa.Column("medical_aid", sa.String(), nullable=True),
+        sa.Column("medical_aid_number", sa.String(), nullable=True),
+        sa.Column("joint_type", sa.String(), nullable=True),
+    )
+
+    _create_table(
+        "patient_files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+    )
+
+    _create_table(
+        "case_episodes",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("joint_type", sa.String(), nullable=False),
+        sa.Column("date_of_surgery", sa.Date(), nullable=False),
+        sa.Column("cutting_time", sa.String(), nullable=True),
+        sa.Column("closing_time", sa.String(), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("case_status", sa.String(), nullable=False),
+        sa.Column("surgeon_name", sa.String(), nullable=True),
+        sa.Column("procedure_type", sa.String(), nullable=True),
+        sa.Column("implant_notes", sa.String(), nullable=True),
+    )
+
+    _create_table(
+        "prom_schedules",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=False),
+        sa.Column("case_id", sa.Integer(), sa.ForeignKey("case_episodes.id"), nullable=False),
+        sa.Column("prom_name", sa.String(), nullable=False),
+        sa.Column("due_date", sa.Date(), nullable=False),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("completed_date", sa.Date(), nullable=True),
+    )
+
+    _create_table(
+        "prom_responses",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("prom_instance_id", sa.Integer(), sa.ForeignKey("prom_schedules.id"), nullable=False),
+        sa.Column("question_id", sa.String(), nullable=False),
+        sa.Column("answer_value", sa.Integer(), nullable=False),
+    )
+
+    _create_table(
+        "prom_scores",
+        sa.Column("schedule_id", sa.Integer(), sa.ForeignKey("prom_schedules.id"), primary_key=True),
+        sa.Column("prom_name", sa.String(), nullable=False),
+        sa.Column("total", sa.Float(), nullable=True),
+        sa.Column("max_possible", sa.Float(), nullable=True),
+        sa.Column("normalised", sa.Float(), nullable=True),
+        sa.Column("subscales", sa.JSON(), nullable=True),
+        sa.Column("answered", sa.Integer(), nullable=False),
+        sa.Column("plan_version", sa.String(), nullable=False),
+        sa.Column("scored_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in ("prom_scores", "prom_responses", "prom_schedules", "case_episodes", "patient_files", "patients"):
+        op.drop_table(name)
@@ -0,0 +1,45 @@
+"""Indexes for foreign-key and due-date access paths
+
+Revision ID: 0002_access_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002_access_path_indexes"
+down_revision: Union[str, Sequence[str], None] = "0001_baseline"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = [
+    # cases by patient, ordered by surgery date
+    ("ix_case_episodes_patient_id_date_of_surgery", "case_episodes", ["patient_id", "date_of_surgery"]),
+    # files by patient
+    ("ix_patient_files_patient_id", "patient_files", ["patient_id"]),
+    # schedules by patient ordered by due date
+    ("ix_prom_schedules_patient_id_due_date", "prom_schedules", ["patient_id", "due_date"]),
+    # schedules by case (scheduler idempotency check, PROM form)
+    ("ix_prom_schedules_case_id", "prom_schedules", ["case_id"]),
+    # due / overdue worklists
+    ("ix_prom_schedules_status_due_date", "prom_schedules", ["status", "due_date"]),
+    # responses for a PROM instance
+    ("ix_prom_responses_prom_instance_id", "prom_responses", ["prom_instance_id"]),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,46 @@
+"""OCR intake job queue
+
+Revision ID: 0003_intake_jobs
+Revises: 0002_access_path_indexes
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003_intake_jobs"
+down_revision: Union[str, Sequence[str], None] = "0002_access_path_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "intake_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("patient_id", sa.Integer(), sa.ForeignKey("patients.id"), nullable=True),
+        sa.Column("patient_file_id", sa.Integer(), sa.ForeignKey("patient_files.id"), nullable=True),
+        sa.Column("parsed", sa.JSON(), nullable=True),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_intake_jobs_id", "intake_jobs", ["id"])
+    op.create_index("ix_intake_jobs_status_id", "intake_jobs", ["status", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_intake_jobs_status_id", table_name="intake_jobs")
+    op.drop_index("ix_intake_jobs_id", table_name="intake_jobs")
+    op.drop_table("intake_jobs")
@@ -0,0 +1,41 @@
+"""OCR result cache
+
+Revision ID: 0004_ocr_cache
+Revises: 0003_intake_jobs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004_ocr_cache"
+down_revision: Union[str, Sequence[str], None] = "0003_intake_jobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "ocr_cache",
+        sa.Column("cache_key", sa.String(), primary_key=True),
+        sa.Column("sha256", sa.String(), nullable=False),
+        sa.Column("settings", sa.String(), nullable=False),
+        sa.Column("text", sa.Text(), nullable=False),
+        sa.Column("parsed", sa.JSON(), nullable=True),
+        sa.Column("size_bytes", sa.Integer(), nullable=False),
+        sa.Column("hits", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("last_used_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_ocr_cache_last_used_at", "ocr_cache", ["last_used_at"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_ocr_cache_last_used_at", table_name="ocr_cache")
+    op.drop_table("ocr_cache")
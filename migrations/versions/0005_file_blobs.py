@@ -0,0 +1,61 @@
+"""Content-addressed blob store for patient files
+
+Revision ID: 0005_file_blobs
+Revises: 0004_ocr_cache
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005_file_blobs"
+down_revision: Union[str, Sequence[str], None] = "0004_ocr_cache"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "file_blobs",
+        sa.Column("sha256", sa.String(), primary_key=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("mime_type", sa.String(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+
+    # Existing rows keep their old paths until
+    # `python -m app.services.patient_files --adopt-legacy` moves them in.
+    with op.batch_alter_table("patient_files") as batch:
+        batch.add_column(sa.Column("sha256", sa.String(), nullable=True))
+        batch.add_column(sa.Column("size", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("mime_type", sa.String(), nullable=True))
+        batch.add_column(sa.Column("created_at", sa.DateTime(), nullable=True))
+        batch.create_foreign_key("fk_patient_files_sha256_file_blobs", "file_blobs", ["sha256"], ["sha256"])
+        batch.create_index("ix_patient_files_sha256", ["sha256"])
+
+    with op.batch_alter_table("intake_jobs") as batch:
+        batch.add_column(sa.Column("sha256", sa.String(), nullable=True))
+        batch.create_foreign_key("fk_intake_jobs_sha256_file_blobs", "file_blobs", ["sha256"], ["sha256"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("intake_jobs") as batch:
+        batch.drop_constraint("fk_intake_jobs_sha256_file_blobs", type_="foreignkey")
+        batch.drop_column("sha256")
+
+    with op.batch_alter_table("patient_files") as batch:
+        batch.drop_index("ix_patient_files_sha256")
+        batch.drop_constraint("fk_patient_files_sha256_file_blobs", type_="foreignkey")
+        batch.drop_column("created_at")
+        batch.drop_column("mime_type")
+        batch.drop_column("size")
+        batch.drop_column("sha256")
+
+    op.drop_table("file_blobs")
@@ -0,0 +1,68 @@
+"""Protocol timepoint columns on prom_schedules
+
+Revision ID: 0006_prom_protocol_columns
+Revises: 0005_file_blobs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006_prom_protocol_columns"
+down_revision: Union[str, Sequence[str], None] = "0005_file_blobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("prom_schedules") as batch:
+        batch.add_column(sa.Column("protocol", sa.String(), nullable=True))
+        batch.add_column(sa.Column("offset_days", sa.Integer(), nullable=True))
+        batch.add_column(sa.Column("window_start", sa.Date(), nullable=True))
+        batch.add_column(sa.Column("window_end", sa.Date(), nullable=True))
+
+    # Existing rows: offset from the surgery date, so re-planning can match
+    # them to protocol timepoints. Windows are filled in by the first re-plan.
+    conn = op.get_bind()
+    schedules = sa.table(
+        "prom_schedules",
+        sa.column("id", sa.Integer),
+        sa.column("case_id", sa.Integer),
+        sa.column("due_date", sa.Date),
+        sa.column("offset_days", sa.Integer),
+    )
+    cases = sa.table(
+        "case_episodes",
+        sa.column("id", sa.Integer),
+        sa.column("date_of_surgery", sa.Date),
+    )
+    rows = conn.execute(
+        sa.select(schedules.c.id, schedules.c.due_date, cases.c.date_of_surgery)
+        .join(cases, cases.c.id == schedules.c.case_id)
+    ).all()
+    updates = [
+        {"sid": r.id, "offset_days": (r.due_date - r.date_of_surgery).days}
+        for r in rows
+        if r.due_date is not None and r.date_of_surgery is not None
+    ]
+    if updates:
+        conn.execute(
+            schedules.update()
+            .where(schedules.c.id == sa.bindparam("sid"))
+            .values(offset_days=sa.bindparam("offset_days")),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("prom_schedules") as batch:
+        batch.drop_column("window_end")
+        batch.drop_column("window_start")
+        batch.drop_column("offset_days")
+        batch.drop_column("protocol")
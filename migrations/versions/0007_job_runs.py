@@ -0,0 +1,34 @@
+"""Periodic job state
+
+Revision ID: 0007_job_runs
+Revises: 0006_prom_protocol_columns
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007_job_runs"
+down_revision: Union[str, Sequence[str], None] = "0006_prom_protocol_columns"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "job_runs",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("watermark", sa.Date(), nullable=True),
+        sa.Column("last_run_at", sa.DateTime(), nullable=True),
+        sa.Column("last_result", sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("job_runs")
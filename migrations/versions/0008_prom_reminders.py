@@ -0,0 +1,43 @@
+"""PROM reminder log
+
+Revision ID: 0008_prom_reminders
+Revises: 0007_job_runs
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008_prom_reminders"
+down_revision: Union[str, Sequence[str], None] = "0007_job_runs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "prom_reminders",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("schedule_id", sa.Integer(), sa.ForeignKey("prom_schedules.id"), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("channel", sa.String(), nullable=False),
+        sa.Column("recipient", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.UniqueConstraint("schedule_id", "kind", "channel", name="uq_prom_reminders_schedule_kind_channel"),
+    )
+    op.create_index("ix_prom_reminders_id", "prom_reminders", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_prom_reminders_id", table_name="prom_reminders")
+    op.drop_table("prom_reminders")
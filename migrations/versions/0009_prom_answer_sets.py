@@ -0,0 +1,182 @@
+"""Packed PROM answer storage
+
+Revision ID: 0009_prom_answer_sets
+Revises: 0008_prom_reminders
+Create Date: 2026-10-17
+
+"""
+import hashlib
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009_prom_answer_sets"
+down_revision: Union[str, Sequence[str], None] = "0008_prom_reminders"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# Question order of the shipped templates when this revision was written.
+# Pinned here so the packed layout does not depend on whatever template
+# files are on disk when the migration runs.
+TEMPLATE_QUESTION_IDS: dict[str, list[str]] = {
+    "koos": [
+        "P1", "P2", "P3", "P4", "P5", "P6", "P7", "P8", "P9",
+        "Sy1", "Sy2", "Sy3", "Sy4", "Sy5", "Sy6", "Sy7",
+        "A1", "A2", "A3", "A4", "A5", "A6", "A7", "A8", "A9",
+        "A10", "A11", "A12", "A13", "A14", "A15", "A16", "A17",
+        "Sp1", "Sp2", "Sp3", "Sp4", "Sp5",
+        "Q1", "Q2", "Q3", "Q4",
+    ],
+    "oxfordhipscore": [str(i) for i in range(1, 13)],
+    "oxfordkneescore": [str(i) for i in range(1, 13)],
+    "quickdash": [str(i) for i in range(1, 12)],
+}
+
+responses = sa.table(
+    "prom_responses",
+    sa.column("id", sa.Integer),
+    sa.column("prom_instance_id", sa.Integer),
+    sa.column("question_id", sa.String),
+    sa.column("answer_value", sa.Integer),
+)
+schedules = sa.table(
+    "prom_schedules",
+    sa.column("id", sa.Integer),
+    sa.column("prom_name", sa.String),
+)
+layouts = sa.table(
+    "prom_answer_layouts",
+    sa.column("layout_key", sa.String),
+    sa.column("prom_name", sa.String),
+    sa.column("question_ids", sa.JSON),
+)
+answer_sets = sa.table(
+    "prom_answer_sets",
+    sa.column("schedule_id", sa.Integer),
+    sa.column("layout_key", sa.String),
+    sa.column("answers", sa.JSON),
+)
+
+
+def _layout_key(prom_name: str, question_ids: Sequence[str]) -> str:
+    # Same as app.services.prom_responses.layout_key
+    return hashlib.sha1("\x1f".join([prom_name, *question_ids]).encode("utf-8")).hexdigest()
+
+
+def _template_question_ids(prom_name: str) -> list[str]:
+    """Pinned question ids in template order, [] for other instruments."""
+    # Same key as the template file lookup in app.utils.prom_loader
+    return list(TEMPLATE_QUESTION_IDS.get(prom_name.lower().replace(" ", "_"), []))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "prom_answer_layouts",
+        sa.Column("layout_key", sa.String(), primary_key=True),
+        sa.Column("prom_name", sa.String(), nullable=False),
+        sa.Column("question_ids", sa.JSON(), nullable=False),
+    )
+    op.create_table(
+        "prom_answer_sets",
+        sa.Column("schedule_id", sa.Integer(), sa.ForeignKey("prom_schedules.id"), primary_key=True),
+        sa.Column("layout_key", sa.String(), sa.ForeignKey("prom_answer_layouts.layout_key"), nullable=False),
+        sa.Column("answers", sa.JSON(), nullable=False),
+    )
+
+    # Pack existing answers. Each instrument gets one layout in (pinned)
+    # template question order - the layout new submissions use while the
+    # template is unchanged - with any ids the template does not know
+    # appended in the order they were first stored.
+    conn = op.get_bind()
+    stored: dict[str, list[str]] = {}
+    for prom_name, qid, _ in conn.execute(
+        sa.select(schedules.c.prom_name, responses.c.question_id, sa.func.min(responses.c.id).label("first_id"))
+        .join(schedules, schedules.c.id == responses.c.prom_instance_id)
+        .group_by(schedules.c.prom_name, responses.c.question_id)
+        .order_by(schedules.c.prom_name, sa.text("first_id"))
+    ):
+        stored.setdefault(prom_name, []).append(qid)
+
+    order: dict[str, list[str]] = {}
+    for prom_name, qids in stored.items():
+        template = _template_question_ids(prom_name)
+        known = set(template)
+        order[prom_name] = template + [qid for qid in qids if qid not in known]
+
+    keys = {prom_name: _layout_key(prom_name, question_ids) for prom_name, question_ids in order.items()}
+    if keys:
+        conn.execute(layouts.insert(), [
+            {"layout_key": keys[prom_name], "prom_name": prom_name, "question_ids": question_ids}
+            for prom_name, question_ids in order.items()
+        ])
+
+    last_id = 0
+    while True:
+        ids = conn.execute(
+            sa.select(responses.c.prom_instance_id)
+            .where(responses.c.prom_instance_id > last_id)
+            .group_by(responses.c.prom_instance_id)
+            .order_by(responses.c.prom_instance_id)
+            .limit(BATCH_SIZE)
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        by_instance: dict[int, tuple[str, dict[str, int]]] = {}
+        for sid, prom_name, qid, value in conn.execute(
+            sa.select(responses.c.prom_instance_id, schedules.c.prom_name, responses.c.question_id, responses.c.answer_value)
+            .join(schedules, schedules.c.id == responses.c.prom_instance_id)
+            .where(responses.c.prom_instance_id.in_(ids))
+            .order_by(responses.c.prom_instance_id, responses.c.id)
+        ):
+            # A repeated question keeps its last answer
+            by_instance.setdefault(sid, (prom_name, {}))[1][qid] = value
+
+        if not by_instance:
+            continue  # answers of missing schedules stay where they are
+        conn.execute(answer_sets.insert(), [
+            {
+                "schedule_id": sid,
+                "layout_key": keys[prom_name],
+                "answers": [answers.get(qid) for qid in order[prom_name]],
+            }
+            for sid, (prom_name, answers) in by_instance.items()
+        ])
+        conn.execute(responses.delete().where(responses.c.prom_instance_id.in_(list(by_instance))))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    conn = op.get_bind()
+    question_ids = dict(conn.execute(sa.select(layouts.c.layout_key, layouts.c.question_ids)).all())
+
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(answer_sets.c.schedule_id, answer_sets.c.layout_key, answer_sets.c.answers)
+            .where(answer_sets.c.schedule_id > last_id)
+            .order_by(answer_sets.c.schedule_id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].schedule_id
+
+        unpacked = [
+            {"prom_instance_id": r.schedule_id, "question_id": qid, "answer_value": value}
+            for r in rows
+            for qid, value in zip(question_ids[r.layout_key], r.answers)
+            if value is not None
+        ]
+        if unpacked:
+            conn.execute(responses.insert(), unpacked)
+
+    op.drop_table("prom_answer_sets")
+    op.drop_table("prom_answer_layouts")
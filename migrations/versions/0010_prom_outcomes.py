@@ -0,0 +1,59 @@
+"""PROM outcome facts and rollups
+
+Revision ID: 0010_prom_outcomes
+Revises: 0009_prom_answer_sets
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0010_prom_outcomes"
+down_revision: Union[str, Sequence[str], None] = "0009_prom_answer_sets"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Scores stored before this revision are picked up by
+    # the rebuild at app startup (or `python -m app.services.outcomes`).
+    op.create_table(
+        "prom_outcome_facts",
+        sa.Column("schedule_id", sa.Integer(), sa.ForeignKey("prom_schedules.id"), primary_key=True),
+        sa.Column("case_id", sa.Integer(), sa.ForeignKey("case_episodes.id"), nullable=False),
+        sa.Column("prom_name", sa.String(), nullable=False),
+        sa.Column("joint_type", sa.String(), nullable=False),
+        sa.Column("surgeon_name", sa.String(), nullable=False),
+        sa.Column("offset_days", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.Column("delta", sa.Float(), nullable=True),
+    )
+    op.create_index("ix_prom_outcome_facts_case_id", "prom_outcome_facts", ["case_id"])
+
+    op.create_table(
+        "prom_outcome_rollups",
+        sa.Column("prom_name", sa.String(), primary_key=True),
+        sa.Column("joint_type", sa.String(), primary_key=True),
+        sa.Column("surgeon_name", sa.String(), primary_key=True),
+        sa.Column("offset_days", sa.Integer(), primary_key=True),
+        sa.Column("n_scores", sa.Integer(), nullable=False),
+        sa.Column("sum_score", sa.Float(), nullable=False),
+        sa.Column("n_deltas", sa.Integer(), nullable=False),
+        sa.Column("sum_delta", sa.Float(), nullable=False),
+        sa.Column("sum_delta_sq", sa.Float(), nullable=False),
+        sa.Column("score_hist", sa.JSON(), nullable=False),
+        sa.Column("delta_hist", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("prom_outcome_rollups")
+    op.drop_index("ix_prom_outcome_facts_case_id", table_name="prom_outcome_facts")
+    op.drop_table("prom_outcome_facts")
@@ -0,0 +1,52 @@
+"""Theatre duration facts and daily rollups
+
+Revision ID: 0011_theatre_stats
+Revises: 0010_prom_outcomes
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0011_theatre_stats"
+down_revision: Union[str, Sequence[str], None] = "0010_prom_outcomes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Cases completed before this revision are picked up by
+    # the rebuild at app startup (or `python -m app.services.theatre_stats`).
+    op.create_table(
+        "theatre_case_facts",
+        sa.Column("case_id", sa.Integer(), sa.ForeignKey("case_episodes.id"), primary_key=True),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("joint_type", sa.String(), nullable=False),
+        sa.Column("procedure_type", sa.String(), nullable=False),
+        sa.Column("surgeon_name", sa.String(), nullable=False),
+        sa.Column("duration_minutes", sa.Integer(), nullable=False),
+    )
+
+    op.create_table(
+        "theatre_daily_rollups",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("joint_type", sa.String(), primary_key=True),
+        sa.Column("procedure_type", sa.String(), primary_key=True),
+        sa.Column("surgeon_name", sa.String(), primary_key=True),
+        sa.Column("n_cases", sa.Integer(), nullable=False),
+        sa.Column("sum_minutes", sa.Integer(), nullable=False),
+        sa.Column("sum_minutes_sq", sa.Integer(), nullable=False),
+        sa.Column("minutes_hist", sa.JSON(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("theatre_daily_rollups")
+    op.drop_table("theatre_case_facts")
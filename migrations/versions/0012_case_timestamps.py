@@ -0,0 +1,126 @@
+"""Case start/stop timestamps replacing HH:MM strings
+
+Revision ID: 0012_case_timestamps
+Revises: 0011_theatre_stats
+Create Date: 2026-10-17
+
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+from zoneinfo import ZoneInfo
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0012_case_timestamps"
+down_revision: Union[str, Sequence[str], None] = "0011_theatre_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 500
+
+# Same as app.utils.case_times.CASE_TIMEZONE (empty = server local time)
+_NAME = os.getenv("CASE_TIMEZONE", "")
+_TZ = ZoneInfo(_NAME) if _NAME else None
+
+cases = sa.table(
+    "case_episodes",
+    sa.column("id", sa.Integer),
+    sa.column("date_of_surgery", sa.Date),
+    sa.column("cutting_time", sa.String),
+    sa.column("closing_time", sa.String),
+    sa.column("started_at", sa.DateTime(timezone=True)),
+    sa.column("stopped_at", sa.DateTime(timezone=True)),
+    sa.column("duration_minutes", sa.Integer),
+)
+
+
+def _utc(local: datetime) -> datetime:
+    local = local.replace(tzinfo=_TZ) if _TZ else local.astimezone()
+    return local.astimezone(timezone.utc)
+
+
+def _hhmm(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # SQLite returns the stored UTC naive
+    return (value.astimezone(_TZ) if _TZ else value.astimezone()).strftime("%H:%M")
+
+
+def _parse(value):
+    try:
+        return datetime.strptime(value, "%H:%M").time() if value else None
+    except ValueError:
+        return None
+
+
+def _batches(conn, *columns):
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(cases.c.id, *columns)
+            .where(cases.c.id > last_id)
+            .order_by(cases.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1].id
+        yield rows
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table("case_episodes") as batch:
+        batch.add_column(sa.Column("started_at", sa.DateTime(timezone=True), nullable=True))
+        batch.add_column(sa.Column("stopped_at", sa.DateTime(timezone=True), nullable=True))
+        batch.create_index("ix_case_episodes_duration_minutes", ["duration_minutes"])
+
+    # HH:MM on the day of surgery; closing before cutting ran past midnight.
+    # Durations are recomputed, which fills in those overnight cases.
+    conn = op.get_bind()
+    for rows in _batches(conn, cases.c.date_of_surgery, cases.c.cutting_time, cases.c.closing_time):
+        updates = []
+        for r in rows:
+            cut, close = _parse(r.cutting_time), _parse(r.closing_time)
+            start = _utc(datetime.combine(r.date_of_surgery, cut)) if cut and r.date_of_surgery else None
+            stop = None
+            if close and r.date_of_surgery:
+                day = r.date_of_surgery + timedelta(days=1) if cut and close < cut else r.date_of_surgery
+                stop = _utc(datetime.combine(day, close))
+            duration = int((stop - start).total_seconds() // 60) if start and stop else None
+            updates.append({"_id": r.id, "started_at": start, "stopped_at": stop, "duration_minutes": duration})
+        conn.execute(
+            cases.update().where(cases.c.id == sa.bindparam("_id")),
+            updates,
+        )
+
+    with op.batch_alter_table("case_episodes") as batch:
+        batch.drop_column("cutting_time")
+        batch.drop_column("closing_time")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("case_episodes") as batch:
+        batch.add_column(sa.Column("cutting_time", sa.String(), nullable=True))
+        batch.add_column(sa.Column("closing_time", sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    for rows in _batches(conn, cases.c.started_at, cases.c.stopped_at):
+        conn.execute(
+            cases.update().where(cases.c.id == sa.bindparam("_id")),
+            [
+                {"_id": r.id, "cutting_time": _hhmm(r.started_at), "closing_time": _hhmm(r.stopped_at)}
+                for r in rows
+            ],
+        )
+
+    with op.batch_alter_table("case_episodes") as batch:
+        batch.drop_index("ix_case_episodes_duration_minutes")
+        batch.drop_column("stopped_at")
+        batch.drop_column("started_at")
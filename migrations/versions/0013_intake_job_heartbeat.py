@@ -0,0 +1,31 @@
+"""Intake job leases
+
+Revision ID: 0013_intake_job_heartbeat
+Revises: 0012_case_timestamps
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0013_intake_job_heartbeat"
+down_revision: Union[str, Sequence[str], None] = "0012_case_timestamps"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Jobs running at upgrade time have no heartbeat and are requeued once
+    with op.batch_alter_table("intake_jobs") as batch:
+        batch.add_column(sa.Column("heartbeat_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table("intake_jobs") as batch:
+        batch.drop_column("heartbeat_at")
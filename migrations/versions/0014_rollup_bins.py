@@ -0,0 +1,67 @@
+"""Rollup histograms as bin rows (atomic upserts)
+
+Revision ID: 0014_rollup_bins
+Revises: 0013_intake_job_heartbeat
+Create Date: 2026-10-17
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0014_rollup_bins"
+down_revision: Union[str, Sequence[str], None] = "0013_intake_job_heartbeat"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The JSON histograms are not carried over: facts and rollups are
+    # emptied and rebuilt from prom_scores / case_episodes at app startup.
+    for table in ("prom_outcome_rollups", "prom_outcome_facts", "theatre_daily_rollups", "theatre_case_facts"):
+        op.execute(sa.text(f"DELETE FROM {table}"))
+
+    with op.batch_alter_table("prom_outcome_rollups") as batch:
+        batch.drop_column("score_hist")
+        batch.drop_column("delta_hist")
+    with op.batch_alter_table("theatre_daily_rollups") as batch:
+        batch.drop_column("minutes_hist")
+
+    op.create_table(
+        "prom_outcome_bins",
+        sa.Column("prom_name", sa.String(), primary_key=True),
+        sa.Column("joint_type", sa.String(), primary_key=True),
+        sa.Column("surgeon_name", sa.String(), primary_key=True),
+        sa.Column("offset_days", sa.Integer(), primary_key=True),
+        sa.Column("kind", sa.String(), primary_key=True),
+        sa.Column("bin", sa.Integer(), primary_key=True),
+        sa.Column("n", sa.Integer(), nullable=False),
+    )
+    op.create_table(
+        "theatre_daily_bins",
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("joint_type", sa.String(), primary_key=True),
+        sa.Column("procedure_type", sa.String(), primary_key=True),
+        sa.Column("surgeon_name", sa.String(), primary_key=True),
+        sa.Column("minutes", sa.Integer(), primary_key=True),
+        sa.Column("n", sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("theatre_daily_bins")
+    op.drop_table("prom_outcome_bins")
+
+    for table in ("prom_outcome_rollups", "prom_outcome_facts", "theatre_daily_rollups", "theatre_case_facts"):
+        op.execute(sa.text(f"DELETE FROM {table}"))
+
+    with op.batch_alter_table("prom_outcome_rollups") as batch:
+        batch.add_column(sa.Column("score_hist", sa.JSON(), nullable=False))
+        batch.add_column(sa.Column("delta_hist", sa.JSON(), nullable=False))
+    with op.batch_alter_table("theatre_daily_rollups") as batch:
+        batch.add_column(sa.Column("minutes_hist", sa.JSON(), nullable=False))
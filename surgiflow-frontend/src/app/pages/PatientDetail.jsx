@@ -122,36 +122,13 @@ export default function PatientDetail() {
       setPromError(null);
 
       try {
-        // Patient
-        const patientData = await apiJson(`${API_BASE}/patients/${patientId}`);
+        // Patient + files + cases + PROM schedule in one request
+        const overview = await apiJson(`${API_BASE}/patients/${patientId}/overview`);
+        const { files: patientFiles, cases: patientCases, prom_schedules: schedules, ...patientData } = overview;
         setPatient(patientData);
-
-        // Files
-        try {
-          const filesData = await apiJson(
-            `${API_BASE}/patient-files/by-patient/${patientId}`
-          );
-          setFiles(Array.isArray(filesData) ? filesData : []);
-        } catch {
-          setFiles([]);
-        }
-
-        // Cases
-        try {
-          const casesData = await apiJson(`${API_BASE}/cases/by-patient/${patientId}`);
-          setCases(Array.isArray(casesData) ? casesData : []);
-        } catch {
-          setCases([]);
-        }
-
-        // NEW - PROM schedule for patient
-        try {
-          const sched = await apiJson(`${API_BASE}/proms/schedule/patient/${patientId}`);
-          setPromSchedules(Array.isArray(sched) ? sched : []);
-        } catch {
-          setPromSchedules([]);
-          setPromError("Could not load PROM schedule");
-        }
+        setFiles(Array.isArray(patientFiles) ? patientFiles : []);
+        setCases(Array.isArray(patientCases) ? patientCases : []);
+        setPromSchedules(Array.isArray(schedules) ? schedules : []);
       } catch (e) {
         setError("Failed to load patient");
       } finally {
@@ -317,8 +294,8 @@ export default function PatientDetail() {
 
       // NEW - after Stop, PROM schedule is created by backend, so refresh PROM list
       try {
-        const sched = await apiJson(`${API_BASE}/proms/schedule/patient/${patientId}`);
-        setPromSchedules(Array.isArray(sched) ? sched : []);
+        const sched = await apiJson(`${API_BASE}/proms/schedule/patient/${patientId}?limit=500`);
+        setPromSchedules(Array.isArray(sched?.items) ? sched.items : []);
         setPromError(null);
       } catch {
         setPromError("Could not refresh PROM schedule");
@@ -510,6 +487,9 @@ export default function PatientDetail() {
                             <th style={{ textAlign: "left", padding: "6px 4px", borderBottom: "1px solid #eee" }}>
                               Status
                             </th>
+                            <th style={{ textAlign: "left", padding: "6px 4px", borderBottom: "1px solid #eee" }}>
+                              Score
+                            </th>
                           </tr>
                         </thead>
                         <tbody>
@@ -531,6 +511,9 @@ export default function PatientDetail() {
                                     {(row.status || "pending").toLowerCase()}
                                   </span>
                                 </td>
+                                <td style={{ padding: "6px 4px", borderBottom: "1px solid #f3f3f3" }}>
+                                  {row.score?.normalised != null ? row.score.normalised.toFixed(1) : "-"}
+                                </td>
                               </tr>
                             );
                           })}
@@ -635,9 +618,24 @@ export default function PatientDetail() {
       {files.length === 0 ? (
         <p>No files uploaded</p>
       ) : (
-        <ul>
+        <ul style={{ display: "flex", flexWrap: "wrap", gap: 12, listStyle: "none", padding: 0 }}>
           {files.map((f) => (
-            <li key={f.id}>{f.filename}</li>
+            <li key={f.id} style={{ width: 128 }}>
+              <a
+                href={`${API_BASE}/patient-files/${f.id}/content`}
+                target="_blank"
+                rel="noreferrer"
+              >
+                <img
+                  src={`${API_BASE}/patient-files/${f.id}/thumbnail?size=128`}
+                  alt=""
+                  loading="lazy"
+                  width={128}
+                  style={{ display: "block", border: "1px solid #ddd" }}
+                />
+                {f.filename}
+              </a>
+            </li>
           ))}
         </ul>
       )}
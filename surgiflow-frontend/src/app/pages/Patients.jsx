@@ -4,12 +4,25 @@ import { Link } from "react-router-dom";
 
 export default function Patients() {
   const [patients, setPatients] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
 
+  function loadPage(cursor) {
+    const params = new URLSearchParams({
+      limit: "100",
+      fields: "id,full_name,preferred_name,joint_type",
+    });
+    if (cursor) params.set("cursor", cursor);
+
+    return apiGet(`/patients/?${params}`).then((page) => {
+      setPatients((prev) => (cursor ? [...prev, ...page.items] : page.items));
+      setNextCursor(page.next_cursor);
+    });
+  }
+
   useEffect(() => {
-    apiGet("/patients/")
-      .then(setPatients)
+    loadPage(null)
       .catch(() => setError("Failed to load patients"))
       .finally(() => setLoading(false));
   }, []);
@@ -30,6 +43,15 @@ export default function Patients() {
           </li>
         ))}
       </ul>
+      {nextCursor && (
+        <button
+          onClick={() =>
+            loadPage(nextCursor).catch(() => setError("Failed to load patients"))
+          }
+        >
+          Load more
+        </button>
+      )}
     </div>
   );
 }
@@ -0,0 +1,92 @@
+from datetime import date
+
+import pytest
+import sqlalchemy as sa
+from alembic import command
+from sqlalchemy.orm import Session
+
+from app.core.migrations import alembic_config
+from app.services.prom_responses import layout_key, load_answers
+
+BEFORE = "0008_prom_reminders"
+AFTER = "0009_prom_answer_sets"
+
+# (schedule_id, prom_name, [(question_id, value), ...] in stored order)
+STORED = [
+    (1, "OxfordKneeScore", [(str(q), q % 5) for q in range(12, 0, -1)] + [("extra", 3)]),
+    (2, "OxfordKneeScore", [("1", 4), ("2", 1), ("1", 2)]),   # repeated question: last answer wins
+    (3, "KOOS", [("Q4", 2), ("P1", 0), ("Sy3", 4)]),
+    (4, "LocalScore", [("b", 1), ("a", 2)]),
+]
+
+
+def _migrate(engine, revision: str, down: bool = False) -> None:
+    cfg = alembic_config()
+    with engine.begin() as conn:
+        cfg.attributes["connection"] = conn
+        (command.downgrade if down else command.upgrade)(cfg, revision)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = sa.create_engine(f"sqlite:///{tmp_path / 'migration.db'}")
+    _migrate(engine, BEFORE)
+
+    meta = sa.MetaData()
+    meta.reflect(engine, only=["patients", "case_episodes", "prom_schedules", "prom_responses"])
+    t = meta.tables
+    with engine.begin() as conn:
+        conn.execute(t["patients"].insert(), {"id": 1, "full_name": "Test Patient"})
+        conn.execute(t["case_episodes"].insert(), {
+            "id": 1, "patient_id": 1, "joint_type": "KNEE",
+            "date_of_surgery": date(2026, 1, 5), "case_status": "COMPLETED",
+        })
+        for sid, prom_name, pairs in STORED:
+            conn.execute(t["prom_schedules"].insert(), {
+                "id": sid, "patient_id": 1, "case_id": 1, "prom_name": prom_name,
+                "due_date": date(2026, 3, 1), "status": "completed",
+            })
+            conn.execute(t["prom_responses"].insert(), [
+                {"prom_instance_id": sid, "question_id": qid, "answer_value": value} for qid, value in pairs
+            ])
+    yield engine
+    engine.dispose()
+
+
+def _layouts(engine) -> dict[str, list[str]]:
+    layouts = sa.table("prom_answer_layouts", sa.column("prom_name", sa.String), sa.column("question_ids", sa.JSON))
+    with engine.connect() as conn:
+        return dict(conn.execute(sa.select(layouts.c.prom_name, layouts.c.question_ids)).all())
+
+
+def test_upgrade_packs_answers_in_pinned_template_order(engine):
+    _migrate(engine, AFTER)
+
+    layouts = _layouts(engine)
+    assert layouts["OxfordKneeScore"] == [str(q) for q in range(1, 13)] + ["extra"]
+    assert layouts["KOOS"][:3] == ["P1", "P2", "P3"] and layouts["KOOS"][-1] == "Q4"
+    assert layouts["LocalScore"] == ["b", "a"]   # no pinned template: first-stored order
+
+    with engine.connect() as conn:
+        assert conn.execute(sa.text("SELECT count(*) FROM prom_responses")).scalar() == 0
+        keys = dict(conn.execute(sa.text("SELECT schedule_id, layout_key FROM prom_answer_sets")).all())
+    assert keys[1] == layout_key("OxfordKneeScore", layouts["OxfordKneeScore"])
+
+    with Session(engine) as db:
+        loaded = load_answers(db, [sid for sid, _, _ in STORED])
+    assert loaded == {sid: dict(pairs) for sid, _, pairs in STORED}
+
+
+def test_downgrade_restores_response_rows(engine):
+    _migrate(engine, AFTER)
+    _migrate(engine, BEFORE, down=True)
+
+    with engine.connect() as conn:
+        assert not sa.inspect(conn).has_table("prom_answer_sets")
+        rows = conn.execute(sa.text("SELECT prom_instance_id, question_id, answer_value FROM prom_responses")).all()
+
+    restored: dict[int, dict[str, int]] = {}
+    for sid, qid, value in rows:
+        restored.setdefault(sid, {})[qid] = value
+    assert restored == {sid: dict(pairs) for sid, _, pairs in STORED}
+    assert len(rows) == sum(len(dict(pairs)) for _, _, pairs in STORED)
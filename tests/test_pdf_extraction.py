@@ -0,0 +1,37 @@
+import os
+
+import pytest
+
+from app.services import pdf_extraction
+from app.services.pdf_parser import is_valid_sa_id
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_PDF = os.path.join(REPO_ROOT, "Annika Uys Z10121_compressed.pdf")
+
+
+@pytest.mark.parametrize("id_number, valid", [
+    ("9104050154088", True),
+    ("4104050154088", False),   # bad check digit
+    ("9113050154089", False),   # check digit fine, month 13
+    ("910405015408", False),    # 12 digits
+    (None, False),
+])
+def test_is_valid_sa_id(id_number, valid):
+    assert is_valid_sa_id(id_number) is valid
+
+
+def test_garbled_text_layer_falls_back_to_ocr(monkeypatch):
+    # The sample's embedded text layer reads the ID as 4104050154088 and the
+    # surname from the next-of-kin line; it must not be imported as is.
+    ocr_calls = []
+
+    def fake_ocr(page, region=None, dpi=None, lang=None):
+        ocr_calls.append(region)
+        return "Van : UYS\nNoemnaam : ANNIKA\nID nr : 9104050154088\nKontak nr : 0663321036\n"
+
+    monkeypatch.setattr(pdf_extraction, "ocr_page", fake_ocr)
+    result = pdf_extraction.extract_intake(SAMPLE_PDF)
+
+    assert result["method"] == "ocr"
+    assert ocr_calls == [pdf_extraction.INTAKE_FORM_REGION]
+    assert result["parsed"]["id_number"] == "9104050154088"